@@ -0,0 +1,102 @@
+# flake8: noqa
+"""Partition Price Tables
+
+stockprice・stockprice_maテーブルを日付(date)の年単位のRANGEパーティションテーブルに変更する.
+パーティション名は<テーブル名>_y<年>とし、範囲外の日付は<テーブル名>_defaultに格納する.
+翌年以降のパーティションはStockClient.create_partitions()によりバッチ処理の開始時に作成する.
+
+Revision ID: 5c1e2a9d7b34
+Revises: ffcf7c6907c5
+Create Date: 2020-05-09 10:12:31.402118
+
+"""
+import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e2a9d7b34'
+down_revision = 'ffcf7c6907c5'
+branch_labels = None
+depends_on = None
+
+# 既存データが無い場合に作成する最初の年のパーティション
+FIRST_YEAR = 2000
+
+
+def _get_columns(table_name):
+    columns = [
+        sa.Column('company_id', sa.String(length=16), sa.ForeignKey('company.company_id'), nullable=False, comment='システム内で設定する企業毎に一意となるコード'),
+        sa.Column('date', sa.Date(), nullable=False, comment='日付'),
+    ]
+    if table_name == 'stockprice':
+        columns += [
+            sa.Column('open_price', sa.Float(), nullable=True, comment='株価(始値)'),
+            sa.Column('high_price', sa.Float(), nullable=True, comment='株価(高値)'),
+            sa.Column('low_price', sa.Float(), nullable=True, comment='株価(安値)'),
+            sa.Column('close_price', sa.Float(), nullable=True, comment='株価(終値)'),
+            sa.Column('volume', sa.Float(), nullable=True, comment='出来高'),
+        ]
+        primary_keys = ['company_id', 'date']
+        comment = '企業毎の日毎の株価(始値・高値・安値・終値)・出来高を格納する'
+    else:
+        columns += [
+            sa.Column('ma_type', sa.String(length=16), nullable=False, comment='移動平均の計算条件(ex. sma5, ema25, ...)'),
+            sa.Column('ma_value', sa.Float(), nullable=True, comment='ma_typeの条件下の移動平均株価'),
+        ]
+        primary_keys = ['company_id', 'date', 'ma_type']
+        comment = '企業毎の日次の移動平均株価(SMA・EMA・WMA)を格納する'
+    columns += [
+        sa.Column('ins_ts', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('upd_ts', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint(*primary_keys),
+    ]
+    return columns, comment
+
+
+def _get_year_range(table_name):
+    # 既存データの期間と当年・翌年を含むようにパーティションを作成する
+    min_date, max_date = op.get_bind().execute(sa.text(
+        f'SELECT min(date), max(date) FROM {table_name}')).first()
+    this_year = datetime.date.today().year
+    first_year = min(FIRST_YEAR, min_date.year) if min_date else FIRST_YEAR
+    last_year = max(this_year, max_date.year) + 1 if max_date else this_year + 1
+    return first_year, last_year
+
+
+def _rebuild_table(table_name, partitioned):
+    # 既存テーブルを退避し、同じ定義のテーブルを作成してデータを移し替える
+    old_name = f'{table_name}_old'
+    op.execute(f'ALTER TABLE {table_name} RENAME TO {old_name}')
+    op.execute(f'ALTER INDEX {table_name}_pkey RENAME TO {old_name}_pkey')
+
+    columns, comment = _get_columns(table_name)
+    table_kwargs = {'postgresql_partition_by': 'RANGE (date)'} if partitioned else {}
+    op.create_table(table_name, *columns, comment=comment, **table_kwargs)
+    if partitioned:
+        first_year, last_year = _get_year_range(old_name)
+        for year in range(first_year, last_year + 1):
+            op.execute(
+                f'CREATE TABLE {table_name}_y{year} PARTITION OF {table_name} '
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')")
+        op.execute(f'CREATE TABLE {table_name}_default PARTITION OF {table_name} DEFAULT')
+
+    column_names = ', '.join(column.name for column in columns if isinstance(column, sa.Column))
+    op.execute(
+        f'INSERT INTO {table_name} ({column_names}) '
+        f'SELECT {column_names} FROM {old_name}')
+    op.drop_table(old_name)
+
+
+def upgrade():
+    op.execute('LOCK TABLE stockprice, stockprice_ma IN ACCESS EXCLUSIVE MODE')
+    _rebuild_table('stockprice', partitioned=True)
+    _rebuild_table('stockprice_ma', partitioned=True)
+
+
+def downgrade():
+    op.execute('LOCK TABLE stockprice, stockprice_ma IN ACCESS EXCLUSIVE MODE')
+    # パーティションはパーティションテーブルの削除時に合わせて削除される
+    _rebuild_table('stockprice_ma', partitioned=False)
+    _rebuild_table('stockprice', partitioned=False)
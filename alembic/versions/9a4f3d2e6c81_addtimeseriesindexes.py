@@ -0,0 +1,42 @@
+# flake8: noqa
+"""Add Time Series Indexes
+
+日付をキーとした企業横断の検索(ある日付の全企業の終値、直近N日の特定のma_type等)と、
+移動平均の計算(企業毎の日付順の終値の読み込み)のためのインデックスを追加する.
+移動平均の計算用には、stockpriceテーブルの主キーのインデックスにINCLUDE (close_price)を追加する.
+パーティションテーブルの親テーブルに作成し、各パーティションにも作成される.
+
+Revision ID: 9a4f3d2e6c81
+Revises: 5c1e2a9d7b34
+Create Date: 2020-05-16 14:03:22.518734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4f3d2e6c81'
+down_revision = '5c1e2a9d7b34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 日付による企業横断の検索用のBRINインデックス(日付順にロードされるため、B-treeより大幅に小さい)
+    op.execute('CREATE INDEX ix_stockprice_date_brin ON stockprice USING brin (date)')
+    op.execute('CREATE INDEX ix_stockprice_ma_date_brin ON stockprice_ma USING brin (date)')
+    # ma_type・日付による企業横断の検索用
+    op.execute('CREATE INDEX ix_stockprice_ma_ma_type_date ON stockprice_ma (ma_type, date) INCLUDE (company_id, ma_value)')
+    # 移動平均の計算で企業毎に日付順に終値を読み込む際に、Index Only Scanとする
+    # (同じカラムのインデックスを別に作成せず、主キーのインデックスにclose_priceを含める)
+    op.execute('ALTER TABLE stockprice DROP CONSTRAINT stockprice_pkey')
+    op.execute('ALTER TABLE stockprice ADD CONSTRAINT stockprice_pkey PRIMARY KEY (company_id, date) INCLUDE (close_price)')
+
+
+def downgrade():
+    op.execute('ALTER TABLE stockprice DROP CONSTRAINT stockprice_pkey')
+    op.execute('ALTER TABLE stockprice ADD CONSTRAINT stockprice_pkey PRIMARY KEY (company_id, date)')
+    op.drop_index('ix_stockprice_ma_ma_type_date', table_name='stockprice_ma')
+    op.drop_index('ix_stockprice_ma_date_brin', table_name='stockprice_ma')
+    op.drop_index('ix_stockprice_date_brin', table_name='stockprice')
@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import time
+import pathlib
+import argparse
+import datetime
+import pandas as pd
+from logging import Logger
+from typing import Dict, Tuple
+from sqlalchemy import func
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent)))
+from benchmark.market_data_generator import MarketDataGenerator, get_connect_args_from_env  # noqa: #402
+from benchmark.ma_benchmark import DBTimer  # noqa: #402
+from benchmark.stub_data_server import StubDataServer  # noqa: #402
+from common.db.base_engine import BaseEngine  # noqa: #402
+from common.db.common_dao import CommonDao  # noqa: #402
+from common.http.http_client import HttpClient, RetryPolicy  # noqa: #402
+from common.logger.common_logger import CommonLogger  # noqa: #402
+from stock.dto.stock_dto import Company, StockPrice  # noqa: #402
+from stock.main.stock_client import StockClient  # noqa: #402
+from stock.main.stock_factory import JpStockFactory  # noqa: #402
+from stock.main.stock_manager import StockManager  # noqa: #402
+
+
+def get_latest_thursday(
+    today: datetime.date,
+) -> datetime.date:
+    """
+    当日以前で最新の木曜日を返す
+
+    StockManager.get_fetch_method()は、最新データが直近の木曜日の企業をクローリングにより取得する
+    """
+    return today - datetime.timedelta(days=(today.weekday() - 3) % 7)
+
+
+class IngestBenchmark(object):
+    """
+    StubDataServerに対してStockClient.update_jp_stock_prices()を実行し、
+    銘柄数/秒・DB時間・失敗した銘柄数を計測するクラス
+
+    MarketDataGeneratorの合成企業をcompanyテーブルにロードし、crawler_ratioの割合の企業については
+    直近の木曜日までの株価データもロードしてクローリング(kabutan)で取得させ、残りの企業はAPI(Stooq)で
+    全期間の株価データを取得させる。合成データの企業IDは接頭辞(id_prefix)で区別するため、
+    ベンチマーク専用のDBで実行すること。
+
+    Attributes
+    ----------
+    connect_args: Tuple
+        BaseEngineに渡すDB接続情報(ユーザー名, パスワード, ホスト, ポート番号, データベース名)
+    logger: logging.Logger
+        アプリケーションログ出力用のロガー
+    generator: MarketDataGenerator
+        合成の企業・株価データを生成するクラス(スタブサーバーと共有する)
+    crawler_ratio: float
+        クローリングにより取得させる企業の割合(0〜1)
+    """
+    def __init__(
+        self,
+        connect_args: Tuple,
+        logger: Logger,
+        generator: MarketDataGenerator,
+        crawler_ratio: float = 0.5,
+    ):
+        self.connect_args = connect_args
+        self.logger = logger
+        self.generator = generator
+        self.crawler_ratio = crawler_ratio
+
+    def prepare(
+        self,
+        session: object,
+    ) -> int:
+        """
+        合成データを削除した上で、企業とクローリング対象の企業の直近の木曜日までの株価データをロードする
+
+        Parameters
+        ----------
+        session: sqlalchemy.Session
+            SQL AlchemyでDBを操作するためのSessionクラス
+
+        Returns
+        ----------
+        crawler_count: int
+            クローリングにより取得させる企業数
+        """
+        self.generator.delete(session)
+        CommonDao(session, Company, self.logger).copy_load(
+            self.generator.get_company_records(), ['company_id'])
+
+        latest_thursday = pd.Timestamp(get_latest_thursday(
+            self.generator.dates[-1].date()))
+        crawler_count = int(self.generator.n_companies * self.crawler_ratio)
+        stock_manager = StockManager(session, None, None)
+
+        def iter_records():
+            for i in range(crawler_count):
+                stock_df = self.generator.generate_prices(i)
+                stock_df = stock_df[stock_df.index <= latest_thursday]
+                yield from stock_manager.to_stock_price_records(
+                    stock_df, self.generator.get_company_id(i))
+
+        CommonDao(session, StockPrice, self.logger).copy_load(
+            iter_records(), ['company_id', 'date'])
+        session.commit()
+        self.logger.info(f'Prepared {self.generator.n_companies} companies '
+                         f'({crawler_count} companies until '
+                         f'{latest_thursday:%Y-%m-%d})')
+        return crawler_count
+
+    def run(
+        self,
+        base_urls: Dict[str, str],
+        max_workers: int = 4,
+        retry_policy: RetryPolicy = None,
+    ) -> dict:
+        """
+        スタブサーバーに対して株価データの取得・DB書き込みを実行し、計測結果を返す
+
+        Parameters
+        ----------
+        base_urls: Dict[str, str]
+            データソース(stooq, kabutan)をキー、スタブサーバーのURLをバリューとするディクショナリ
+        max_workers: int
+            株価データを並行して取得するスレッド数
+        retry_policy: RetryPolicy
+            HttpClientのリトライ方針(指定しない場合はデフォルト値)
+
+        Returns
+        ----------
+        result: dict
+            実行時間・DB時間(秒)、銘柄数/秒、最新日まで更新された企業数・失敗した企業数、書き込んだ行数
+        """
+        base_engine = BaseEngine(*self.connect_args)
+        session = base_engine.get_session()
+        try:
+            crawler_count = self.prepare(session)
+            stock_factory = JpStockFactory(
+                HttpClient(retry_policy=retry_policy, pool_size=max_workers),
+                base_urls=base_urls,
+            )
+            stock_client = StockClient(session, self.logger)
+            price_count = self._count_prices(session)
+
+            db_timer = DBTimer(base_engine.engine)
+            start_time = time.perf_counter()
+            stock_client.update_jp_stock_prices(
+                max_workers, stock_factory=stock_factory)
+            session.commit()
+            wall_time = time.perf_counter() - start_time
+            db_time = db_timer.db_time
+
+            updated_count = self._count_updated(session)
+            rows = self._count_prices(session) - price_count
+            self.generator.delete(session)
+            session.commit()
+        finally:
+            session.close()
+
+        company_count = self.generator.n_companies
+        return {
+            'companies': company_count,
+            'crawler_companies': crawler_count,
+            'max_workers': max_workers,
+            'wall_time_sec': wall_time,
+            'db_time_sec': db_time,
+            'tickers_per_sec': company_count / wall_time
+            if wall_time > 0 else 0.0,
+            'updated': updated_count,
+            'failed': company_count - updated_count,
+            'rows': rows,
+        }
+
+    def _count_updated(
+        self,
+        session: object,
+    ) -> int:
+        """
+        株価データが最新日まで更新された合成データの企業数を返す
+        """
+        recent_dates = session.query(
+            StockPrice.company_id,
+            func.max(StockPrice.date).label('recent_date'),
+        ).filter(
+            StockPrice.company_id.like(f'{self.generator.id_prefix}%')
+        ).group_by(StockPrice.company_id).subquery()
+        return session.query(func.count()).select_from(recent_dates).filter(
+            recent_dates.c.recent_date >= self.generator.dates[-1].date()
+        ).scalar()
+
+    def _count_prices(
+        self,
+        session: object,
+    ) -> int:
+        """
+        合成データの株価データのレコード数を返す
+        """
+        return session.query(func.count(StockPrice.company_id)).filter(
+            StockPrice.company_id.like(f'{self.generator.id_prefix}%')
+        ).scalar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='スタブサーバーに対して株価データの取得・DB書き込みのベンチマークを実行する')
+    parser.add_argument('--companies', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--crawler-ratio', type=float, default=0.5)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='スタブサーバーの応答の遅延(秒)')
+    parser.add_argument('--error-rate', type=float, default=0.01,
+                        help='スタブサーバーが503を返す割合')
+    parser.add_argument('--max-requests-per-sec', type=float, default=None,
+                        help='スタブサーバーが429を返さない1秒あたりのリクエスト数')
+    parser.add_argument('--max-retries', type=int, default=3)
+    parser.add_argument('--backoff-base', type=float, default=0.1)
+    parser.add_argument('--output', default='ingest_benchmark.json',
+                        help='計測結果を出力するJSONファイル')
+    args = parser.parse_args()
+
+    logger = CommonLogger().get_application_logger(
+        __name__,
+    )
+    connect_args = get_connect_args_from_env()
+
+    # StockManagerは当日を基準に取得方法を判定するため、合成データの終了日は当日とする
+    generator = MarketDataGenerator(args.companies, args.years, args.seed,
+                                    id_prefix='I')
+    benchmark = IngestBenchmark(connect_args, logger, generator,
+                                args.crawler_ratio)
+    with StubDataServer(generator, args.latency, args.error_rate,
+                        args.max_requests_per_sec, seed=args.seed) as server:
+        result = benchmark.run(
+            server.get_base_urls(),
+            args.workers,
+            RetryPolicy(args.max_retries, args.backoff_base),
+        )
+        result.update({f'server_{key}': value
+                       for key, value in server.stats.items()})
+
+    logger.info(json.dumps(result))
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
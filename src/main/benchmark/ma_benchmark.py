@@ -0,0 +1,374 @@
+import os
+import sys
+import json
+import time
+import pathlib
+import argparse
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from logging import Logger
+from typing import Dict, List, Tuple
+from sqlalchemy import event
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent)))
+from benchmark.market_data_generator import MarketDataGenerator, get_connect_args_from_env  # noqa: #402
+from common.db.base_engine import BaseEngine  # noqa: #402
+from common.db.common_dao import CommonDao  # noqa: #402
+from common.logger.common_logger import CommonLogger  # noqa: #402
+from stock.dto.stock_dto import StockPriceMA  # noqa: #402
+from stock.main.ma_calculator import SMACalculator, EMACalculator, WMACalculator, IncrementalMACalculator  # noqa: #402
+from stock.main.ma_vector_calculator import VectorSMACalculator, VectorEMACalculator, VectorWMACalculator, MultiMACalculator  # noqa: #402
+from stock.main.stock_client import StockClient  # noqa: #402
+
+# ベンチマーク対象のCalculatorクラス(名前をキーとし、結果のJSONに出力する)
+CALCULATOR_CLASSES = {
+    'sql_sma': SMACalculator,
+    'sql_ema': EMACalculator,
+    'sql_wma': WMACalculator,
+    'numpy_sma': VectorSMACalculator,
+    'numpy_ema': VectorEMACalculator,
+    'numpy_wma': VectorWMACalculator,
+}
+
+# StockClient.ma_specsの全ての計算条件を一括で計算するCalculatorクラス(StockClient.calculate_ma()の計算経路)
+# 計算日数毎ではなくデータ規模毎に1回計測し、結果のspanはNoneとする
+MA_SPECS_CALCULATOR_CLASSES = {
+    'numpy_multi': MultiMACalculator,
+    'incremental': IncrementalMACalculator,
+}
+
+# 計測結果とベースラインを突き合わせるキー
+RESULT_KEYS = ('calculator', 'companies', 'years', 'span')
+
+
+class DBTimer(object):
+    """
+    SQL AlchemyのEngineのイベントにより、SQL文の実行時間(DB時間)の合計を計測するクラス
+
+    Attributes
+    ----------
+    db_time: float
+        計測開始からのSQL文の実行時間の合計(秒)
+    """
+    def __init__(
+        self,
+        engine: object,
+    ):
+        """
+        Parameters
+        ----------
+        engine: sqlalchemy.Engine
+            計測対象のEngineクラス
+        """
+        self.db_time = 0.0
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters,
+                        context, executemany):
+        conn.info.setdefault('query_start_time', []).append(
+            time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters,
+                       context, executemany):
+        self.db_time += time.perf_counter() - \
+            conn.info['query_start_time'].pop()
+
+
+def get_cases(
+    calculator_names: List[str],
+    spans: List[int],
+) -> List[Tuple[str, int]]:
+    """
+    計測条件(Calculatorクラスの名前, 計算日数)のリストを返す
+
+    MA_SPECS_CALCULATOR_CLASSESのCalculatorクラスは全ての計算条件を一括で計算するため、
+    計算日数をNoneとして1回のみ計測する
+
+    Parameters
+    ----------
+    calculator_names: List[str]
+        CALCULATOR_CLASSES・MA_SPECS_CALCULATOR_CLASSESのキーのリスト
+    spans: List[int]
+        移動平均の計算日数のリスト
+
+    Returns
+    ----------
+    cases: List[Tuple[str, int]]
+        (Calculatorクラスの名前, 計算日数)のリスト
+    """
+    cases = []
+    for calculator_name in calculator_names:
+        if calculator_name in MA_SPECS_CALCULATOR_CLASSES:
+            cases.append((calculator_name, None))
+        else:
+            cases += [(calculator_name, span) for span in spans]
+    return cases
+
+
+def run_case(
+    connect_args: Tuple,
+    calculator_name: str,
+    company_ids: List[str],
+    span: int,
+) -> Dict[str, float]:
+    """
+    1つのCalculatorクラス・計算日数について移動平均を計算し、実行時間等を計測する
+
+    ピークRSSを計測条件毎に計測するため、計測条件毎に新しいプロセスで実行する
+
+    Parameters
+    ----------
+    connect_args: Tuple
+        BaseEngineに渡すDB接続情報(ユーザー名, パスワード, ホスト, ポート番号, データベース名)
+    calculator_name: str
+        CALCULATOR_CLASSES・MA_SPECS_CALCULATOR_CLASSESのキー
+    company_ids: List[str]
+        計算対象の企業IDのリスト
+    span: int
+        移動平均の計算日数(MA_SPECS_CALCULATOR_CLASSESの場合はNoneとし、StockClient.ma_specsを計算する)
+
+    Returns
+    ----------
+    measurement: Dict[str, float]
+        実行時間・DB時間(秒)、行数、スループット(行/秒)、ピークRSS(MB)のディクショナリ
+    """
+    base_engine = BaseEngine(*connect_args)
+    db_timer = DBTimer(base_engine.engine)
+    session = base_engine.get_session()
+    logger = CommonLogger().get_application_logger(__name__)
+    try:
+        if calculator_name in MA_SPECS_CALCULATOR_CLASSES:
+            calculator = MA_SPECS_CALCULATOR_CLASSES[calculator_name](
+                session, logger, company_ids)
+            args = (StockClient.ma_specs,)
+        else:
+            calculator = CALCULATOR_CLASSES[calculator_name](
+                session, logger, company_ids)
+            args = (span,)
+        start_time = time.perf_counter()
+        rows = len(calculator.get_ma_values(*args))
+        wall_time = time.perf_counter() - start_time
+    finally:
+        session.close()
+        base_engine.dispose()
+
+    # Linuxではru_maxrssの単位はKB
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        'wall_time_sec': wall_time,
+        'db_time_sec': db_timer.db_time,
+        'rows': rows,
+        'rows_per_sec': rows / wall_time if wall_time > 0 else 0.0,
+        'peak_rss_mb': peak_rss,
+    }
+
+
+class MABenchmark(object):
+    """
+    移動平均のCalculatorクラスの実行時間・DB時間・スループット・ピークRSSを、
+    データ規模(企業数・年数)と計算日数の組み合わせ毎に計測するクラス
+
+    データ規模毎にMarketDataGeneratorの合成データをロードしてコミットし、計測後に削除する。
+    incrementalは夜間バッチと同様に最終日のみを計算させるため、前日までの移動平均をロードしてから計測する。
+    合成データの企業IDは接頭辞(id_prefix)で区別するため、ベンチマーク専用のDBで実行すること。
+
+    Attributes
+    ----------
+    connect_args: Tuple
+        BaseEngineに渡すDB接続情報
+    logger: logging.Logger
+        アプリケーションログ出力用のロガー
+    seed: int
+        合成データの乱数のシード
+    id_prefix: str
+        合成データの企業IDの接頭辞
+    """
+    def __init__(
+        self,
+        connect_args: Tuple,
+        logger: Logger,
+        seed: int = 0,
+        id_prefix: str = 'B',
+    ):
+        self.connect_args = connect_args
+        self.logger = logger
+        self.seed = seed
+        self.id_prefix = id_prefix
+
+    def run(
+        self,
+        sizes: List[Tuple[int, int]],
+        spans: List[int],
+        calculator_names: List[str] = None,
+    ) -> List[dict]:
+        """
+        データ規模・計算日数・Calculatorクラスの全ての組み合わせについて計測する
+
+        Parameters
+        ----------
+        sizes: List[Tuple[int, int]]
+            (企業数, 年数)のリスト
+        spans: List[int]
+            移動平均の計算日数のリスト
+        calculator_names: List[str]
+            計測対象のCALCULATOR_CLASSES・MA_SPECS_CALCULATOR_CLASSESのキーのリスト(指定しない場合は全て)
+
+        Returns
+        ----------
+        results: List[dict]
+            計測条件(calculator, companies, years, span)と計測結果のディクショナリのリスト
+        """
+        calculator_names = calculator_names if calculator_names is not None \
+            else list(CALCULATOR_CLASSES) + list(MA_SPECS_CALCULATOR_CLASSES)
+        base_engine = BaseEngine(*self.connect_args)
+        session = base_engine.get_session()
+        results = []
+        try:
+            for companies, years in sizes:
+                generator = MarketDataGenerator(
+                    companies, years, self.seed, id_prefix=self.id_prefix)
+                generator.delete(session)
+                generator.load(session, self.logger)
+                session.commit()
+                company_ids = [generator.get_company_id(i)
+                               for i in range(companies)]
+
+                for calculator_name, span in get_cases(calculator_names,
+                                                       spans):
+                    if calculator_name == 'incremental':
+                        self._load_ma_data(session, company_ids,
+                                           generator.dates[-2].date())
+                    with ProcessPoolExecutor(max_workers=1) as executor:
+                        measurement = executor.submit(
+                            run_case, self.connect_args, calculator_name,
+                            company_ids, span).result()
+                    result = {
+                        'calculator': calculator_name,
+                        'companies': companies,
+                        'years': years,
+                        'span': span,
+                    }
+                    result.update(measurement)
+                    self.logger.info(json.dumps(result))
+                    results.append(result)
+
+                generator.delete(session)
+                session.commit()
+        finally:
+            session.close()
+        return results
+
+    def _load_ma_data(
+        self,
+        session: object,
+        company_ids: List[str],
+        end_date: object,
+    ):
+        """
+        end_dateまでの移動平均をstockprice_maテーブルにロードし、IncrementalMACalculatorのウォーターマークとする
+
+        Parameters
+        ----------
+        session: sqlalchemy.Session
+            SQL AlchemyでDBを操作するためのSessionクラス
+        company_ids: List[str]
+            計算対象の企業IDのリスト
+        end_date: datetime.date
+            ロードする移動平均の最終日
+        """
+        ma_dtos = MultiMACalculator(
+            session, self.logger, company_ids
+        ).get_ma_values(StockClient.ma_specs, end_date=end_date)
+        CommonDao(session, StockPriceMA, self.logger).copy_load(
+            ma_dtos, ['company_id', 'date', 'ma_type'])
+        session.commit()
+
+
+def compare_with_baseline(
+    results: List[dict],
+    baseline: List[dict],
+    threshold: float = 0.2,
+) -> List[dict]:
+    """
+    計測結果をベースラインと比較し、実行時間がthresholdの割合を超えて増加した計測条件を返す
+
+    ベースラインに存在しない計測条件は比較しない
+
+    Parameters
+    ----------
+    results: List[dict]
+        MABenchmark.run()の計測結果
+    baseline: List[dict]
+        過去に保存したMABenchmark.run()の計測結果
+    threshold: float
+        許容する実行時間の増加率(0.2の場合は20%増加まで許容する)
+
+    Returns
+    ----------
+    regressions: List[dict]
+        計測条件と、ベースライン・今回の実行時間、増加率のディクショナリのリスト
+    """
+    baseline_times = {
+        tuple(res[key] for key in RESULT_KEYS): res['wall_time_sec']
+        for res in baseline
+    }
+    regressions = []
+    for res in results:
+        key = tuple(res[key] for key in RESULT_KEYS)
+        if key not in baseline_times:
+            continue
+        baseline_time = baseline_times[key]
+        ratio = res['wall_time_sec'] / baseline_time \
+            if baseline_time > 0 else float('inf')
+        if ratio > 1 + threshold:
+            regression = dict(zip(RESULT_KEYS, key))
+            regression.update({
+                'baseline_wall_time_sec': baseline_time,
+                'wall_time_sec': res['wall_time_sec'],
+                'ratio': ratio,
+            })
+            regressions.append(regression)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='移動平均のCalculatorクラスのベンチマークを実行する')
+    parser.add_argument('--sizes', nargs='+', default=['100x5', '500x15'],
+                        help='企業数x年数のリスト(例: 100x5 500x15)')
+    parser.add_argument('--spans', nargs='+', type=int, default=[5, 25, 75])
+    parser.add_argument('--calculators', nargs='+', default=None,
+                        choices=list(CALCULATOR_CLASSES) +
+                        list(MA_SPECS_CALCULATOR_CLASSES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='ma_benchmark.json',
+                        help='計測結果を出力するJSONファイル')
+    parser.add_argument('--baseline', default=None,
+                        help='比較対象のベースラインのJSONファイル')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='許容する実行時間の増加率')
+    args = parser.parse_args()
+
+    logger = CommonLogger().get_application_logger(
+        __name__,
+    )
+    connect_args = get_connect_args_from_env()
+    sizes = [tuple(int(value) for value in size.split('x'))
+             for size in args.sizes]
+
+    benchmark = MABenchmark(connect_args, logger, args.seed)
+    results = benchmark.run(sizes, args.spans, args.calculators)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    # ベースラインより遅くなった計測条件がある場合は、終了コード1で終了する
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(
+                results, json.load(f), args.threshold)
+        for regression in regressions:
+            logger.error(f'Regression: {json.dumps(regression)}')
+        sys.exit(1 if regressions else 0)
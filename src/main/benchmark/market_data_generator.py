@@ -0,0 +1,300 @@
+import os
+import sys
+import pathlib
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from logging import Logger
+from typing import Iterator, List, Tuple
+from sqlalchemy.orm import Session
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent)))
+from common.db.base_engine import BaseEngine  # noqa: #402
+from common.db.common_dao import CommonDao  # noqa: #402
+from common.logger.common_logger import CommonLogger  # noqa: #402
+from stock.dto.stock_dto import Company, StockPrice, StockPriceMA  # noqa: #402
+
+
+def get_connect_args_from_env() -> Tuple:
+    """
+    環境変数(POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST,
+    POSTGRES_PORT, POSTGRES_DB)から、BaseEngineに渡すDB接続情報を返す
+
+    Returns
+    ----------
+    connect_args: Tuple
+        (ユーザー名, パスワード, ホスト, ポート番号, データベース名)
+    """
+    return (
+        os.environ['POSTGRES_USER'],
+        os.environ['POSTGRES_PASSWORD'],
+        os.environ['POSTGRES_HOST'],
+        os.environ['POSTGRES_PORT'],
+        os.environ['POSTGRES_DB'],
+    )
+
+
+class MarketDataGenerator(object):
+    """
+    幾何ブラウン運動(GBM)に従う合成の株価データ(OHLCV)を生成し、company・stockpriceテーブルにロードする
+
+    本番規模のデータ(例: 4,000社 × 15年)に対するMA計算・DB書き込みの性能を計測するために使用する。
+    乱数は(seed, 企業の番号)から企業毎に生成するため、同じseed・終了日であれば企業数や生成順に依らず
+    各企業の株価データは同じとなり、1社分のみを生成することもできる(スタブサーバーで使用する)。
+
+    Attributes
+    ----------
+    n_companies: int
+        生成する企業数
+    dates: pd.DatetimeIndex
+        株価データの日付(終了日から遡ってyears年分の平日)
+    seed: int
+        乱数のシード
+    id_prefix: str
+        生成する企業IDの接頭辞(既存の企業IDと重複しないようにする)
+    """
+    trading_days = 252  # 1年あたりの立会日数
+    stock_code_offset = 10000  # 既存の4桁の銘柄コードと重複しないように5桁の銘柄コードとする
+
+    def __init__(
+        self,
+        n_companies: int,
+        years: int = 15,
+        seed: int = 0,
+        end_date: datetime.date = None,
+        id_prefix: str = 'S',
+    ):
+        """
+        Parameters
+        ----------
+        n_companies: int
+            生成する企業数
+        years: int
+            生成する株価データの年数
+        seed: int
+            乱数のシード
+        end_date: datetime.date
+            株価データの終了日(指定しない場合は当日). 再現性のためには明示的に指定する
+        id_prefix: str
+            生成する企業IDの接頭辞
+        """
+        self.n_companies = n_companies
+        self.seed = seed
+        self.id_prefix = id_prefix
+        end_date = pd.Timestamp(end_date if end_date is not None
+                                else datetime.date.today())
+        self.dates = pd.bdate_range(
+            end=end_date, periods=years * self.trading_days, name='Date')
+
+    def get_company_id(
+        self,
+        company_index: int,
+    ) -> str:
+        """
+        企業の番号から企業IDを返す
+        """
+        return f'{self.id_prefix}{company_index:06d}'
+
+    def get_stock_code(
+        self,
+        company_index: int,
+    ) -> str:
+        """
+        企業の番号から銘柄コードを返す
+        """
+        return str(self.stock_code_offset + company_index)
+
+    def get_company_index(
+        self,
+        stock_code: str,
+    ) -> int:
+        """
+        銘柄コードから企業の番号を返す(生成対象外の銘柄コードの場合はNone)
+        """
+        try:
+            company_index = int(stock_code) - self.stock_code_offset
+        except ValueError:
+            return None
+        if not (0 <= company_index < self.n_companies):
+            return None
+        return company_index
+
+    def get_company_records(self) -> List[dict]:
+        """
+        companyテーブルのレコードを、カラム名をキーとするディクショナリのリストとして返す
+
+        Returns
+        ----------
+        company_records: List[dict]
+            companyテーブルのカラム名をキーとするディクショナリのリスト
+        """
+        rng = np.random.default_rng(self.seed)
+        return [
+            {
+                'company_id': self.get_company_id(i),
+                'company_name': f'合成データ{i:06d}',
+                'stock_code': self.get_stock_code(i),
+                'country_code': 'JP',
+                'listed_market': '東証1部',
+                'foundation_date': datetime.datetime(
+                    int(rng.integers(1900, 2015)), 1, 1),
+                'longitude': float(rng.uniform(130.0, 145.0)),
+                'latitude': float(rng.uniform(31.0, 45.0)),
+            }
+            for i in range(self.n_companies)
+        ]
+
+    def generate_prices(
+        self,
+        company_index: int,
+    ) -> pd.DataFrame:
+        """
+        1社分の株価データを、StooqAPIが返すデータフレームと同じ形式で生成する
+
+        終値は年率のドリフト・ボラティリティを企業毎に乱数で定めたGBMに従い、
+        始値・高値・安値は終値のボラティリティに比例した日中の変動として生成する
+
+        Parameters
+        ----------
+        company_index: int
+            企業の番号
+
+        Returns
+        ----------
+        stock_df: pd.DataFrame
+            Dateをインデックスとし、Open, High, Low, Close, Volumeをカラムとするデータフレーム
+        """
+        rng = np.random.default_rng([self.seed, company_index])
+        n = len(self.dates)
+        dt = 1.0 / self.trading_days
+        initial_price = rng.lognormal(np.log(1500.0), 1.0)
+        drift = rng.normal(0.05, 0.1)
+        volatility = rng.uniform(0.15, 0.5)
+        daily_volatility = volatility * np.sqrt(dt)
+
+        log_returns = rng.normal((drift - volatility ** 2 / 2) * dt,
+                                 daily_volatility, n)
+        close = initial_price * np.exp(np.cumsum(log_returns))
+        prev_close = np.concatenate([[initial_price], close[:-1]])
+        open_ = prev_close * np.exp(rng.normal(0.0, daily_volatility * 0.3, n))
+        high = np.maximum(open_, close) * \
+            np.exp(np.abs(rng.normal(0.0, daily_volatility * 0.5, n)))
+        low = np.minimum(open_, close) * \
+            np.exp(-np.abs(rng.normal(0.0, daily_volatility * 0.5, n)))
+        volume = np.round(rng.lognormal(
+            np.log(rng.uniform(1e4, 1e6)), 0.5, n), -2)
+
+        return pd.DataFrame({
+            'Open': np.round(open_, 1),
+            'High': np.round(high, 1),
+            'Low': np.round(low, 1),
+            'Close': np.round(close, 1),
+            'Volume': volume,
+        }, index=self.dates)
+
+    def iter_price_records(self) -> Iterator[dict]:
+        """
+        全企業のstockpriceテーブルのレコードを、企業毎に生成して順次返す
+
+        Returns
+        ----------
+        price_records: Iterator[dict]
+            stockpriceテーブルのカラム名をキーとするディクショナリのイテレータ
+        """
+        dates = [date.date() for date in self.dates]
+        for i in range(self.n_companies):
+            company_id = self.get_company_id(i)
+            stock_df = self.generate_prices(i)
+            columns = zip(
+                stock_df['Open'].tolist(), stock_df['High'].tolist(),
+                stock_df['Low'].tolist(), stock_df['Close'].tolist(),
+                stock_df['Volume'].tolist())
+            for date, (open_, high, low, close, volume) in zip(dates, columns):
+                yield {
+                    'company_id': company_id,
+                    'date': date,
+                    'open_price': open_,
+                    'high_price': high,
+                    'low_price': low,
+                    'close_price': close,
+                    'volume': volume,
+                }
+
+    def load(
+        self,
+        session: Session,
+        logger: Logger,
+    ) -> Tuple[int, int]:
+        """
+        生成したデータをCommonDao.copy_load()によりcompany・stockpriceテーブルにロードする
+
+        主キー単位でマージするため、同じseedで再実行しても重複しない
+
+        Parameters
+        ----------
+        session: sqlalchemy.Session
+            SQL AlchemyでDBを操作するためのSessionクラス
+        logger: logging.Logger
+            アプリケーションログ出力用のロガー
+
+        Returns
+        ----------
+        company_count: int
+            ロードした企業数
+        price_count: int
+            ロードした株価データのレコード数
+        """
+        company_dao = CommonDao(session, Company, logger)
+        inserted, updated = company_dao.copy_load(
+            self.get_company_records(), ['company_id'])
+        company_count = inserted + updated
+        price_dao = CommonDao(session, StockPrice, logger)
+        inserted, updated = price_dao.copy_load(
+            self.iter_price_records(), ['company_id', 'date'])
+        price_count = inserted + updated
+        return company_count, price_count
+
+    def delete(
+        self,
+        session: Session,
+    ):
+        """
+        生成したデータ(企業IDが接頭辞で始まるレコード)をcompany・stockprice・stockprice_maテーブルから削除する
+
+        Parameters
+        ----------
+        session: sqlalchemy.Session
+            SQL AlchemyでDBを操作するためのSessionクラス
+        """
+        pattern = f'{self.id_prefix}%'
+        for dto_class in [StockPriceMA, StockPrice, Company]:
+            session.query(dto_class).filter(
+                dto_class.company_id.like(pattern)
+            ).delete(synchronize_session=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='合成の株価データをcompany・stockpriceテーブルにロードする')
+    parser.add_argument('--companies', type=int, default=4000)
+    parser.add_argument('--years', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--end-date', type=datetime.date.fromisoformat,
+                        default=None)
+    args = parser.parse_args()
+
+    session = BaseEngine(*get_connect_args_from_env()).get_session()
+
+    logger = CommonLogger().get_application_logger(
+        __name__,
+    )
+
+    generator = MarketDataGenerator(
+        args.companies, args.years, args.seed, args.end_date)
+    company_count, price_count = generator.load(session, logger)
+    session.commit()
+    logger.info(f'Loaded {company_count} companies and '
+                f'{price_count} stock prices')
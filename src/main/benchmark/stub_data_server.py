@@ -0,0 +1,315 @@
+import os
+import sys
+import time
+import random
+import pathlib
+import argparse
+import threading
+import datetime
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent)))
+from benchmark.market_data_generator import MarketDataGenerator  # noqa: #402
+
+
+class StubDataServer(object):
+    """
+    StooqのCSVダウンロードAPIとkabutan.jpの株価ページを模したローカルのHTTPサーバー
+
+    MarketDataGeneratorの合成データを返すため、実際のサイトにアクセスせずに
+    StockClient.update_jp_stock_prices()の負荷試験・ベンチマークを行うことができる。
+    応答の遅延・エラー率・流量制限(429)を設定し、HttpClientのリトライ・流量制御を含めて計測する。
+
+    Stooq: GET /q/d/l/?s=<銘柄コード>.JP&i=d
+        Date, Open, High, Low, Close, Volumeの日次CSV(日付の昇順)を返す
+    kabutan: GET /stock/kabuka?code=<銘柄コード>
+        最新日をstock_kabuka0、それ以前の日次データをstock_kabuka_dwmのテーブルとしたHTMLを返す
+
+    Attributes
+    ----------
+    generator: MarketDataGenerator
+        応答する株価データを生成するクラス(生成対象外の銘柄コードは404とする)
+    latency: float
+        応答までの遅延(秒). 0〜latencyの一様乱数を加えて応答する
+    error_rate: float
+        503を返すリクエストの割合(0〜1)
+    max_requests_per_sec: float
+        1秒あたりに受け付けるリクエスト数. 超過したリクエストにはRetry-After付きの429を返す(Noneの場合は制限しない)
+    kabutan_days: int
+        kabutanの株価ページに含める日数
+    stats: Dict[str, int]
+        requests(リクエスト数), errors(503の数), throttled(429の数), not_found(404の数)
+    """
+    stooq_path = '/q/d/l/'
+    kabutan_path = '/stock/kabuka'
+
+    def __init__(
+        self,
+        generator: MarketDataGenerator,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        max_requests_per_sec: float = None,
+        kabutan_days: int = 30,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        seed: int = 0,
+    ):
+        """
+        Parameters
+        ----------
+        generator: MarketDataGenerator
+            応答する株価データを生成するクラス
+        latency: float
+            応答までの遅延(秒)
+        error_rate: float
+            503を返すリクエストの割合(0〜1)
+        max_requests_per_sec: float
+            1秒あたりに受け付けるリクエスト数(Noneの場合は制限しない)
+        kabutan_days: int
+            kabutanの株価ページに含める日数
+        host: str
+            待ち受けるホスト
+        port: int
+            待ち受けるポート番号(0の場合は空いているポート番号を使用する)
+        seed: int
+            遅延・エラーの乱数のシード
+        """
+        self.generator = generator
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_requests_per_sec = max_requests_per_sec
+        self.kabutan_days = kabutan_days
+        self.stats = {'requests': 0, 'errors': 0,
+                      'throttled': 0, 'not_found': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), StubRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        サーバーのURL(例: http://127.0.0.1:8080)
+        """
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def get_base_urls(self) -> dict:
+        """
+        JpStockFactoryのbase_urlsに指定する、データソース毎のURLを返す
+        """
+        return {
+            'stooq': self.url + self.stooq_path,
+            'kabutan': self.url + self.kabutan_path,
+        }
+
+    def start(self):
+        """
+        別スレッドでリクエストの受け付けを開始する
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        """
+        フォアグラウンドでリクエストを受け付ける(コマンドラインから起動する場合に使用する)
+        """
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        """
+        リクエストの受け付けを停止し、ソケットを閉じる
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def admit(self) -> int:
+        """
+        リクエストを受け付けるかどうかを判定し、流量制限・エラーの場合はHTTPステータスコードを返す
+
+        Returns
+        ----------
+        status: int
+            429(流量制限), 503(エラー)またはNone(正常に応答する)
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.max_requests_per_sec is not None:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start = now
+                    self._window_requests = 0
+                self._window_requests += 1
+                if self._window_requests > self.max_requests_per_sec:
+                    self.stats['throttled'] += 1
+                    return 429
+            if self._random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 503
+            delay = self._random.uniform(0.0, self.latency)
+        time.sleep(self.latency + delay)
+        return None
+
+    def get_stooq_csv(
+        self,
+        stock_code: str,
+    ) -> str:
+        """
+        銘柄コードの株価データをStooqのCSV形式で返す(生成対象外の銘柄コードの場合はNone)
+        """
+        stock_df = self._get_prices(stock_code)
+        if stock_df is None:
+            return None
+        return stock_df.to_csv(date_format='%Y-%m-%d')
+
+    def get_kabutan_html(
+        self,
+        stock_code: str,
+    ) -> str:
+        """
+        銘柄コードの直近kabutan_days日分の株価データをkabutanの株価ページ形式で返す
+        (生成対象外の銘柄コードの場合はNone)
+        """
+        stock_df = self._get_prices(stock_code)
+        if stock_df is None:
+            return None
+        stock_df = stock_df.iloc[-(self.kabutan_days + 1):]
+        prev_close = stock_df['Close'].shift(1)
+        rows = []
+        for date, row, prev in zip(stock_df.index[1:],
+                                   stock_df.iloc[1:].itertuples(),
+                                   prev_close.iloc[1:]):
+            change = row.Close - prev
+            rows.append(
+                f'<tr><th scope="row"><time datetime="{date:%Y-%m-%d}">'
+                f'{date:%y/%m/%d}</time></th>'
+                f'<td>{row.Open:,.1f}</td><td>{row.High:,.1f}</td>'
+                f'<td>{row.Low:,.1f}</td><td>{row.Close:,.1f}</td>'
+                f'<td>{change:+,.1f}</td><td>{change / prev * 100:+.2f}</td>'
+                f'<td>{row.Volume:,.0f}</td></tr>'
+            )
+        # 日付の降順に並べ、最新日のみをstock_kabuka0のテーブルとする
+        rows.reverse()
+        return (
+            '<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8">'
+            f'<title>{stock_code}</title></head><body><div id="stockinfo">'
+            f'<table class="stock_kabuka0"><tbody>{rows[0]}</tbody></table>'
+            '<table class="stock_kabuka_dwm"><tbody>'
+            f'{"".join(rows[1:])}</tbody></table>'
+            '</div></body></html>'
+        )
+
+    def _get_prices(
+        self,
+        stock_code: str,
+    ) -> pd.DataFrame:
+        """
+        銘柄コードの株価データを生成する(生成対象外の銘柄コードの場合はNone)
+        """
+        company_index = self.generator.get_company_index(stock_code)
+        if company_index is None:
+            return None
+        return self.generator.generate_prices(company_index)
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    StubDataServerのリクエストを処理するハンドラ
+
+    HttpClientがKeep-Aliveでコネクションを再利用できるように、HTTP/1.1で応答する
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        stub = self.server.stub
+        status = stub.admit()
+        if status is not None:
+            headers = {'Retry-After': '1'} if status == 429 else {}
+            self._respond(status, 'text/plain', 'Stub error', headers)
+            return
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == stub.stooq_path:
+            stock_code = params.get('s', [''])[0].upper()
+            if stock_code.endswith('.JP'):
+                stock_code = stock_code[:-len('.JP')]
+            body = stub.get_stooq_csv(stock_code)
+            content_type = 'text/csv'
+        elif url.path == stub.kabutan_path:
+            body = stub.get_kabutan_html(params.get('code', [''])[0])
+            content_type = 'text/html; charset=utf-8'
+        else:
+            body = None
+
+        if body is None:
+            with stub._lock:
+                stub.stats['not_found'] += 1
+            self._respond(404, 'text/plain', 'Not Found')
+        else:
+            self._respond(200, content_type, body)
+
+    def _respond(
+        self,
+        status: int,
+        content_type: str,
+        body: str,
+        headers: dict = None,
+    ):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # リクエスト毎のアクセスログは出力しない
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Stooqとkabutanのスタブサーバーを起動する')
+    parser.add_argument('--companies', type=int, default=4000)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--end-date', type=datetime.date.fromisoformat,
+                        default=None)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-requests-per-sec', type=float, default=None)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    generator = MarketDataGenerator(
+        args.companies, args.years, args.seed, args.end_date)
+    server = StubDataServer(generator, args.latency, args.error_rate,
+                            args.max_requests_per_sec,
+                            host=args.host, port=args.port, seed=args.seed)
+    print(f'Serving {server.get_base_urls()}')
+    server.serve_forever()
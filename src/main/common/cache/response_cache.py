@@ -0,0 +1,284 @@
+import os
+import gzip
+import time
+import datetime
+import tempfile
+import threading
+from typing import Any, Callable, List, Tuple
+
+
+class CacheMissError(Exception):
+    """
+    オフラインモードで、キャッシュに該当するレスポンスが存在しない場合に送出する例外
+    """
+    pass
+
+
+class ResponseCache(object):
+    """
+    データソースから取得したレスポンス本文を、(データソース, 銘柄コード, 取得日)をキーとして
+    ローカルディスクにキャッシュするクラス
+
+    ジョブの再実行やテストの再実行でネットワークアクセスを行わないために使用する。
+    キャッシュは cache_dir/データソース/取得日(YYYYMMDD)/銘柄コード.gz にgzip圧縮して保存し、
+    ファイルの更新日時からttl秒を経過したキャッシュは使用しない。
+    キャッシュの合計サイズがmax_bytesを超えた場合は、更新日時の古いファイルから削除する。
+
+    offline=Trueの場合はネットワークアクセスを行わず、取得日に依らず最新のキャッシュを
+    TTLを無視して返す(リプレイモード). ネットワークに接続できない環境でのベンチマークに使用する。
+
+    Attributes
+    ----------
+    cache_dir: str
+        キャッシュを保存するディレクトリ
+    ttl: float
+        キャッシュの有効期間(秒)
+    max_bytes: int
+        キャッシュの合計サイズの上限(バイト)
+    offline: bool
+        キャッシュのみを使用するリプレイモードかどうか
+    """
+    suffix = '.gz'
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl: float = 24 * 60 * 60,
+        max_bytes: int = 1024 ** 3,
+        offline: bool = False,
+    ):
+        """
+        Parameters
+        ----------
+        cache_dir: str
+            キャッシュを保存するディレクトリ(存在しない場合は作成する)
+        ttl: float
+            キャッシュの有効期間(秒)
+        max_bytes: int
+            キャッシュの合計サイズの上限(バイト)
+        offline: bool
+            キャッシュのみを使用するリプレイモードかどうか
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._total_bytes = None  # 初回のput()時にディレクトリを走査して求める
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(
+        self,
+        source: str,
+        code: str,
+        fetch_date: datetime.date = None,
+    ) -> str:
+        """
+        キャッシュからレスポンス本文を取得する
+
+        Parameters
+        ----------
+        source: str
+            データソース名(例: stooq, kabutan)
+        code: str
+            銘柄コード
+        fetch_date: datetime.date
+            取得日(指定しない場合は当日)
+
+        Returns
+        ----------
+        text: str
+            キャッシュしたレスポンス本文(キャッシュが無い・期限切れの場合はNone)
+        """
+        if self.offline:
+            cache_path = self._find_latest_path(source, code)
+        else:
+            cache_path = self._get_path(source, code, fetch_date)
+            if not self._is_fresh(cache_path):
+                cache_path = None
+        if cache_path is None:
+            return None
+        try:
+            with gzip.open(cache_path, 'rt', encoding='utf-8') as f:
+                return f.read()
+        except (OSError, EOFError):
+            # 他スレッドによる削除や書き込み途中のファイルはキャッシュ無しとして扱う
+            return None
+
+    def put(
+        self,
+        source: str,
+        code: str,
+        text: str,
+        fetch_date: datetime.date = None,
+    ):
+        """
+        レスポンス本文をキャッシュに保存し、上限サイズを超えた場合は古いキャッシュを削除する
+
+        一時ファイルに書き込んでからリネームするため、読み込み中のスレッドが書き込み途中のファイルを参照することは無い
+
+        Parameters
+        ----------
+        source: str
+            データソース名(例: stooq, kabutan)
+        code: str
+            銘柄コード
+        text: str
+            レスポンス本文
+        fetch_date: datetime.date
+            取得日(指定しない場合は当日)
+        """
+        cache_path = self._get_path(source, code, fetch_date)
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(text.encode('utf-8')))
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, _, size in self._scan())
+            else:
+                self._total_bytes += os.path.getsize(cache_path)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def get_or_fetch(
+        self,
+        source: str,
+        code: str,
+        fetch: Callable[[], str],
+        parse: Callable[[str], Any] = None,
+    ) -> Any:
+        """
+        キャッシュが存在する場合はキャッシュを返し、存在しない場合はfetchを呼び出して取得した本文をキャッシュする
+
+        parseを指定した場合は本文をparseで変換した結果を返し、parseが例外を送出した本文はキャッシュしない。
+        HTTPステータスが200でも本文がエラーメッセージ(例: Stooqの流量制限)の場合があるため、
+        不正な本文をキャッシュして同日中の再実行・オフラインモードで再利用しないようにする。
+        キャッシュ済みの本文がparseで変換できない場合は、オフラインモード以外では再取得する。
+
+        Parameters
+        ----------
+        source: str
+            データソース名(例: stooq, kabutan)
+        code: str
+            銘柄コード
+        fetch: Callable[[], str]
+            データソースからレスポンス本文を取得する関数
+        parse: Callable[[str], Any]
+            レスポンス本文を検証・変換する関数(不正な本文の場合は例外を送出する)
+
+        Returns
+        ----------
+        result: Any
+            レスポンス本文(parseを指定した場合はparseの戻り値)
+
+        Raises
+        ----------
+        CacheMissError
+            オフラインモードでキャッシュが存在しない場合
+        """
+        text = self.get(source, code)
+        if text is not None:
+            if parse is None:
+                return text
+            try:
+                return parse(text)
+            except Exception:
+                if self.offline:
+                    raise
+        elif self.offline:
+            raise CacheMissError(f'No cached response for {source}/{code}')
+        text = fetch()
+        result = parse(text) if parse is not None else text
+        self.put(source, code, text)
+        return result
+
+    def _get_path(
+        self,
+        source: str,
+        code: str,
+        fetch_date: datetime.date = None,
+    ) -> str:
+        """
+        キャッシュのキーからキャッシュファイルのパスを返す
+        """
+        fetch_date = fetch_date if fetch_date is not None \
+            else datetime.date.today()
+        return os.path.join(self.cache_dir, source,
+                            fetch_date.strftime('%Y%m%d'),
+                            f'{code}{self.suffix}')
+
+    def _find_latest_path(
+        self,
+        source: str,
+        code: str,
+    ) -> str:
+        """
+        取得日に依らず、指定のデータソース・銘柄コードの最新のキャッシュファイルのパスを返す
+        """
+        source_dir = os.path.join(self.cache_dir, source)
+        if not os.path.isdir(source_dir):
+            return None
+        for date_dir in sorted(os.listdir(source_dir), reverse=True):
+            cache_path = os.path.join(source_dir, date_dir,
+                                      f'{code}{self.suffix}')
+            if os.path.isfile(cache_path):
+                return cache_path
+        return None
+
+    def _is_fresh(
+        self,
+        cache_path: str,
+    ) -> bool:
+        """
+        キャッシュファイルが存在し、更新日時からttl秒以内かどうかを返す
+        """
+        try:
+            mtime = os.path.getmtime(cache_path)
+        except OSError:
+            return False
+        return (time.time() - mtime) <= self.ttl
+
+    def _scan(self) -> List[Tuple[str, float, int]]:
+        """
+        キャッシュディレクトリ内の全てのキャッシュファイルの(パス, 更新日時, サイズ)のリストを返す
+        """
+        entries = []
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if not file_name.endswith(self.suffix):
+                    continue
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                entries.append((file_path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self):
+        """
+        期限切れのキャッシュを削除し、合計サイズがmax_bytes以下となるまで更新日時の古い順に削除する
+
+        ロックを取得した状態で呼び出す
+        """
+        now = time.time()
+        entries = sorted(self._scan(), key=lambda entry: entry[1])
+        total_bytes = sum(size for _, _, size in entries)
+        for file_path, mtime, size in entries:
+            if (total_bytes <= self.max_bytes) and \
+               ((now - mtime) <= self.ttl):
+                continue
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            total_bytes -= size
+        self._total_bytes = total_bytes
@@ -0,0 +1,210 @@
+from logging import Logger
+from typing import Iterable, List, Tuple, Union
+from sqlalchemy.dialects import postgresql
+
+
+class AsyncCommonDao(object):
+    """
+    CommonDaoのupsert()・delsert()を、asyncpgのコネクションに対して非同期で行う
+
+    AsyncEngine.get_session()で取得したトランザクション中のコネクションを受け取り、
+    DTOクラスはテーブル名・カラム名・型の取得にのみ使用する(ORMのSessionは使用しない)。
+    UPSERTはカラム毎の配列をunnest()で展開する1文のINSERT ... ON CONFLICTで行い、
+    全DEL全INSはCOPY(バイナリ形式)でステージングテーブルへロードしてから入れ替える
+    """
+    # サーバー側で値を設定するタイムスタンプカラム(DTOの値は使用しない)
+    timestamp_columns = ['ins_ts', 'upd_ts']
+
+    def __init__(
+        self,
+        connection: object,
+        dto_class: object,
+        logger: Logger,
+    ):
+        """
+        Parameters
+        ----------
+        connection: asyncpg.Connection
+            AsyncEngine.get_session()で取得したトランザクション中のコネクション
+        dto_class: sqlalchemy.DeclarativeMeta
+            処理対象テーブルのDTOクラス
+        logger: logging.Logger
+            アプリケーションログ出力用のロガー
+        """
+        self.connection = connection
+        self.dto_class = dto_class
+        self.logger = logger
+
+    async def delsert(
+        self,
+        dtos: Iterable[Union[object, dict]],
+        primary_keys: List[str],
+    ):
+        """
+        元のレコードを全て削除し、与えられたDTOリストについて全て挿入する
+
+        Parameters
+        ----------
+        dtos: Iterable[Union[sqlalchemy.DeclarativeMeta, dict]]
+            全DEL全INS対象のDTO(またはディクショナリ)のリスト
+        primary_keys: List[str]
+            対象テーブルの主キーのカラム名のリスト
+        """
+        table_name = self.dto_class.__tablename__
+        staging_name = f'{table_name}_staging'
+        column_names = self._get_column_names()
+        columns = ', '.join(column_names)
+
+        old_count = await self.connection.fetchval(
+            f'SELECT count({primary_keys[0]}) FROM {table_name}')
+        self.logger.info(f'Delete {old_count} records '
+                         f'from {table_name} table')
+
+        # 同名の永続テーブルを誤って参照・削除しないよう、一時テーブルのスキーマ(pg_temp)で修飾する
+        await self.connection.execute(
+            f'DROP TABLE IF EXISTS pg_temp.{staging_name}')
+        await self.connection.execute(
+            f'CREATE TEMP TABLE pg_temp.{staging_name} '
+            f'(LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP')
+        records = self._to_tuples(dtos)
+        await self.connection.copy_records_to_table(
+            staging_name, records=records, columns=column_names,
+            schema_name='pg_temp')
+        await self.connection.execute(f'DELETE FROM {table_name}')
+        await self.connection.execute(
+            f'INSERT INTO {table_name} ({columns}) '
+            f'SELECT {columns} FROM pg_temp.{staging_name}')
+
+        self.logger.info(f'Insert {len(records)} records '
+                         f'into {table_name} table')
+
+    async def upsert(
+        self,
+        dtos: Iterable[Union[object, dict]],
+        primary_keys: List[str],
+        batch_size: int = 10000,
+    ) -> Tuple[int, int]:
+        """
+        与えられたDTOリストに対して、主キーを元にテーブルに存在するか判定し、
+        存在するレコードについてはUPDATE、存在しないレコードについてはINSERTを行う
+
+        CommonDao.upsert()と同様に、UPDATE時はins_tsを書き換えず、upd_tsのみを現在日時で更新する
+
+        Parameters
+        ----------
+        dtos: Iterable[Union[sqlalchemy.DeclarativeMeta, dict]]
+            UPSERT対象のDTO(またはカラム名をキーとするディクショナリ)のリスト
+        primary_keys: List[str]
+            対象テーブルの主キーのカラム名のリスト
+        batch_size: int
+            1文のINSERTでまとめて送信するレコード数
+
+        Returns
+        ----------
+        inserted_count: int
+            INSERTされたレコード数
+        updated_count: int
+            UPDATEされたレコード数
+        """
+        column_names = self._get_column_names()
+        # 同一主キーのレコードが1文内に複数あるとエラーとなるため、後勝ちで重複を除く
+        key_indexes = [column_names.index(p_key) for p_key in primary_keys]
+        upsert_records = {}
+        for record in self._to_tuples(dtos):
+            upsert_records[tuple(record[i] for i in key_indexes)] = record
+        records = list(upsert_records.values())
+
+        upsert_sql = self._build_upsert_sql(primary_keys)
+        inserted_count = 0
+        for start in range(0, len(records), batch_size):
+            # レコードのリストをカラム毎の配列に変換して送信する
+            column_values = [list(values) for values
+                             in zip(*records[start:start + batch_size])]
+            results = await self.connection.fetch(upsert_sql, *column_values)
+            inserted_count += sum(1 for res in results if res['inserted'])
+        updated_count = len(records) - inserted_count
+
+        self.logger.info(f'Updated {updated_count} records '
+                         f'on {self.dto_class.__tablename__} table')
+        self.logger.info(f'Insert {inserted_count} records '
+                         f'into {self.dto_class.__tablename__} table')
+        return inserted_count, updated_count
+
+    def _build_upsert_sql(
+        self,
+        primary_keys: List[str],
+    ) -> str:
+        """
+        カラム毎の配列を引数として受け取る、INSERT ... ON CONFLICT文を生成する
+
+        Parameters
+        ----------
+        primary_keys: List[str]
+            対象テーブルの主キーのカラム名のリスト
+
+        Returns
+        ----------
+        upsert_sql: str
+            $1, $2, ...にカラム毎の配列を渡すINSERT ... ON CONFLICT文
+        """
+        dialect = postgresql.dialect()
+        table = self.dto_class.__table__
+        column_names = self._get_column_names()
+        # unnest()に渡す配列は、カラムの型の配列型にキャストする
+        unnest_args = ', '.join(
+            f'${i}::{table.columns[name].type.compile(dialect=dialect)}[]'
+            for i, name in enumerate(column_names, start=1))
+        # 主キーとins_tsはUPDATE対象外とし、upd_tsは現在日時で更新する
+        update_columns = ', '.join(
+            [f'{name} = EXCLUDED.{name}' for name in column_names
+             if name not in primary_keys] + ['upd_ts = now()'])
+        return (f'INSERT INTO {table.name} ({", ".join(column_names)}) '
+                f'SELECT * FROM unnest({unnest_args}) '
+                f'ON CONFLICT ({", ".join(primary_keys)}) '
+                f'DO UPDATE SET {update_columns} '
+                f'RETURNING (xmax = 0) AS inserted')
+
+    def _get_column_names(self) -> List[str]:
+        """
+        対象テーブルのカラム名のうち、DTOから値を設定するカラム名のリストを返す
+
+        Returns
+        ----------
+        column_names: List[str]
+            DTOから値を設定するカラム名のリスト
+        """
+        return [
+            column.name for column in self.dto_class.__table__.columns
+            if column.name not in self.timestamp_columns
+        ]
+
+    def _to_tuples(
+        self,
+        dtos: Iterable[Union[object, dict]],
+    ) -> List[tuple]:
+        """
+        DTO(またはディクショナリ)を、_get_column_names()の順に値を並べたタプルのリストに変換する
+
+        バイナリ形式のCOPYではNaNがNULLとならないため、NaNはNoneに変換する
+
+        Parameters
+        ----------
+        dtos: Iterable[Union[sqlalchemy.DeclarativeMeta, dict]]
+            変換対象のDTO(またはディクショナリ)のリスト
+
+        Returns
+        ----------
+        records: List[tuple]
+            カラムの値のタプルのリスト
+        """
+        column_names = self._get_column_names()
+        records = []
+        for dto in dtos:
+            if isinstance(dto, dict):
+                values = (dto.get(name) for name in column_names)
+            else:
+                values = (getattr(dto, name) for name in column_names)
+            records.append(tuple(
+                None if (value is not None) and (value != value) else value
+                for value in values))
+        return records
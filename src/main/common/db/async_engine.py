@@ -0,0 +1,115 @@
+import contextlib
+from typing import AsyncIterator, Union
+
+# asyncpgがインストールされていない環境では、非同期のDBアクセスのみ使用不可とする
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+
+class AsyncEngine(object):
+    """
+    asyncioのイベントループからDBを操作するための、asyncpgの接続プールを提供する
+
+    BaseEngineと同じ接続情報を受け取り、BaseEngineのSessionの代わりにトランザクションを開始した
+    asyncpgのコネクションを提供する。SQL Alchemy 1.3はasyncioに対応していないため、asyncpgを直接使用する。
+    HTTPリクエストとDBへの書き込みを1つのイベントループで並行して行う処理で使用する。
+
+    Attributes
+    ----------
+    dsn: str
+        DBの接続文字列
+    pool: asyncpg.pool.Pool
+        接続プール(初回のget_pool()呼び出し時に生成する)
+
+    References
+    ----------
+    asyncpg Documents(Connection Pools):
+        https://magicstack.github.io/asyncpg/current/api/index.html#connection-pools
+    """
+    def __init__(
+        self,
+        user: str,
+        password: str,
+        host: str,
+        port: Union[int, str],
+        db_name: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        statement_timeout: int = None,
+    ):
+        """
+        Parameters
+        ----------
+        user: str
+            接続ユーザー名
+        password: str
+            接続パスワード
+        host: str
+            DBのホスト
+        port: Union[int, str]
+            DBのポート番号
+        db_name: str
+            データベース名
+        min_size: int
+            接続プールで常に保持するコネクション数
+        max_size: int
+            接続プールで保持するコネクション数の上限
+        statement_timeout: int
+            SQL文のタイムアウト(ミリ秒). 指定しない場合はDBの設定に従う
+        """
+        if asyncpg is None:
+            raise ImportError('asyncpg is required for AsyncEngine')
+        self.dsn = f'postgresql://{user}:{password}@{host}:{port}/{db_name}'
+        self.min_size = min_size
+        self.max_size = max_size
+        self.server_settings = {}
+        if statement_timeout is not None:
+            self.server_settings['statement_timeout'] = \
+                str(int(statement_timeout))
+        self.pool = None
+
+    async def get_pool(self) -> 'asyncpg.pool.Pool':
+        """
+        接続プールを取得する(未生成の場合は生成する)
+
+        Returns
+        ----------
+        pool: asyncpg.pool.Pool
+            接続プール
+        """
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                self.dsn,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                server_settings=self.server_settings,
+            )
+        return self.pool
+
+    @contextlib.asynccontextmanager
+    async def get_session(self) -> AsyncIterator['asyncpg.Connection']:
+        """
+        接続プールからコネクションを取得し、トランザクションを開始する
+
+        async withブロックを正常に抜けた場合はコミットし、例外の場合はロールバックする
+
+        Returns
+        ----------
+        connection: asyncpg.Connection
+            トランザクションを開始したコネクション
+            例) async with async_engine.get_session() as connection:
+        """
+        pool = await self.get_pool()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                yield connection
+
+    async def close(self):
+        """
+        接続プールのコネクションを全て閉じる
+        """
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
@@ -1,16 +1,67 @@
+import os
+import threading
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from typing import Union
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker, scoped_session
+from typing import Dict, Tuple, Union
+
+# DSN・接続プール設定毎に生成済みのEngine・Sessionファクトリ・scoped_sessionを保持する(プロセス内で共有する)
+_engine_cache: Dict[Tuple, Tuple[Engine, sessionmaker, scoped_session]] = {}
+# 生成済みのEngine毎に、生成時の接続情報と接続プール設定を保持する(子プロセスで同じ設定のEngineを生成するため)
+_engine_settings: Dict[Engine, Tuple[Tuple, dict]] = {}
+_engine_cache_lock = threading.Lock()
+
+
+def get_engine_settings(
+    engine: Engine,
+) -> Tuple[Tuple, dict]:
+    """
+    BaseEngineが生成したEngineについて、生成時の接続情報と接続プール設定を返す
+
+    プロセスプールの子プロセスで、親プロセスと同じ設定(statement_timeout等)の
+    BaseEngineを生成するために使用する
+
+    Parameters
+    ----------
+    engine: sqlalchemy.Engine
+        BaseEngineが生成したEngineクラス(Session.get_bind()の戻り値)
+
+    Returns
+    ----------
+    connect_args: Tuple
+        (ユーザー名, パスワード, ホスト, ポート番号, データベース名)
+    engine_kwargs: dict
+        pool_size, max_overflow, pool_pre_ping, pool_recycle,
+        statement_timeoutのディクショナリ
+    """
+    with _engine_cache_lock:
+        if engine not in _engine_settings:
+            raise ValueError('Engine is not created by BaseEngine')
+        connect_args, engine_kwargs = _engine_settings[engine]
+    return connect_args, dict(engine_kwargs)
 
 
 class BaseEngine(object):
     """
     SQL AlchemyでDBを操作するためのSessionクラスを構築する
 
+    Engine(接続プール)はDSN・接続プール設定毎にモジュール内でキャッシュし、同じ設定のBaseEngineを
+    複数回生成しても接続プールを共有する。これにより、複数のスレッド・Calculatorクラスから
+    BaseEngineを生成しても、再接続せずにプール済みのコネクションを再利用する。
+    fork()で生成した子プロセスが親プロセスのコネクションを使用しないように、キャッシュはプロセスID毎とする。
+
     Attributes
     ----------
     engine: sqlalchemy.Engine
         SessionクラスがDB接続に使用するEngineクラス
+    session_factory: sqlalchemy.orm.sessionmaker
+        engineに接続するSessionクラスを生成するファクトリ
+    scoped_session: sqlalchemy.orm.scoped_session
+        スレッド毎のSessionクラスを管理するレジストリ(同じEngineのBaseEngine間で共有する)
+    connect_args: Tuple
+        (ユーザー名, パスワード, ホスト, ポート番号, データベース名)
+    engine_kwargs: dict
+        接続プール設定とstatement_timeoutのディクショナリ
 
     References
     ----------
@@ -18,6 +69,8 @@ class BaseEngine(object):
         https://docs.sqlalchemy.org/en/13/core/engines.html
     SQL Alchemy Documents(Session Basics):
         https://docs.sqlalchemy.org/en/13/orm/session_basics.html
+    SQL Alchemy Documents(Connection Pooling):
+        https://docs.sqlalchemy.org/en/13/core/pooling.html
     """
     def __init__(
         self,
@@ -26,10 +79,17 @@ class BaseEngine(object):
         host: str,
         port: Union[int, str],
         db_name: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_pre_ping: bool = True,
+        pool_recycle: int = 1800,
+        statement_timeout: int = None,
     ):
         """
         データベース接続情報を受け取り、create_engine()でEngineクラスを取得する
 
+        同じ接続情報・接続プール設定のEngineが生成済みの場合は、生成済みのEngineを使用する
+
         Parameters
         ----------
         user: str
@@ -42,9 +102,50 @@ class BaseEngine(object):
             DBのポート番号
         db_name: str
             データベース名
+        pool_size: int
+            接続プールで保持するコネクション数
+        max_overflow: int
+            pool_sizeを超えて一時的に接続できるコネクション数
+        pool_pre_ping: bool
+            プールからコネクションを取り出す際に、接続が有効かどうかを確認するかどうか
+        pool_recycle: int
+            コネクションを再接続するまでの秒数(DB・ネットワーク機器によるアイドル切断を避ける)
+        statement_timeout: int
+            SQL文のタイムアウト(ミリ秒). 指定しない場合はDBの設定に従う
         """
+        self.connect_args = (user, password, host, port, db_name)
+        self.engine_kwargs = {
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_pre_ping': pool_pre_ping,
+            'pool_recycle': pool_recycle,
+            'statement_timeout': statement_timeout,
+        }
         conn_db = f'postgresql://{user}:{password}@{host}:{port}/{db_name}'
-        self.engine = create_engine(conn_db, echo=False)
+        self._cache_key = (os.getpid(), conn_db, pool_size, max_overflow,
+                           pool_pre_ping, pool_recycle, statement_timeout)
+        with _engine_cache_lock:
+            if self._cache_key not in _engine_cache:
+                connect_args = {}
+                if statement_timeout is not None:
+                    connect_args['options'] = \
+                        f'-c statement_timeout={int(statement_timeout)}'
+                engine = create_engine(
+                    conn_db,
+                    echo=False,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow,
+                    pool_pre_ping=pool_pre_ping,
+                    pool_recycle=pool_recycle,
+                    connect_args=connect_args,
+                )
+                session_factory = sessionmaker(bind=engine)
+                _engine_cache[self._cache_key] = (
+                    engine, session_factory, scoped_session(session_factory))
+                _engine_settings[engine] = (self.connect_args,
+                                            self.engine_kwargs)
+            self.engine, self.session_factory, self.scoped_session = \
+                _engine_cache[self._cache_key]
 
     def get_session(self):
         """
@@ -55,5 +156,27 @@ class BaseEngine(object):
         session: sqlalchemy.Session
             SQL AlchemyでDBを操作するためのSessionクラス
         """
-        Session = sessionmaker(bind=self.engine)
-        return Session()
+        return self.session_factory()
+
+    def get_scoped_session(self) -> scoped_session:
+        """
+        スレッド毎に異なるSessionクラスを返すscoped_sessionを取得する
+
+        複数のスレッドからDBを操作する場合に使用し、各スレッドはscoped_session()の呼び出しにより
+        自身のスレッドのSessionクラスを取得する。処理が完了したスレッドはremove()を呼び出す
+
+        Returns
+        ----------
+        session_registry: sqlalchemy.orm.scoped_session
+            スレッド毎のSessionクラスを管理するレジストリ
+        """
+        return self.scoped_session
+
+    def dispose(self):
+        """
+        接続プールのコネクションを全て閉じ、キャッシュからEngineを削除する
+        """
+        with _engine_cache_lock:
+            _engine_cache.pop(self._cache_key, None)
+            _engine_settings.pop(self.engine, None)
+        self.engine.dispose()
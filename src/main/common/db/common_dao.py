@@ -1,7 +1,19 @@
+import io
+import os
+import sys
+import csv
+import pathlib
 from logging import Logger
-from typing import List
-from sqlalchemy import func
+from typing import Iterable, Iterator, List, Tuple, Union
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import literal_column
+from sqlalchemy.dialects.postgresql import insert
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent)))
+from common.metrics.metrics_recorder import MetricsRecorder  # noqa: #402
 
 
 class CommonDao(object):
@@ -14,12 +26,24 @@ class CommonDao(object):
     1. 元のレコードを全て削除し、与えられたDTOリストについて全て挿入する(全DEL全INS)
     2. 与えられたDTOリストに対して、主キーを元にテーブルに存在するか判定し、
        存在するレコードについてはUPDATE、存在しないレコードについてはINSERTを行う(UPSERT)
+    大量レコードのロードにはCOPYを使用するcopy_load()を用いる
+
+    UPSERT・COPYはPostgreSQLのINSERT ... ON CONFLICT・COPYを使用するため、PostgreSQL専用とする
+    日付の年単位のRANGEパーティションテーブルについては、年毎のパーティションの作成と、
+    全DEL全INS時のTRUNCATEによる削除をサポートする
+    各メソッドの処理時間・処理レコード数はMetricsRecorderにより計測する
     """
+    # サーバー側で値を設定するタイムスタンプカラム(DTOの値は使用しない)
+    timestamp_columns = ['ins_ts', 'upd_ts']
+    # 年単位のパーティション名の書式(マイグレーションで作成するパーティションと合わせる)
+    year_partition_format = '{table_name}_y{year}'
+
     def __init__(
         self,
         session: Session,
         dto_class: object,
         logger: Logger,
+        metrics: MetricsRecorder = None,
     ):
         """
         SQL AlchemyでDBを操作するためのセッション・DTOとアプリケーションログ出力用のロガーを受け取る
@@ -32,77 +56,385 @@ class CommonDao(object):
             処理対象テーブルのDTOクラス
         logger: logging.Logger
             アプリケーションログ出力用のロガー
+        metrics: MetricsRecorder
+            処理時間・処理レコード数を計測するクラス(指定しない場合は計測値を出力しない)
         """
         self.session = session
         self.dto_class = dto_class
         self.logger = logger
+        self.metrics = metrics if metrics is not None else MetricsRecorder()
 
     def delsert(
         self,
-        dtos: List[object],
+        dtos: Iterable[Union[object, dict]],
         primary_keys: List[str],
     ):
         """
         元のレコードを全て削除し、与えられたDTOリストについて全て挿入する
 
+        大量レコードの全件洗い替えを想定し、ORMのUnit of Workを経由せずに
+        copy_load()によりCOPYでステージングテーブルへロードしてから入れ替える
+
         Parameters
         ----------
-        dtos: List[sqlalchemy.DeclarativeMeta]
-            全DEL全INS対象のDTOリスト
-        """
-        # 削除レコード数と挿入レコード数をロギングする
-        primary_key = f'self.dto_class.{primary_keys[0]}'
-        old_count = \
-            self.session.query(func.count(eval(primary_key))).scalar()
-        # DELETE
-        self.logger.info(f'Delete {old_count} records '
-                         f'from {self.dto_class.__tablename__} table')
-        self.session.query(self.dto_class).delete()
-        # INSERT
-        self.logger.info(f'Insert {len(dtos)} records '
-                         f'into {self.dto_class.__tablename__} table')
-        self.session.add_all(dtos)
+        dtos: Iterable[Union[sqlalchemy.DeclarativeMeta, dict]]
+            全DEL全INS対象のDTO(またはディクショナリ)のリスト
+        primary_keys: List[str]
+            対象テーブルの主キーのカラム名のリスト
+        """
+        with self.metrics.timer('common_dao.delsert',
+                                self._get_metric_tags()) as timer:
+            # 削除レコード数と挿入レコード数をロギングする
+            old_count = self.session.query(
+                func.count(getattr(self.dto_class, primary_keys[0]))).scalar()
+            self.logger.info(f'Delete {old_count} records '
+                             f'from {self.dto_class.__tablename__} table')
+            inserted_count, _ = self.copy_load(
+                dtos, primary_keys, replace=True)
+            self.logger.info(f'Insert {inserted_count} records '
+                             f'into {self.dto_class.__tablename__} table')
+            timer.rows = inserted_count
 
-    def upsert(
+    def copy_load(
         self,
-        dtos: List[object],
+        dtos: Iterable[Union[object, dict]],
         primary_keys: List[str],
+        replace: bool = False,
+        chunk_size: int = 100000,
+    ) -> Tuple[int, int]:
+        """
+        与えられたDTOリストをpsycopg2のcopy_expert()によりステージングテーブルへロードし、
+        1文で対象テーブルへ反映する
+
+        ステージングテーブルは対象テーブルと同じ定義の一時テーブルとし、トランザクション終了時に削除される。
+        chunk_size件毎にメモリ上のCSVバッファへ書き出してCOPYするため、
+        DTOはジェネレータで渡すことでメモリ使用量を抑えることができる。
+        replace=Falseの場合は同一主キーのレコードが入力内で重複しないことを前提とする。
+
+        Parameters
+        ----------
+        dtos: Iterable[Union[sqlalchemy.DeclarativeMeta, dict]]
+            ロード対象のDTO(またはディクショナリ)のリスト
+        primary_keys: List[str]
+            対象テーブルの主キーのカラム名のリスト
+        replace: bool
+            Trueの場合は対象テーブルの全レコードを削除してから挿入し(全DEL全INS)、
+            Falseの場合はINSERT ... ON CONFLICTにより主キー単位でマージする(UPSERT)
+        chunk_size: int
+            1回のCOPYで送信するレコード数
+
+        Returns
+        ----------
+        inserted_count: int
+            INSERTされたレコード数
+        updated_count: int
+            UPDATEされたレコード数
+        """
+        with self.metrics.timer('common_dao.copy_load',
+                                self._get_metric_tags()) as timer:
+            self.session.flush()
+            table_name = self.dto_class.__tablename__
+            # 同名の永続テーブルを誤って参照・削除しないよう、一時テーブルのスキーマ(pg_temp)で修飾する
+            staging_name = f'pg_temp.{table_name}_staging'
+            column_names = self._get_column_names()
+            columns = ', '.join(column_names)
+            connection = self.session.connection()
+            connection.execute(text(f'DROP TABLE IF EXISTS {staging_name}'))
+            connection.execute(text(
+                f'CREATE TEMP TABLE {staging_name} '
+                f'(LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP'))
+
+            # COPY ... FROM STDINはDBAPI(psycopg2)のカーソルから実行する
+            cursor = connection.connection.cursor()
+            copy_sql = f'COPY {staging_name} ({columns}) FROM STDIN ' \
+                       f'WITH (FORMAT csv)'
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            row_count = 0
+            for record in self._iter_records(dtos):
+                # CSV形式ではクォートされない空文字がNULLとなるので、NoneとNaNは空文字で書き出す
+                writer.writerow([
+                    None if (value is None) or (value != value) else value
+                    for value in (record[name] for name in column_names)
+                ])
+                row_count += 1
+                if row_count % chunk_size == 0:
+                    self._copy_buffer(cursor, copy_sql, buffer)
+            self._copy_buffer(cursor, copy_sql, buffer)
+            cursor.close()
+
+            if replace:
+                # パーティションテーブルはDELETEせず、全パーティションをTRUNCATEする
+                if self.is_partitioned():
+                    connection.execute(text(f'TRUNCATE {table_name}'))
+                else:
+                    connection.execute(text(f'DELETE FROM {table_name}'))
+                connection.execute(text(
+                    f'INSERT INTO {table_name} ({columns}) '
+                    f'SELECT {columns} FROM {staging_name}'))
+                inserted_count, updated_count = row_count, 0
+            else:
+                # 主キーとins_tsはUPDATE対象外とし、upd_tsは現在日時で更新する
+                update_columns = ', '.join(
+                    [f'{name} = EXCLUDED.{name}' for name in column_names
+                     if name not in primary_keys] + ['upd_ts = now()'])
+                res = connection.execute(text(
+                    f'WITH merged AS ('
+                    f'INSERT INTO {table_name} ({columns}) '
+                    f'SELECT {columns} FROM {staging_name} '
+                    f'ON CONFLICT ({", ".join(primary_keys)}) '
+                    f'DO UPDATE SET {update_columns} '
+                    f'RETURNING (xmax = 0) AS inserted) '
+                    f'SELECT count(*) FILTER (WHERE inserted) '
+                    f'AS inserted_count, '
+                    f'count(*) AS merged_count FROM merged')).first()
+                inserted_count = res.inserted_count
+                updated_count = res.merged_count - res.inserted_count
+            self.session.expire_all()
+
+            self.logger.info(f'Copied {row_count} records '
+                             f'into {table_name} table')
+            timer.rows = row_count
+        return inserted_count, updated_count
+
+    def _copy_buffer(
+        self,
+        cursor: object,
+        copy_sql: str,
+        buffer: io.StringIO,
     ):
+        """
+        CSVバッファの内容をCOPYで送信し、バッファを空にする
+
+        Parameters
+        ----------
+        cursor: psycopg2.extensions.cursor
+            COPYを実行するDBAPIのカーソル
+        copy_sql: str
+            COPY ... FROM STDIN文
+        buffer: io.StringIO
+            送信するCSVを保持したバッファ
+        """
+        if buffer.tell() == 0:
+            return
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+        buffer.seek(0)
+        buffer.truncate()
+
+    def upsert(
+        self,
+        dtos: List[Union[object, dict]],
+        primary_keys: List[str],
+        batch_size: int = 1000,
+    ) -> Tuple[int, int]:
         """
         与えられたDTOリストに対して、主キーを元にテーブルに存在するか判定し、
         存在するレコードについてはUPDATE、存在しないレコードについてはINSERTを行う
 
+        テーブル全体を読み込んで比較するのではなく、batch_size件毎にまとめた
+        INSERT ... ON CONFLICT (主キー) DO UPDATE文を発行するため、
+        処理時間・メモリ使用量はテーブルのレコード数に依存しない。
         前提条件として、データベースの挿入日時を記録するins_tsカラムを持つことを想定し、
-        UPDATE時にins_tsを書き換えないように配慮する
+        UPDATE時にins_tsを書き換えず、upd_tsのみを現在日時で更新する
+
+        Parameters
+        ----------
+        dtos: List[Union[sqlalchemy.DeclarativeMeta, dict]]
+            UPSERT対象のDTO(またはカラム名をキーとするディクショナリ)のリスト
+        primary_keys: List[str]
+            対象テーブルの主キーのカラム名のリスト
+        batch_size: int
+            1文のINSERTでまとめて送信するレコード数
+
+        Returns
+        ----------
+        inserted_count: int
+            INSERTされたレコード数
+        updated_count: int
+            UPDATEされたレコード数
+        """
+        with self.metrics.timer('common_dao.upsert',
+                                self._get_metric_tags()) as timer:
+            # 未反映のDTOがあるとON CONFLICTの判定が正しく行われないので先にflushする
+            self.session.flush()
+            # 同一主キーのレコードが1文内に複数あるとエラーとなるため、後勝ちで重複を除く
+            upsert_records = {}
+            for record in self._iter_records(dtos):
+                p_keys = tuple(record[p_key] for p_key in primary_keys)
+                upsert_records[p_keys] = record
+            records = list(upsert_records.values())
+
+            table = self.dto_class.__table__
+            inserted_count = 0
+            for start in range(0, len(records), batch_size):
+                stmt = insert(table).values(records[start:start + batch_size])
+                # 主キーとins_tsはUPDATE対象外とし、upd_tsは現在日時で更新する
+                update_columns = {
+                    column.name: stmt.excluded[column.name]
+                    for column in table.columns
+                    if (column.name not in primary_keys) and
+                       (column.name not in self.timestamp_columns)
+                }
+                update_columns['upd_ts'] = func.now()
+                # xmax = 0の行はINSERTされた行、それ以外はUPDATEされた行となる
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=primary_keys,
+                    set_=update_columns,
+                ).returning(literal_column('(xmax = 0)').label('inserted'))
+                inserted_count += sum(
+                    1 for res in self.session.execute(stmt) if res.inserted)
+            updated_count = len(records) - inserted_count
+            # Core経由で更新したので、セッション上のDTOを次回参照時に再読み込みさせる
+            self.session.expire_all()
+
+            self.logger.info(f'Updated {updated_count} records '
+                             f'on {self.dto_class.__tablename__} table')
+            self.logger.info(f'Insert {inserted_count} records '
+                             f'into {self.dto_class.__tablename__} table')
+            timer.rows = len(records)
+        return inserted_count, updated_count
+
+    def is_partitioned(
+        self,
+        connection: object = None,
+    ) -> bool:
+        """
+        対象テーブルがパーティションテーブルかどうかを返す
 
         Parameters
         ----------
-        dtos: List[sqlalchemy.DeclarativeMeta]
-            UPSERT対象のDTOリスト
+        connection: sqlalchemy.engine.Connection
+            問い合わせに使用するコネクション(指定しない場合はセッションを使用する)
+
+        Returns
+        ----------
+        partitioned: bool
+            対象テーブルがパーティションテーブルの場合はTrue
+        """
+        executor = connection if connection is not None else self.session
+        return executor.execute(text(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+            'WHERE partrelid = to_regclass(:table_name))'
+        ), {'table_name': self.dto_class.__tablename__}).scalar()
+
+    def get_partitions(
+        self,
+        connection: object = None,
+    ) -> List[str]:
+        """
+        対象テーブルのパーティション名のリストを返す(パーティションテーブルでない場合は空のリスト)
+
+        Parameters
+        ----------
+        connection: sqlalchemy.engine.Connection
+            問い合わせに使用するコネクション(指定しない場合はセッションを使用する)
+
+        Returns
+        ----------
+        partition_names: List[str]
+            パーティション名のリスト(名前順)
+        """
+        executor = connection if connection is not None else self.session
+        results = executor.execute(text(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(:table_name) '
+            'ORDER BY child.relname'
+        ), {'table_name': self.dto_class.__tablename__})
+        return [res.relname for res in results]
+
+    def create_year_partitions(
+        self,
+        start_year: int,
+        end_year: int,
+    ) -> List[str]:
+        """
+        日付の年単位のRANGEパーティションテーブルについて、start_year〜end_yearの未作成のパーティションを作成する
+
+        バッチ処理の開始時に当年・翌年を指定して呼び出し、新しい年の日付がDEFAULTパーティションに
+        格納されないようにする。パーティションテーブルでない場合は何もしない。
+        パーティションの作成は親テーブルのACCESS EXCLUSIVEロックを取得するため、セッションとは別の
+        コネクションの短いトランザクションで実行して直ちにコミットする。同時に実行されるシャード間では
+        アドバイザリロックにより直列化し、ロック取得後に作成済みのパーティションを確認する。
+
+        Parameters
+        ----------
+        start_year: int
+            作成する最初の年
+        end_year: int
+            作成する最後の年
+
+        Returns
+        ----------
+        partition_names: List[str]
+            作成したパーティション名のリスト
+        """
+        table_name = self.dto_class.__tablename__
+        created_names = []
+        with self.session.get_bind().begin() as connection:
+            connection.execute(
+                text('SELECT pg_advisory_xact_lock(hashtext(:lock_key))'),
+                {'lock_key': f'create_year_partitions:{table_name}'})
+            if not self.is_partitioned(connection):
+                return []
+            partition_names = set(self.get_partitions(connection))
+            for year in range(start_year, end_year + 1):
+                partition_name = self.year_partition_format.format(
+                    table_name=table_name, year=year)
+                if partition_name in partition_names:
+                    continue
+                connection.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS {partition_name} '
+                    f'PARTITION OF {table_name} '
+                    f"FOR VALUES FROM ('{year}-01-01') "
+                    f"TO ('{year + 1}-01-01')"))
+                self.logger.info(f'Create partition {partition_name}')
+                created_names.append(partition_name)
+        return created_names
+
+    def _get_metric_tags(self) -> dict:
+        """
+        メトリクスに付与するタグ(テーブル名)を返す
+        """
+        return {'table': self.dto_class.__tablename__}
+
+    def _get_column_names(self) -> List[str]:
+        """
+        対象テーブルのカラム名のうち、DTOから値を設定するカラム名のリストを返す
+
+        ins_ts・upd_tsはサーバー側のデフォルト値を使用するため含めない
+
+        Returns
+        ----------
+        column_names: List[str]
+            DTOから値を設定するカラム名のリスト
+        """
+        return [
+            column.name for column in self.dto_class.__table__.columns
+            if column.name not in self.timestamp_columns
+        ]
+
+    def _iter_records(
+        self,
+        dtos: Iterable[Union[object, dict]],
+    ) -> Iterator[dict]:
+        """
+        DTO(またはディクショナリ)を、カラム名をキーとするディクショナリに順次変換する
+
+        Parameters
+        ----------
+        dtos: Iterable[Union[sqlalchemy.DeclarativeMeta, dict]]
+            変換対象のDTO(またはディクショナリ)のリスト
+
+        Returns
+        ----------
+        records: Iterator[dict]
+            カラム名をキーとするディクショナリのイテレータ
         """
-        upsert_dto_dict = {}  # 主キー(タプル)をキー、dtoをバリューとするディクショナリ
+        column_names = self._get_column_names()
         for dto in dtos:
-            # 内包表記内でevalを使うとdtoに対するNameErrorが出るので、for文を使う
-            p_keys = []
-            for p_key in primary_keys:
-                p_keys.append(eval(f'dto.{p_key}'))
-            upsert_dto_dict[tuple(p_keys)] = dto
-
-        # 主キーが一致するdtoをsession.merge()によりUPDATEする
-        # その際UPDATEレコードについては、ins_ts(挿入時のタイムスタンプ)は前レコード値を保持する必要がある
-        for old_rec in self.session.query(self.dto_class).all():
-            old_pkeys = []
-            for p_key in primary_keys:
-                old_pkeys.append(eval(f'old_rec.{p_key}'))
-            old_pkeys = tuple(old_pkeys)
-            if old_pkeys in upsert_dto_dict:
-                update_dto = upsert_dto_dict.pop(old_pkeys)
-                update_dto.ins_ts = old_rec.ins_ts
-                self.session.merge(update_dto)
-        self.logger.info(f'Updated {len(dtos) - len(upsert_dto_dict)} records '
-                         f'on {self.dto_class.__tablename__} table')
-
-        # 存在しないレコードのINSERT
-        self.logger.info(f'Insert {len(upsert_dto_dict)} records '
-                         f'into {self.dto_class.__tablename__} table')
-        self.session.add_all(upsert_dto_dict.values())
+            if isinstance(dto, dict):
+                yield {name: dto.get(name) for name in column_names}
+            else:
+                yield {name: getattr(dto, name) for name in column_names}
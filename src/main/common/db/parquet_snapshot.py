@@ -0,0 +1,219 @@
+import os
+import shutil
+import pandas as pd
+from logging import Logger
+from typing import List
+from sqlalchemy.orm import Session
+
+# pyarrowがインストールされていない環境では、スナップショット機能のみ使用不可とする
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# サーバー側で値を設定するタイムスタンプカラム(スナップショットには含めない)
+TIMESTAMP_COLUMNS = ['ins_ts', 'upd_ts']
+
+
+def _partition_by_company(chunk_df: pd.DataFrame) -> pd.Series:
+    return chunk_df['company_id'].astype(str)
+
+
+def _partition_by_month(chunk_df: pd.DataFrame) -> pd.Series:
+    return pd.to_datetime(chunk_df['date']).dt.strftime('%Y%m')
+
+
+class ParquetSnapshot(object):
+    """
+    テーブルの全レコードを、企業毎または月毎に分割したParquetファイルとして書き出し、
+    メモリマップにより読み込むクラス
+
+    分析用途の大量レコードの走査をPostgreSQL・ORMを経由せずに行うために使用する。
+    スナップショットは snapshot_dir/テーブル名/分割キーの値/part-NNNNN.parquet に書き出す。
+    Hive形式(key=value)のディレクトリ名とすると、読み込み時に'0001'等の企業IDが数値に
+    型推論されるため、ディレクトリ名は値のみとし、各ファイルに全カラムを保持する。
+    書き出しは一時ディレクトリに行い、完了後にディレクトリを入れ替えるため、
+    読み込み側が書き出し途中のスナップショットを参照することは無い。
+
+    Attributes
+    ----------
+    snapshot_dir: str
+        スナップショットを保存するディレクトリ
+    partition_functions: Dict[str, Callable]
+        分割方法('company', 'month')をキー、データフレームから分割キーの値を求める関数をバリューとするディクショナリ
+    """
+    partition_functions = {
+        'company': _partition_by_company,
+        'month': _partition_by_month,
+    }
+
+    def __init__(
+        self,
+        snapshot_dir: str,
+    ):
+        """
+        Parameters
+        ----------
+        snapshot_dir: str
+            スナップショットを保存するディレクトリ(存在しない場合は作成する)
+        """
+        if pq is None:
+            raise ImportError('pyarrow is required for ParquetSnapshot')
+        self.snapshot_dir = snapshot_dir
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    def export(
+        self,
+        session: Session,
+        logger: Logger,
+        dto_class: object,
+        partition_by: str = 'month',
+        chunk_size: int = 500000,
+    ) -> int:
+        """
+        指定テーブルの全レコードを、chunk_size件毎にDBから読み込んでParquetファイルに書き出す
+
+        DBからはサーバーサイドカーソルで読み込むため、メモリ使用量はchunk_sizeに比例する。
+        分割キーの順に読み込むことで、1つの分割キーのファイル数を抑える。
+
+        Parameters
+        ----------
+        session: sqlalchemy.Session
+            SQL AlchemyでDBを操作するためのSessionクラス
+        logger: logging.Logger
+            アプリケーションログ出力用のロガー
+        dto_class: sqlalchemy.DeclarativeMeta
+            書き出し対象テーブルのDTOクラス(company_id, dateカラムを持つこと)
+        partition_by: str
+            分割方法('company': 企業毎, 'month': 月毎)
+        chunk_size: int
+            1回に読み込むレコード数
+
+        Returns
+        ----------
+        row_count: int
+            書き出したレコード数
+        """
+        if partition_by not in self.partition_functions:
+            raise ValueError(f'Unsupported partition_by: {partition_by}')
+        table_name = dto_class.__tablename__
+        columns = [
+            column for column in dto_class.__table__.columns
+            if column.name not in TIMESTAMP_COLUMNS
+        ]
+        order_columns = [dto_class.company_id, dto_class.date] \
+            if partition_by == 'company' \
+            else [dto_class.date, dto_class.company_id]
+        query = session.query(*columns).order_by(*order_columns)
+
+        table_dir = os.path.join(self.snapshot_dir, table_name)
+        tmp_dir = os.path.join(self.snapshot_dir, f'.{table_name}.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        row_count = 0
+        connection = session.connection().execution_options(
+            stream_results=True)
+        chunks = pd.read_sql(query.statement, connection,
+                             chunksize=chunk_size)
+        for chunk_index, chunk_df in enumerate(chunks):
+            self._write_chunk(tmp_dir, chunk_df, partition_by, chunk_index)
+            row_count += len(chunk_df)
+
+        self._replace_dir(tmp_dir, table_dir)
+        logger.info(f'Exported {row_count} records of {table_name} table '
+                    f'to {table_dir}')
+        return row_count
+
+    def read(
+        self,
+        table_name: str,
+        partitions: List[str] = None,
+        columns: List[str] = None,
+    ) -> pd.DataFrame:
+        """
+        スナップショットをメモリマップにより読み込む
+
+        Parameters
+        ----------
+        table_name: str
+            読み込み対象のテーブル名
+        partitions: List[str]
+            読み込み対象の分割キーの値(企業IDまたはYYYYMM)のリスト. 指定しない場合は全て読み込む
+        columns: List[str]
+            読み込み対象のカラム名のリスト. 指定しない場合は全カラムを読み込む
+
+        Returns
+        ----------
+        snapshot_df: pd.DataFrame
+            スナップショットのデータフレーム(スナップショットが無い場合はNone)
+        """
+        table_dir = os.path.join(self.snapshot_dir, table_name)
+        if not os.path.isdir(table_dir):
+            return None
+        partition_names = sorted(os.listdir(table_dir)) \
+            if partitions is None else sorted(partitions)
+
+        tables = []
+        for partition_name in partition_names:
+            partition_dir = os.path.join(table_dir, partition_name)
+            if not os.path.isdir(partition_dir):
+                continue
+            for file_name in sorted(os.listdir(partition_dir)):
+                tables.append(pq.read_table(
+                    os.path.join(partition_dir, file_name),
+                    columns=columns,
+                    memory_map=True,
+                ))
+        if len(tables) == 0:
+            return None
+        return pa.concat_tables(tables).to_pandas()
+
+    def _write_chunk(
+        self,
+        table_dir: str,
+        chunk_df: pd.DataFrame,
+        partition_by: str,
+        chunk_index: int,
+    ):
+        """
+        データフレームを分割キー毎のディレクトリにParquetファイルとして書き出す
+
+        Parameters
+        ----------
+        table_dir: str
+            書き出し先のテーブルのディレクトリ
+        chunk_df: pd.DataFrame
+            書き出し対象のデータフレーム
+        partition_by: str
+            分割方法('company': 企業毎, 'month': 月毎)
+        chunk_index: int
+            ファイル名に付与するチャンクの番号
+        """
+        partition_keys = self.partition_functions[partition_by](chunk_df)
+        for partition_name, partition_df in chunk_df.groupby(
+                partition_keys, sort=False):
+            partition_dir = os.path.join(table_dir, partition_name)
+            os.makedirs(partition_dir, exist_ok=True)
+            pq.write_table(
+                pa.Table.from_pandas(partition_df, preserve_index=False),
+                os.path.join(partition_dir,
+                             f'part-{chunk_index:05d}.parquet'),
+            )
+
+    def _replace_dir(
+        self,
+        src_dir: str,
+        dst_dir: str,
+    ):
+        """
+        書き出しが完了した一時ディレクトリと、既存のスナップショットのディレクトリを入れ替える
+        """
+        old_dir = f'{dst_dir}.old'
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.isdir(dst_dir):
+            os.rename(dst_dir, old_dir)
+        os.rename(src_dir, dst_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
@@ -0,0 +1,252 @@
+import os
+import sys
+import time
+import random
+import pathlib
+import datetime
+import requests
+from logging import Logger
+from typing import Tuple, Union
+from requests.adapters import HTTPAdapter
+from email.utils import parsedate_to_datetime
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent)))
+from common.http.rate_limiter import HostRateLimiter  # noqa: #402
+
+
+class RetryPolicy(object):
+    """
+    一時的な失敗(接続エラー・タイムアウト・429・5xx)に対するリトライ方針を定めるクラス
+
+    リトライ間隔は指数バックオフにジッタ(0〜上限の一様乱数)を加えたものとし、
+    レスポンスにRetry-Afterヘッダがある場合はその値を優先する。
+
+    Attributes
+    ----------
+    max_retries: int
+        最大リトライ回数
+    backoff_base: float
+        1回目のリトライ間隔の上限(秒)
+    backoff_max: float
+        リトライ間隔の上限(秒)
+    retry_statuses: Tuple[int]
+        リトライ対象とするHTTPステータスコード
+    """
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        """
+        Parameters
+        ----------
+        max_retries: int
+            最大リトライ回数
+        backoff_base: float
+            1回目のリトライ間隔の上限(秒)
+        backoff_max: float
+            リトライ間隔の上限(秒)
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def get_backoff(
+        self,
+        attempt: int,
+    ) -> float:
+        """
+        指数バックオフとジッタにより、リトライまでの待機秒数を返す
+
+        Parameters
+        ----------
+        attempt: int
+            失敗したリクエストの試行回数(0始まり)
+
+        Returns
+        ----------
+        backoff: float
+            リトライまでの待機秒数
+        """
+        upper = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, upper)
+
+    def get_retry_after(
+        self,
+        response: requests.Response,
+    ) -> float:
+        """
+        レスポンスのRetry-Afterヘッダ(秒数またはHTTP日付)から、リトライまでの待機秒数を返す
+
+        Parameters
+        ----------
+        response: requests.Response
+            リトライ対象のレスポンス
+
+        Returns
+        ----------
+        retry_after: float
+            リトライまでの待機秒数(ヘッダが無い・解釈できない場合はNone)
+        """
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is None:
+            return None
+        try:
+            seconds = float(retry_after)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                return None
+            now = datetime.datetime.now(retry_at.tzinfo)
+            seconds = (retry_at - now).total_seconds()
+        return min(max(seconds, 0.0), self.backoff_max)
+
+
+class HttpClient(object):
+    """
+    データソースへのHTTPリクエストを、ホスト毎の流量制御とリトライ付きで送信するクラス
+
+    StockAPIクラス・StockCrawlerクラスから共有して使用し、アクセス先のサイトから
+    アクセス拒否されない範囲で最大の流量を保ちつつ、一時的な失敗による取得漏れを減らす。
+    リクエストはKeep-Aliveのコネクションプールを持つrequests.Sessionから送信し、
+    同一ホストへの2回目以降のリクエストではTCP・TLSのハンドシェイクを省略する。
+    レスポンスはgzip・deflateで圧縮して受け取る。
+
+    Attributes
+    ----------
+    rate_limiter: HostRateLimiter
+        ホスト毎のリクエストの流量を制御するクラス
+    retry_policy: RetryPolicy
+        一時的な失敗に対するリトライ方針
+    timeout: Union[float, Tuple[float, float]]
+        リクエストのタイムアウト(秒). タプルの場合は(接続, 読み込み)のタイムアウト
+    session: requests.Session
+        コネクションプールを保持するセッション
+    """
+    def __init__(
+        self,
+        rate_limiter: HostRateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        timeout: Union[float, Tuple[float, float]] = (5.0, 30.0),
+        pool_size: int = 10,
+    ):
+        """
+        Parameters
+        ----------
+        rate_limiter: HostRateLimiter
+            ホスト毎のリクエストの流量を制御するクラス(指定しない場合は制限しない)
+        retry_policy: RetryPolicy
+            一時的な失敗に対するリトライ方針(指定しない場合はデフォルト値)
+        timeout: Union[float, Tuple[float, float]]
+            リクエストのタイムアウト(秒). タプルの場合は(接続, 読み込み)のタイムアウト
+        pool_size: int
+            ホスト毎に保持するコネクション数(並行してリクエストするスレッド数以上とする)
+        """
+        self.rate_limiter = rate_limiter if rate_limiter is not None \
+            else HostRateLimiter()
+        self.retry_policy = retry_policy if retry_policy is not None \
+            else RetryPolicy()
+        self.timeout = timeout
+        self.session = create_session(pool_size)
+
+    def close(self):
+        """
+        コネクションプールのコネクションを全て閉じる
+        """
+        self.session.close()
+
+    def get(
+        self,
+        url: str,
+        params: dict = None,
+        logger: Logger = None,
+    ) -> requests.Response:
+        """
+        GETリクエストを送信し、一時的な失敗の場合はリトライする
+
+        Parameters
+        ----------
+        url: str
+            リクエスト先のURL
+        params: dict
+            クエリパラメータ
+        logger: logging.Logger
+            アプリケーションで使用するロガー
+
+        Returns
+        ----------
+        response: requests.Response
+            成功したリクエストのレスポンス
+
+        Raises
+        ----------
+        requests.RequestException
+            リトライ回数を超えて失敗した場合、またはリトライ対象外のエラーの場合
+        """
+        max_retries = self.retry_policy.max_retries
+        for attempt in range(max_retries + 1):
+            self.rate_limiter.wait(url)
+            try:
+                response = self.session.get(url, params=params,
+                                            timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= max_retries:
+                    raise
+                reason = str(e)
+                retry_after = None
+            else:
+                if (response.status_code not in
+                        self.retry_policy.retry_statuses) or \
+                   (attempt >= max_retries):
+                    response.raise_for_status()
+                    return response
+                reason = f'HTTP {response.status_code}'
+                retry_after = self.retry_policy.get_retry_after(response)
+
+            if retry_after is not None:
+                # Retry-Afterは同一ホストへの全リクエストに適用する
+                self.rate_limiter.pause(url, retry_after)
+                wait_seconds = retry_after
+            else:
+                wait_seconds = self.retry_policy.get_backoff(attempt)
+                time.sleep(wait_seconds)
+            if logger is not None:
+                logger.warning(f'Retry {url} after {wait_seconds:.1f}sec '
+                               f'({attempt + 1}/{max_retries}): {reason}')
+
+
+def create_session(
+    pool_size: int = 10,
+) -> requests.Session:
+    """
+    Keep-Aliveのコネクションプールを持つrequests.Sessionを生成する
+
+    リトライはHttpClientで行うため、urllib3のリトライは行わない
+
+    Parameters
+    ----------
+    pool_size: int
+        ホスト毎に保持するコネクション数
+
+    Returns
+    ----------
+    session: requests.Session
+        コネクションプールを保持するセッション
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+    return session
@@ -0,0 +1,164 @@
+import time
+import threading
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class TokenBucket(object):
+    """
+    トークンバケットによりリクエストの流量を制御するクラス
+
+    rate(リクエスト/秒)でトークンが補充され、最大burst個まで溜めておける。
+    複数スレッドから共有して使用することを想定し、トークンの予約はロック下で行い、
+    待機(sleep)はロックの外で行う。実装は次回の理論到着時刻のみを保持するGCRA形式とする。
+
+    Attributes
+    ----------
+    rate: float
+        1秒あたりに補充されるトークン数(Noneの場合は流量を制限しない)
+    burst: int
+        溜めておけるトークンの最大数(連続して即時に送信できるリクエスト数)
+    """
+    def __init__(
+        self,
+        rate: float = None,
+        burst: int = 1,
+    ):
+        """
+        Parameters
+        ----------
+        rate: float
+            1秒あたりに補充されるトークン数(Noneの場合は流量を制限しない)
+        burst: int
+            溜めておけるトークンの最大数
+        """
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tat = 0.0  # 理論到着時刻(Theoretical Arrival Time)
+
+    def acquire(self):
+        """
+        トークンを1つ取得し、取得可能となるまで待機する
+        """
+        interval = 1.0 / self.rate if self.rate else 0.0
+        tolerance = interval * (self.burst - 1)
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            wait_seconds = tat - tolerance - now
+            self._tat = tat + interval
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+    def pause(
+        self,
+        seconds: float,
+    ):
+        """
+        指定秒数の間、トークンの取得を停止する(Retry-Afterヘッダへの対応に使用する)
+
+        Parameters
+        ----------
+        seconds: float
+            トークンの取得を停止する秒数
+        """
+        interval = 1.0 / self.rate if self.rate else 0.0
+        tolerance = interval * (self.burst - 1)
+        with self._lock:
+            self._tat = max(self._tat,
+                            time.monotonic() + seconds + tolerance)
+
+
+class HostRateLimiter(object):
+    """
+    アクセス先のホスト毎にTokenBucketを保持し、リクエストの流量を制御するクラス
+
+    複数スレッド・複数のデータソースから共有して使用することで、
+    ホスト毎に許容される最大の流量でリクエストを送信する。
+
+    Attributes
+    ----------
+    rates: Dict[str, float]
+        ホスト名をキー、1秒あたりの最大リクエスト数をバリューとするディクショナリ
+    default_rate: float
+        ratesに含まれないホストに対する1秒あたりの最大リクエスト数(Noneの場合は制限しない)
+    burst: int
+        各ホストに対して連続して即時に送信できるリクエスト数
+    """
+    def __init__(
+        self,
+        rates: Dict[str, float] = None,
+        default_rate: float = None,
+        burst: int = 1,
+    ):
+        """
+        Parameters
+        ----------
+        rates: Dict[str, float]
+            ホスト名をキー、1秒あたりの最大リクエスト数をバリューとするディクショナリ
+        default_rate: float
+            ratesに含まれないホストに対する1秒あたりの最大リクエスト数(Noneの場合は制限しない)
+        burst: int
+            各ホストに対して連続して即時に送信できるリクエスト数
+        """
+        self.rates = rates if rates is not None else {}
+        self.default_rate = default_rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = {}  # ホスト名をキー、TokenBucketをバリューとするディクショナリ
+
+    def wait(
+        self,
+        url: str,
+    ):
+        """
+        指定URLのホストに対して、リクエスト可能となるまで待機する
+
+        Parameters
+        ----------
+        url: str
+            リクエスト先のURL
+        """
+        self._get_bucket(url).acquire()
+
+    def pause(
+        self,
+        url: str,
+        seconds: float,
+    ):
+        """
+        指定URLのホストに対するリクエストを、全スレッドについて指定秒数停止する
+
+        Parameters
+        ----------
+        url: str
+            リクエスト先のURL
+        seconds: float
+            リクエストを停止する秒数
+        """
+        self._get_bucket(url).pause(seconds)
+
+    def _get_bucket(
+        self,
+        url: str,
+    ) -> TokenBucket:
+        """
+        指定URLのホストに対応するTokenBucketを返す(存在しない場合は生成する)
+
+        Parameters
+        ----------
+        url: str
+            リクエスト先のURL
+
+        Returns
+        ----------
+        bucket: TokenBucket
+            ホストに対応するTokenBucket
+        """
+        host = urlparse(url).hostname
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(
+                    self.rates.get(host, self.default_rate), self.burst)
+            return self._buckets[host]
@@ -0,0 +1,244 @@
+import json
+import time
+import socket
+import threading
+import contextlib
+from logging import Logger
+from typing import Dict, Iterator, List
+
+
+class StageTimer(object):
+    """
+    MetricsRecorder.timer()のwithブロック内で、処理したレコード数を設定するためのクラス
+
+    Attributes
+    ----------
+    rows: int
+        ステージで処理したレコード数(設定した場合のみrows・rows_per_secを出力する)
+    elapsed: float
+        ステージの処理時間(秒). withブロックを抜けた後に設定される
+    """
+    def __init__(self):
+        self.rows = None
+        self.elapsed = None
+
+
+class MetricsRecorder(object):
+    """
+    処理ステージ毎の処理時間・スループット(rows/sec)・企業毎のレイテンシ分布を計測するクラス
+
+    計測値は構造化ログ(1行1JSON)としてロガーに出力し、statsd_hostを指定した場合は
+    DogStatsDのプロトコルでUDP送信する(クラスタで稼働しているDatadog Agentで収集する)。
+    ロガー・statsd_hostのいずれも指定しない場合は何も出力しないため、計測対象のクラスの
+    デフォルト値として使用できる。複数スレッドから共有して使用する。
+
+    Attributes
+    ----------
+    logger: logging.Logger
+        計測値を構造化ログとして出力するロガー
+    prefix: str
+        メトリクス名の接頭辞
+    tags: Dict[str, str]
+        全てのメトリクスに付与するタグ
+    """
+    def __init__(
+        self,
+        logger: Logger = None,
+        statsd_host: str = None,
+        statsd_port: int = 8125,
+        prefix: str = 'dshack',
+        tags: Dict[str, str] = None,
+    ):
+        """
+        Parameters
+        ----------
+        logger: logging.Logger
+            計測値を構造化ログとして出力するロガー(Noneの場合はログ出力しない)
+        statsd_host: str
+            DogStatsDの送信先ホスト(Noneの場合は送信しない)
+        statsd_port: int
+            DogStatsDの送信先ポート番号
+        prefix: str
+            メトリクス名の接頭辞
+        tags: Dict[str, str]
+            全てのメトリクスに付与するタグ
+        """
+        self.logger = logger
+        self.prefix = prefix
+        self.tags = tags if tags is not None else {}
+        self._statsd_address = (statsd_host, int(statsd_port)) \
+            if statsd_host else None
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) \
+            if statsd_host else None
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    @contextlib.contextmanager
+    def timer(
+        self,
+        stage: str,
+        tags: Dict[str, str] = None,
+    ) -> Iterator[StageTimer]:
+        """
+        withブロックの処理時間を計測し、ステージの処理時間・レコード数・rows/secを出力する
+
+        Parameters
+        ----------
+        stage: str
+            ステージ名(例: common_dao.upsert)
+        tags: Dict[str, str]
+            メトリクスに付与するタグ(例: {'table': 'stockprice'})
+
+        Returns
+        ----------
+        stage_timer: StageTimer
+            レコード数を設定するためのクラス
+            例) with metrics.timer('common_dao.upsert') as timer:
+                    timer.rows = len(records)
+        """
+        stage_timer = StageTimer()
+        start_time = time.perf_counter()
+        try:
+            yield stage_timer
+        finally:
+            stage_timer.elapsed = time.perf_counter() - start_time
+            values = {'duration_ms': stage_timer.elapsed * 1000}
+            self._send(f'{stage}.duration', values['duration_ms'], 'ms', tags)
+            if stage_timer.rows is not None:
+                values['rows'] = stage_timer.rows
+                values['rows_per_sec'] = stage_timer.rows / \
+                    stage_timer.elapsed if stage_timer.elapsed > 0 else 0.0
+                self._send(f'{stage}.rows', stage_timer.rows, 'c', tags)
+                self._send(f'{stage}.rows_per_sec',
+                           values['rows_per_sec'], 'g', tags)
+            self._log('timer', stage, values, tags)
+
+    def histogram(
+        self,
+        name: str,
+        value: float,
+        tags: Dict[str, str] = None,
+    ):
+        """
+        分布を計測する値(企業毎のレイテンシ等)を記録する
+
+        構造化ログには1件毎ではなく、log_summary()で件数・パーセンタイルをまとめて出力する
+
+        Parameters
+        ----------
+        name: str
+            メトリクス名(例: stock_client.fetch_latency_ms)
+        value: float
+            記録する値
+        tags: Dict[str, str]
+            メトリクスに付与するタグ
+        """
+        with self._lock:
+            self._histograms.setdefault(name, []).append(value)
+        self._send(name, value, 'h', tags)
+
+    def increment(
+        self,
+        name: str,
+        value: int = 1,
+        tags: Dict[str, str] = None,
+    ):
+        """
+        カウンタを加算する(取得失敗件数等)
+
+        Parameters
+        ----------
+        name: str
+            メトリクス名
+        value: int
+            加算する値
+        tags: Dict[str, str]
+            メトリクスに付与するタグ
+        """
+        self._send(name, value, 'c', tags)
+        self._log('counter', name, {'value': value}, tags)
+
+    def log_summary(self):
+        """
+        histogram()で記録した値の件数・平均・パーセンタイル・最大値を構造化ログとして出力し、記録をクリアする
+        """
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+        for name, values in histograms.items():
+            self._log('histogram', name, summarize(values))
+
+    def _send(
+        self,
+        name: str,
+        value: float,
+        metric_type: str,
+        tags: Dict[str, str] = None,
+    ):
+        """
+        DogStatsDのプロトコル(name:value|type|#tag:value)でメトリクスをUDP送信する
+        """
+        if self._socket is None:
+            return
+        all_tags = dict(self.tags, **(tags or {}))
+        payload = f'{self.prefix}.{name}:{value}|{metric_type}'
+        if all_tags:
+            payload += '|#' + ','.join(
+                f'{key}:{tag}' for key, tag in all_tags.items())
+        try:
+            self._socket.sendto(payload.encode('utf-8'),
+                                self._statsd_address)
+        except OSError:
+            # メトリクスの送信失敗によってバッチ処理を止めない
+            pass
+
+    def _log(
+        self,
+        metric_kind: str,
+        name: str,
+        values: dict,
+        tags: Dict[str, str] = None,
+    ):
+        """
+        メトリクスを1行のJSONとしてロガーに出力する
+        """
+        if self.logger is None:
+            return
+        record = {'metric': metric_kind, 'name': f'{self.prefix}.{name}'}
+        record.update(values)
+        record['tags'] = dict(self.tags, **(tags or {}))
+        self.logger.info(json.dumps(record, ensure_ascii=False))
+
+
+def summarize(
+    values: List[float],
+) -> Dict[str, float]:
+    """
+    値のリストの件数・平均・パーセンタイル(50, 95, 99)・最大値を計算する
+
+    Parameters
+    ----------
+    values: List[float]
+        集計対象の値のリスト
+
+    Returns
+    ----------
+    summary: Dict[str, float]
+        集計値のディクショナリ(count, mean, p50, p95, p99, max)
+    """
+    if len(values) == 0:
+        return {'count': 0}
+    sorted_values = sorted(values)
+
+    def percentile(p: float) -> float:
+        # 最近傍順位法によりパーセンタイルを求める
+        rank = max(int(-(-p * len(sorted_values) // 100)), 1)
+        return sorted_values[rank - 1]
+
+    return {
+        'count': len(sorted_values),
+        'mean': sum(sorted_values) / len(sorted_values),
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99),
+        'max': sorted_values[-1],
+    }
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Date, DateTime, Float, ForeignKey
+from sqlalchemy import Column, String, Date, DateTime, Float, ForeignKey, \
+    Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -38,9 +39,15 @@ class StockPrice(Base):
     stockpriceテーブルのDto
     """
     __tablename__ = 'stockprice'
-    __table_args__ = {
-        'comment': '企業毎の日毎の株価(始値・高値・安値・終値)・出来高を格納する'
-    }
+    __table_args__ = (
+        # 主キーのINCLUDE (close_price)はマイグレーションで定義する(移動平均の計算のIndex Only Scan用)
+        Index('ix_stockprice_date_brin', 'date', postgresql_using='brin'),
+        {
+            'comment': '企業毎の日毎の株価(始値・高値・安値・終値)・出来高を格納する',
+            # 日付の年単位のRANGEパーティションテーブル(パーティションはマイグレーション・CommonDaoで作成する)
+            'postgresql_partition_by': 'RANGE (date)',
+        },
+    )
 
     company_id = Column(String(16), ForeignKey('company.company_id'),
                         primary_key=True,
@@ -60,9 +67,16 @@ class StockPriceMA(Base):
     stockprice_maテーブルのDto
     """
     __tablename__ = 'stockprice_ma'
-    __table_args__ = {
-        'comment': '企業毎の日次の移動平均株価(SMA・EMA・WMA)を格納する'
-    }
+    __table_args__ = (
+        # INCLUDE句はマイグレーションで定義する
+        Index('ix_stockprice_ma_date_brin', 'date', postgresql_using='brin'),
+        Index('ix_stockprice_ma_ma_type_date', 'ma_type', 'date'),
+        {
+            'comment': '企業毎の日次の移動平均株価(SMA・EMA・WMA)を格納する',
+            # 日付の年単位のRANGEパーティションテーブル(パーティションはマイグレーション・CommonDaoで作成する)
+            'postgresql_partition_by': 'RANGE (date)',
+        },
+    )
 
     company_id = Column(String(16), ForeignKey('company.company_id'),
                         primary_key=True,
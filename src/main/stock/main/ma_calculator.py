@@ -2,17 +2,17 @@ import os
 import sys
 import pathlib
 import datetime
-from typing import List
+from typing import Dict, List, Tuple
 from logging import Logger
-from sqlalchemy import Float, and_, case
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy import Float, and_, case, true
+from sqlalchemy.orm import Query, Session, aliased
 from sqlalchemy.sql import func
 from sqlalchemy.sql.expression import literal_column
 
 # src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
 sys.path.append(os.path.join(
     str(pathlib.Path(__file__).resolve().parent.parent.parent)))
-from stock.dto.stock_dto import StockPrice, StockPriceMA  # noqa: #402
+from stock.dto.stock_dto import Company, StockPrice, StockPriceMA  # noqa: #402
 
 
 class SMACalculator(object):
@@ -39,7 +39,9 @@ class SMACalculator(object):
     ) -> List[StockPriceMA]:
         """
         指定期間・指定日数について、単純移動平均(SMA)を計算する
-        現時点ではspanのみを考慮し、全期間について単純移動平均(SMA)を計算する
+
+        company_ids・start_date・end_dateはSQLの条件として渡し、
+        start_date以前はspan-1行のみを計算の助走期間として読み込む
 
         Parameters
         ----------
@@ -57,7 +59,7 @@ class SMACalculator(object):
         """
         sma_dtos = []
         # ウィンドウ関数によりspan-1日前までの平均を各日付について取得する
-        sma_results = self.session.query(
+        sma_query = self.session.query(
             StockPrice.company_id,
             StockPrice.date,
             func.avg(StockPrice.close_price).over(
@@ -70,12 +72,18 @@ class SMACalculator(object):
                 order_by=StockPrice.date,
                 rows=(-(span - 1), 0),
             ).label('count'),
+        )
+        sma_results = filter_stock_prices(
+            sma_query, self.company_ids, span, start_date, end_date,
         ).order_by(
             StockPrice.company_id,
             StockPrice.date
         ).all()
 
         for res in sma_results:
+            # 助走期間の行は結果に含めない
+            if (start_date is not None) and (res.date < start_date):
+                continue
             if res.count >= span:
                 dto = StockPriceMA()
                 dto.company_id = res.company_id
@@ -112,6 +120,10 @@ class EMACalculator(object):
         """
         指定期間・指定日数について、指数平滑移動平均(EMA)を計算する
 
+        company_ids・end_dateはSQLの条件として渡す.
+        EMAは1日目の終値を起点とする漸化式のため、start_date以前の行も全て読み込んで計算し、
+        結果のみをstart_date以降に絞り込む
+
         Parameters
         ----------
         span: int
@@ -129,15 +141,18 @@ class EMACalculator(object):
         ema_dtos = []
         alpha = 2 / (1 + span)  # 平滑化定数
         # WITH RECURSIVEにより再帰的に指数平滑移動平均を計算
-        stockprice = self.session.query(
-            StockPrice.company_id,
-            StockPrice.date,
-            literal_column(str(alpha), type_=Float).label('alpha'),
-            func.row_number().over(
-                partition_by=StockPrice.company_id,
-                order_by=StockPrice.date,
-            ).label('row_number'),
-            StockPrice.close_price,
+        stockprice = filter_stock_prices(
+            self.session.query(
+                StockPrice.company_id,
+                StockPrice.date,
+                literal_column(str(alpha), type_=Float).label('alpha'),
+                func.row_number().over(
+                    partition_by=StockPrice.company_id,
+                    order_by=StockPrice.date,
+                ).label('row_number'),
+                StockPrice.close_price,
+            ),
+            self.company_ids, None, None, end_date,
         ).cte(name='all')
 
         # 非再起項(1日(行)目からスタート)
@@ -168,6 +183,8 @@ class EMACalculator(object):
         ema_results = self.session.query(ema).all()
 
         for res in ema_results:
+            if (start_date is not None) and (res.date < start_date):
+                continue
             if res.row_number >= span:
                 dto = StockPriceMA()
                 dto.company_id = res.company_id
@@ -204,6 +221,9 @@ class WMACalculator(object):
         """
         指定期間・指定日数について、加重移動平均(WMA)を計算する
 
+        company_ids・start_date・end_dateはSQLの条件として渡し、
+        start_date以前はspan-1行のみを計算の助走期間として読み込む
+
         Parameters
         ----------
         span: int
@@ -220,14 +240,17 @@ class WMACalculator(object):
         """
         wma_dtos = []
         denominator = sum(range(span + 1))  # 重みの分母となる数
-        stockprice = self.session.query(
-            StockPrice.company_id,
-            StockPrice.date,
-            StockPrice.close_price,
-            func.row_number().over(
-                partition_by=StockPrice.company_id,
-                order_by=StockPrice.date,
-            ).label('row_number'),
+        stockprice = filter_stock_prices(
+            self.session.query(
+                StockPrice.company_id,
+                StockPrice.date,
+                StockPrice.close_price,
+                func.row_number().over(
+                    partition_by=StockPrice.company_id,
+                    order_by=StockPrice.date,
+                ).label('row_number'),
+            ),
+            self.company_ids, span, start_date, end_date,
         ).cte(name='all')
 
         # 自己結合と集約の組み合わせにより、指定のspanの重み付き和(加重移動平均)を計算する
@@ -258,6 +281,9 @@ class WMACalculator(object):
         ).all()
 
         for res in wma_results:
+            # 助走期間の行は結果に含めない
+            if (start_date is not None) and (res.date < start_date):
+                continue
             dto = StockPriceMA()
             dto.company_id = res.company_id
             dto.date = res.date
@@ -266,3 +292,298 @@ class WMACalculator(object):
             wma_dtos.append(dto)
 
         return wma_dtos
+
+
+def filter_stock_prices(
+    query: Query,
+    company_ids: List[str],
+    span: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> Query:
+    """
+    stockpriceテーブルを参照するクエリに、企業ID・計算期間の条件を追加する
+
+    終値がNULLのレコードは、NumPyによる計算(load_close_prices())・差分計算(IncrementalMACalculator)と
+    同様に、取引の無い日として計算対象外とする(NULLの前後の終値で移動平均を計算する).
+    start_dateを指定した場合、企業毎にstart_date以前のspan-1行を移動平均の助走期間として残す.
+    助走期間の開始日は、主キーのインデックスを使って企業毎にspan-1行のみを読むLATERAL副問合せで求める.
+
+    Parameters
+    ----------
+    query: sqlalchemy.orm.Query
+        stockpriceテーブルを参照するクエリ
+    company_ids: List[str]
+        計算対象の企業IDのリスト(Noneの場合は絞り込まない)
+    span: int
+        移動平均の計算日数(Noneの場合はstart_dateによる絞り込みを行わない)
+    start_date: datetime.date
+        移動平均の計算期間開始日
+    end_date: datetime.date
+        移動平均の計算期間終了日
+
+    Returns
+    ----------
+    query: sqlalchemy.orm.Query
+        条件を追加したクエリ
+    """
+    query = query.filter(StockPrice.close_price.isnot(None))
+    if company_ids is not None:
+        query = query.filter(StockPrice.company_id.in_(company_ids))
+    if end_date is not None:
+        query = query.filter(StockPrice.date <= end_date)
+    if (start_date is not None) and (span is not None):
+        lookback = query.session.query(
+            StockPrice.date,
+        ).filter(
+            StockPrice.company_id == Company.company_id,
+            StockPrice.date < start_date,
+            StockPrice.close_price.isnot(None),
+        ).order_by(
+            StockPrice.date.desc(),
+        ).limit(span - 1).subquery().lateral()
+        warmup = query.session.query(
+            Company.company_id,
+            func.coalesce(
+                func.min(lookback.c.date), start_date).label('warmup_date'),
+        ).outerjoin(
+            lookback, true(),
+        )
+        if company_ids is not None:
+            warmup = warmup.filter(Company.company_id.in_(company_ids))
+        warmup = warmup.group_by(Company.company_id).subquery()
+        query = query.join(warmup, and_(
+            StockPrice.company_id == warmup.c.company_id,
+            StockPrice.date >= warmup.c.warmup_date,
+        ))
+    return query
+
+
+class IncrementalMACalculator(object):
+    """
+    stockprice_maテーブルに格納済みの最新日(ウォーターマーク)より後の日付についてのみ、
+    移動平均(SMA・EMA・WMA)を計算する
+
+    ウォーターマークは(company_id, ma_type)毎にstockprice_maテーブルの最新日から取得する。
+    SMA・WMAはウォーターマーク以前のspan-1行を、EMAは格納済みの前日のEMAを起点として計算するため、
+    計算量は全期間ではなく新規の日数に比例する。
+    ウォーターマークが存在しない系列(新規企業・新規のma_type)については全期間を計算する。
+    終値がNULLのレコードは、SQLの各Calculatorクラス(filter_stock_prices())と同様に計算対象外とし、
+    差分計算の結果が全期間の再計算の結果と一致するようにする。
+    """
+    def __init__(
+        self,
+        session: Session,
+        logger: Logger,
+        company_ids: List[str],
+    ):
+        self.session = session
+        self.logger = logger
+        self.company_ids = company_ids
+
+    def get_ma_values(
+        self,
+        ma_specs: List[Tuple[str, int]],
+    ) -> List[StockPriceMA]:
+        """
+        指定の移動平均の種類・日数の組み合わせについて、未計算の日付の移動平均を計算する
+
+        Parameters
+        ----------
+        ma_specs: List[Tuple[str, int]]
+            移動平均の種類('sma', 'ema', 'wma')と計算日数の組み合わせのリスト
+            例) [('sma', 5), ('ema', 25)]
+
+        Returns
+        ----------
+        ma_dtos: List[StockPriceMA]
+            stockprice_MAテーブルのDtoのリスト
+        """
+        ma_dtos = []
+        watermarks = self._get_watermarks(
+            [f'{ma_kind}{span}' for ma_kind, span in ma_specs])
+        max_span = max(span for _, span in ma_specs)
+
+        for company_id in self.company_ids:
+            company_watermarks = [
+                watermarks.get((company_id, f'{ma_kind}{span}'))
+                for ma_kind, span in ma_specs
+            ]
+            # 全ての系列を計算できるよう、最も古いウォーターマークを起点に株価を取得する
+            if None in company_watermarks:
+                start_date = None
+            else:
+                start_date = min(date for date, _ in company_watermarks)
+            prices = self._get_close_prices(company_id, start_date, max_span)
+
+            for (ma_kind, span), watermark in zip(ma_specs,
+                                                  company_watermarks):
+                last_date, last_value = watermark \
+                    if watermark is not None else (None, None)
+                for date, ma_value in _calc_incremental_ma(
+                        ma_kind, span, prices, last_date, last_value):
+                    dto = StockPriceMA()
+                    dto.company_id = company_id
+                    dto.date = date
+                    dto.ma_type = f'{ma_kind}{span}'
+                    dto.ma_value = ma_value
+                    ma_dtos.append(dto)
+
+        self.logger.info(f'Calculated {len(ma_dtos)} incremental MA values')
+        return ma_dtos
+
+    def _get_watermarks(
+        self,
+        ma_types: List[str],
+    ) -> Dict[Tuple[str, str], Tuple[datetime.date, float]]:
+        """
+        (company_id, ma_type)毎に、stockprice_maテーブルに格納済みの最新日とその移動平均値を取得する
+
+        Parameters
+        ----------
+        ma_types: List[str]
+            取得対象の移動平均の計算条件(ex. sma5, ema25, ...)のリスト
+
+        Returns
+        ----------
+        watermarks: Dict[Tuple[str, str], Tuple[datetime.date, float]]
+            (company_id, ma_type)をキー、(最新日, 移動平均値)をバリューとするディクショナリ
+        """
+        latest = self.session.query(
+            StockPriceMA.company_id,
+            StockPriceMA.ma_type,
+            func.max(StockPriceMA.date).label('last_date'),
+        ).filter(
+            StockPriceMA.company_id.in_(self.company_ids),
+            StockPriceMA.ma_type.in_(ma_types),
+        ).group_by(
+            StockPriceMA.company_id,
+            StockPriceMA.ma_type,
+        ).subquery()
+
+        results = self.session.query(
+            StockPriceMA.company_id,
+            StockPriceMA.ma_type,
+            StockPriceMA.date,
+            StockPriceMA.ma_value,
+        ).join(latest, and_(
+            StockPriceMA.company_id == latest.c.company_id,
+            StockPriceMA.ma_type == latest.c.ma_type,
+            StockPriceMA.date == latest.c.last_date,
+        )).all()
+
+        return {
+            (res.company_id, res.ma_type): (res.date, res.ma_value)
+            for res in results
+        }
+
+    def _get_close_prices(
+        self,
+        company_id: str,
+        start_date: datetime.date,
+        max_span: int,
+    ) -> List[Tuple[datetime.date, float]]:
+        """
+        指定企業について、start_dateより後の終値と、start_date以前のmax_span-1日分の終値を日付順に取得する
+
+        Parameters
+        ----------
+        company_id: str
+            取得対象の企業ID
+        start_date: datetime.date
+            計算済みの最新日(Noneの場合は全期間を取得する)
+        max_span: int
+            計算対象の移動平均の最大の計算日数
+
+        Returns
+        ----------
+        prices: List[Tuple[datetime.date, float]]
+            (日付, 終値)のリスト
+        """
+        base_query = self.session.query(
+            StockPrice.date,
+            StockPrice.close_price,
+        ).filter(
+            StockPrice.company_id == company_id,
+            StockPrice.close_price.isnot(None),
+        )
+        if start_date is None:
+            query = base_query
+        else:
+            # 主キー(company_id, date)のインデックスを使った範囲検索のみで取得する
+            lookback = base_query.filter(
+                StockPrice.date <= start_date,
+            ).order_by(
+                StockPrice.date.desc(),
+            ).limit(max_span - 1)
+            query = lookback.union_all(
+                base_query.filter(StockPrice.date > start_date))
+
+        return [(date, close_price) for date, close_price
+                in query.order_by(StockPrice.date).all()]
+
+
+def _calc_incremental_ma(
+    ma_kind: str,
+    span: int,
+    prices: List[Tuple[datetime.date, float]],
+    last_date: datetime.date,
+    last_value: float,
+) -> List[Tuple[datetime.date, float]]:
+    """
+    日付順の終値のリストについて、last_dateより後の日付の移動平均を計算する
+
+    SQLによる各Calculatorクラスと同じ定義で計算する.
+    EMAはlast_valueを前日のEMAとして漸化式を計算し、last_dateがNoneの場合は1日目の終値を起点とする.
+
+    Parameters
+    ----------
+    ma_kind: str
+        移動平均の種類('sma', 'ema', 'wma')
+    span: int
+        移動平均の計算日数(X日移動平均)
+    prices: List[Tuple[datetime.date, float]]
+        日付順の(日付, 終値)のリスト
+    last_date: datetime.date
+        計算済みの最新日(Noneの場合は全期間を計算する)
+    last_value: float
+        計算済みの最新日の移動平均値
+
+    Returns
+    ----------
+    ma_values: List[Tuple[datetime.date, float]]
+        (日付, 移動平均値)のリスト
+    """
+    ma_values = []
+    closes = [close_price for _, close_price in prices]
+    new_indexes = [idx for idx, (date, _) in enumerate(prices)
+                   if (last_date is None) or (date > last_date)]
+
+    if ma_kind == 'sma':
+        for idx in new_indexes:
+            if idx >= span - 1:
+                window = closes[idx - (span - 1):idx + 1]
+                ma_values.append((prices[idx][0], sum(window) / span))
+    elif ma_kind == 'wma':
+        denominator = sum(range(span + 1))  # 重みの分母となる数
+        for idx in new_indexes:
+            if idx >= span - 1:
+                window = closes[idx - (span - 1):idx + 1]
+                wma = sum(weight * close_price for weight, close_price
+                          in enumerate(window, start=1)) / denominator
+                ma_values.append((prices[idx][0], wma))
+    elif ma_kind == 'ema':
+        alpha = 2 / (1 + span)  # 平滑化定数
+        ema = last_value
+        for idx in new_indexes:
+            if ema is None:
+                ema = closes[idx]
+            else:
+                ema = alpha * closes[idx] + (1 - alpha) * ema
+            # 全期間を計算する場合、span日目以降を対象とする
+            if (last_date is not None) or (idx >= span - 1):
+                ma_values.append((prices[idx][0], ema))
+    else:
+        raise ValueError(f'Unsupported ma_kind: {ma_kind}')
+
+    return ma_values
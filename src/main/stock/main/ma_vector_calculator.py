@@ -0,0 +1,451 @@
+import os
+import sys
+import pathlib
+import datetime
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from logging import Logger
+from sqlalchemy.orm import Session
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent)))
+from stock.dto.stock_dto import StockPrice, StockPriceMA  # noqa: #402
+
+
+def calc_sma(
+    closes: np.ndarray,
+    span: int,
+) -> np.ndarray:
+    """
+    累積和により単純移動平均(SMA)を計算する
+
+    Parameters
+    ----------
+    closes: np.ndarray
+        日付順の終値の配列
+    span: int
+        移動平均の計算日数(X日移動平均)
+
+    Returns
+    ----------
+    sma: np.ndarray
+        span日目以降の各日付の単純移動平均(長さはlen(closes) - span + 1)
+    """
+    if len(closes) < span:
+        return np.empty(0)
+    cumsum = np.cumsum(np.insert(closes, 0, 0.0))
+    return (cumsum[span:] - cumsum[:-span]) / span
+
+
+def calc_ema(
+    closes: np.ndarray,
+    span: int,
+) -> np.ndarray:
+    """
+    1日目の終値を起点とする漸化式により指数平滑移動平均(EMA)を計算する
+
+    EMACalculatorと同様に、平滑化定数alpha = 2 / (1 + span)として
+    alpha * 当日の終値 + (1 - alpha) * 前日のEMA を計算する(pandasのewm(adjust=False)と同じ定義)
+
+    Parameters
+    ----------
+    closes: np.ndarray
+        日付順の終値の配列
+    span: int
+        移動平均の計算日数(X日移動平均)
+
+    Returns
+    ----------
+    ema: np.ndarray
+        span日目以降の各日付の指数平滑移動平均(長さはlen(closes) - span + 1)
+    """
+    if len(closes) < span:
+        return np.empty(0)
+    ema = pd.Series(closes).ewm(span=span, adjust=False).mean().to_numpy()
+    return ema[span - 1:]
+
+
+def calc_wma(
+    closes: np.ndarray,
+    span: int,
+) -> np.ndarray:
+    """
+    畳み込みにより加重移動平均(WMA)を計算する
+
+    当日の重みをspan、span-1日前の重みを1とし、重みの総和で割った値を計算する
+
+    Parameters
+    ----------
+    closes: np.ndarray
+        日付順の終値の配列
+    span: int
+        移動平均の計算日数(X日移動平均)
+
+    Returns
+    ----------
+    wma: np.ndarray
+        span日目以降の各日付の加重移動平均(長さはlen(closes) - span + 1)
+    """
+    if len(closes) < span:
+        return np.empty(0)
+    denominator = sum(range(span + 1))  # 重みの分母となる数
+    # np.convolveは重みを反転して適用するので、当日の重みが先頭となるように並べる
+    weights = np.arange(span, 0, -1) / denominator
+    return np.convolve(closes, weights, mode='valid')
+
+
+class VectorSMACalculator(object):
+    """
+    NumPyの累積和により単純移動平均(SMA)を計算する
+
+    企業毎の終値を初回のget_ma_values()呼び出し時にload_close_prices()により1度だけ取得して保持し、
+    span毎の計算では再取得しない。get_ma_values()を実装する
+    """
+    def __init__(
+        self,
+        session: Session,
+        logger: Logger,
+        company_ids: List[str],
+    ):
+        self.session = session
+        self.logger = logger
+        self.company_ids = company_ids
+        self.close_prices = None
+
+    def calc_ma_values(
+        self,
+        closes: np.ndarray,
+        span: int,
+    ) -> np.ndarray:
+        """
+        日付順の終値の配列から、span日目以降の各日付の単純移動平均(SMA)を計算する
+        """
+        return calc_sma(closes, span)
+
+    def get_ma_values(
+        self,
+        span: int,
+        start_date: datetime.date = None,
+        end_date: datetime.date = None,
+    ) -> List[StockPriceMA]:
+        """
+        指定期間・指定日数について、単純移動平均(SMA)を計算する
+
+        移動平均は全期間の終値から計算し、結果のみを指定期間で絞り込む
+
+        Parameters
+        ----------
+        span: int
+            移動平均の計算日数(X日移動平均)
+        start_date: datetime.date
+            移動平均の計算期間開始日
+        end_date: datetime.date
+            移動平均の計算期間終了日
+
+        Returns
+        ----------
+        sma_dtos: List[StockPriceMA]
+            stockprice_MAテーブルのDtoのリスト
+        """
+        if self.close_prices is None:
+            self.close_prices = load_close_prices(
+                self.session, self.company_ids)
+
+        sma_dtos = []
+        for company_id, (dates, closes) in self.close_prices.items():
+            sma_dtos += to_ma_dtos(
+                company_id, f'sma{span}', dates[span - 1:],
+                self.calc_ma_values(closes, span), start_date, end_date)
+        return sma_dtos
+
+
+class VectorEMACalculator(object):
+    """
+    pandasのewm()により指数平滑移動平均(EMA)を計算する
+
+    企業毎の終値を初回のget_ma_values()呼び出し時にload_close_prices()により1度だけ取得して保持し、
+    span毎の計算では再取得しない。get_ma_values()を実装する
+    """
+    def __init__(
+        self,
+        session: Session,
+        logger: Logger,
+        company_ids: List[str],
+    ):
+        self.session = session
+        self.logger = logger
+        self.company_ids = company_ids
+        self.close_prices = None
+
+    def calc_ma_values(
+        self,
+        closes: np.ndarray,
+        span: int,
+    ) -> np.ndarray:
+        """
+        日付順の終値の配列から、span日目以降の各日付の指数平滑移動平均(EMA)を計算する
+        """
+        return calc_ema(closes, span)
+
+    def get_ma_values(
+        self,
+        span: int,
+        start_date: datetime.date = None,
+        end_date: datetime.date = None,
+    ) -> List[StockPriceMA]:
+        """
+        指定期間・指定日数について、指数平滑移動平均(EMA)を計算する
+
+        移動平均は全期間の終値から計算し、結果のみを指定期間で絞り込む
+
+        Parameters
+        ----------
+        span: int
+            移動平均の計算日数(X日移動平均)
+        start_date: datetime.date
+            移動平均の計算期間開始日
+        end_date: datetime.date
+            移動平均の計算期間終了日
+
+        Returns
+        ----------
+        ema_dtos: List[StockPriceMA]
+            stockprice_MAテーブルのDtoのリスト
+        """
+        if self.close_prices is None:
+            self.close_prices = load_close_prices(
+                self.session, self.company_ids)
+
+        ema_dtos = []
+        for company_id, (dates, closes) in self.close_prices.items():
+            ema_dtos += to_ma_dtos(
+                company_id, f'ema{span}', dates[span - 1:],
+                self.calc_ma_values(closes, span), start_date, end_date)
+        return ema_dtos
+
+
+class VectorWMACalculator(object):
+    """
+    NumPyの畳み込みにより加重移動平均(WMA)を計算する
+
+    企業毎の終値を初回のget_ma_values()呼び出し時にload_close_prices()により1度だけ取得して保持し、
+    span毎の計算では再取得しない。get_ma_values()を実装する
+    """
+    def __init__(
+        self,
+        session: Session,
+        logger: Logger,
+        company_ids: List[str],
+    ):
+        self.session = session
+        self.logger = logger
+        self.company_ids = company_ids
+        self.close_prices = None
+
+    def calc_ma_values(
+        self,
+        closes: np.ndarray,
+        span: int,
+    ) -> np.ndarray:
+        """
+        日付順の終値の配列から、span日目以降の各日付の加重移動平均(WMA)を計算する
+        """
+        return calc_wma(closes, span)
+
+    def get_ma_values(
+        self,
+        span: int,
+        start_date: datetime.date = None,
+        end_date: datetime.date = None,
+    ) -> List[StockPriceMA]:
+        """
+        指定期間・指定日数について、加重移動平均(WMA)を計算する
+
+        移動平均は全期間の終値から計算し、結果のみを指定期間で絞り込む
+
+        Parameters
+        ----------
+        span: int
+            移動平均の計算日数(X日移動平均)
+        start_date: datetime.date
+            移動平均の計算期間開始日
+        end_date: datetime.date
+            移動平均の計算期間終了日
+
+        Returns
+        ----------
+        wma_dtos: List[StockPriceMA]
+            stockprice_MAテーブルのDtoのリスト
+        """
+        if self.close_prices is None:
+            self.close_prices = load_close_prices(
+                self.session, self.company_ids)
+
+        wma_dtos = []
+        for company_id, (dates, closes) in self.close_prices.items():
+            wma_dtos += to_ma_dtos(
+                company_id, f'wma{span}', dates[span - 1:],
+                self.calc_ma_values(closes, span), start_date, end_date)
+        return wma_dtos
+
+
+class MultiMACalculator(object):
+    """
+    複数の移動平均の種類・日数の組み合わせを、企業毎の終値を1度だけ読み込んで一括で計算する
+
+    SQLの各Calculatorクラスは種類・日数毎にstockpriceテーブルを走査するため、
+    計算条件を増やすとその数に比例して走査回数が増えるが、本クラスでは走査は1回のみとなる。
+
+    Attributes
+    ----------
+    ma_functions: Dict[str, Callable]
+        移動平均の種類をキー、計算関数をバリューとするディクショナリ
+    """
+    ma_functions = {
+        'sma': calc_sma,
+        'ema': calc_ema,
+        'wma': calc_wma,
+    }
+
+    def __init__(
+        self,
+        session: Session,
+        logger: Logger,
+        company_ids: List[str],
+    ):
+        self.session = session
+        self.logger = logger
+        self.company_ids = company_ids
+
+    def get_ma_values(
+        self,
+        ma_specs: List[Tuple[str, int]],
+        start_date: datetime.date = None,
+        end_date: datetime.date = None,
+    ) -> List[StockPriceMA]:
+        """
+        指定期間について、指定の移動平均の種類・日数の組み合わせ全ての移動平均を計算する
+
+        Parameters
+        ----------
+        ma_specs: List[Tuple[str, int]]
+            移動平均の種類('sma', 'ema', 'wma')と計算日数の組み合わせのリスト
+            例) [('sma', 5), ('ema', 25)]
+        start_date: datetime.date
+            移動平均の計算期間開始日
+        end_date: datetime.date
+            移動平均の計算期間終了日
+
+        Returns
+        ----------
+        ma_dtos: List[StockPriceMA]
+            stockprice_MAテーブルのDtoのリスト
+        """
+        for ma_kind, _ in ma_specs:
+            if ma_kind not in self.ma_functions:
+                raise ValueError(f'Unsupported ma_kind: {ma_kind}')
+
+        ma_dtos = []
+        close_prices = load_close_prices(self.session, self.company_ids)
+        for company_id, (dates, closes) in close_prices.items():
+            for ma_kind, span in ma_specs:
+                ma_dtos += to_ma_dtos(
+                    company_id, f'{ma_kind}{span}', dates[span - 1:],
+                    self.ma_functions[ma_kind](closes, span),
+                    start_date, end_date)
+
+        self.logger.info(f'Calculated {len(ma_dtos)} MA values '
+                         f'for {len(ma_specs)} conditions')
+        return ma_dtos
+
+
+def load_close_prices(
+    session: Session,
+    company_ids: List[str],
+) -> Dict[str, Tuple[List[datetime.date], np.ndarray]]:
+    """
+    指定企業の終値を1回のクエリで取得し、企業毎の日付のリストと終値のNumPy配列に変換する
+
+    終値がNULLのレコードは、SQLの各Calculatorクラス(filter_stock_prices())と同様に計算対象外とする
+
+    Parameters
+    ----------
+    session: Session
+        SQL AlchemyでDBを操作するためのSessionクラス
+    company_ids: List[str]
+        取得対象の企業IDのリスト
+
+    Returns
+    ----------
+    close_prices: Dict[str, Tuple[List[datetime.date], np.ndarray]]
+        企業IDをキー、(日付順の日付のリスト, 終値の配列)をバリューとするディクショナリ
+    """
+    results = session.query(
+        StockPrice.company_id,
+        StockPrice.date,
+        StockPrice.close_price,
+    ).filter(
+        StockPrice.company_id.in_(company_ids),
+        StockPrice.close_price.isnot(None),
+    ).order_by(
+        StockPrice.company_id,
+        StockPrice.date,
+    ).all()
+
+    price_df = pd.DataFrame(
+        results, columns=['company_id', 'date', 'close_price'])
+    close_prices = {}
+    for company_id, company_df in price_df.groupby('company_id', sort=False):
+        close_prices[company_id] = (
+            company_df['date'].tolist(),
+            company_df['close_price'].to_numpy(dtype=np.float64),
+        )
+    return close_prices
+
+
+def to_ma_dtos(
+    company_id: str,
+    ma_type: str,
+    dates: List[datetime.date],
+    ma_values: np.ndarray,
+    start_date: datetime.date = None,
+    end_date: datetime.date = None,
+) -> List[StockPriceMA]:
+    """
+    1企業・1計算条件の移動平均の配列を、指定期間のstockprice_MAテーブルのDtoのリストに変換する
+
+    Parameters
+    ----------
+    company_id: str
+        企業ID
+    ma_type: str
+        移動平均の計算条件(ex. sma5, ema25, ...)
+    dates: List[datetime.date]
+        ma_valuesの各要素に対応する日付のリスト
+    ma_values: np.ndarray
+        日付順の移動平均の配列
+    start_date: datetime.date
+        移動平均の計算期間開始日
+    end_date: datetime.date
+        移動平均の計算期間終了日
+
+    Returns
+    ----------
+    ma_dtos: List[StockPriceMA]
+        stockprice_MAテーブルのDtoのリスト
+    """
+    ma_dtos = []
+    for date, ma_value in zip(dates, ma_values):
+        if (start_date is not None) and (date < start_date):
+            continue
+        if (end_date is not None) and (date > end_date):
+            continue
+        dto = StockPriceMA()
+        dto.company_id = company_id
+        dto.date = date
+        dto.ma_type = ma_type
+        dto.ma_value = float(ma_value)
+        ma_dtos.append(dto)
+    return ma_dtos
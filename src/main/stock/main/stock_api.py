@@ -1,18 +1,61 @@
+import os
+import sys
+import pathlib
+import io
 import datetime
 import pandas as pd
-import pandas_datareader.data as web
 from typing import List
 from logging import Logger
 
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent)))
+from common.cache.response_cache import ResponseCache  # noqa: #402
+from common.http.http_client import HttpClient  # noqa: #402
+
 
 class StooqAPI(object):
     """
-    pandas-datareaderのデータソースとしてStooqというポーランドのサイトからデータを取得する。
+    StooqというポーランドのサイトのCSVダウンロードAPIからデータを取得する。
 
     get_stock_priceというインタフェースを実装し、将来的にデータソースが変わった際にStockManagerクラスに影響が及ばないようにする。
+    流量制御・リトライをHttpClientで行うため、pandas-datareaderのStooqDailyReaderと同じCSVの
+    エンドポイントをHttpClient経由で直接呼び出し、同じ形式のデータフレームに変換する。
+
+    Attributes
+    ----------
+    http_client: HttpClient
+        流量制御・リトライ付きでリクエストを送信するクラス(複数スレッドから呼び出す場合は共有する)
+    response_cache: ResponseCache
+        取得したCSVをローカルディスクにキャッシュするクラス(Noneの場合はキャッシュしない)
+    base_url: str
+        CSVダウンロードAPIのURL
     """
-    def __init__(self):
-        pass
+    base_url = 'https://stooq.com/q/d/l/'
+    # レスポンスのCSVに含まれる株価のカラム
+    price_columns = ['Open', 'High', 'Low', 'Close']
+
+    def __init__(
+        self,
+        http_client: HttpClient = None,
+        response_cache: ResponseCache = None,
+        base_url: str = None,
+    ):
+        """
+        Parameters
+        ----------
+        http_client: HttpClient
+            流量制御・リトライ付きでリクエストを送信するクラス. 指定しない場合はデフォルト設定で生成する
+        response_cache: ResponseCache
+            取得したCSVをローカルディスクにキャッシュするクラス(Noneの場合はキャッシュしない)
+        base_url: str
+            CSVダウンロードAPIのURL. 指定しない場合はStooqのURL(スタブサーバーを使用する場合に指定する)
+        """
+        self.http_client = http_client if http_client is not None \
+            else HttpClient()
+        self.response_cache = response_cache
+        if base_url is not None:
+            self.base_url = base_url
 
     def get_stock_price(
         self,
@@ -22,7 +65,7 @@ class StooqAPI(object):
         logger: Logger = None,
     ) -> List[pd.DataFrame]:
         """
-        指定の銘柄コードに対して、pandas-datareaderを使ってデータを取得するためのクラス
+        指定の銘柄コードに対して、StooqのAPIからデータを取得するためのクラス
 
         stooqデータソースから取得する株価データはStooqに存在する範囲で全てのデータを取得するようになっている
         （期間指定不可）ため、引数の開始日と終了日に従ってデータを絞り込む。デフォルトは絞り込み無し。
@@ -38,8 +81,20 @@ class StooqAPI(object):
         end_date: datetime.date
             株価データの取得終了日
         """
-        stock_df = web.DataReader(stock_code + '.JP', 'stooq')
+        def fetch() -> str:
+            return self.http_client.get(
+                self.base_url,
+                params={'s': stock_code + '.JP', 'i': 'd'},
+                logger=logger,
+            ).text
+
         try:
+            # キャッシュが有効な場合は、同日中の再実行ではリクエストを送信しない
+            # (CSVとして変換できた本文のみをキャッシュする)
+            stock_df = self.response_cache.get_or_fetch(
+                'stooq', stock_code, fetch, self._parse_csv) \
+                if self.response_cache is not None \
+                else self._parse_csv(fetch())
             # デフォルトとして開始日は2010-01-01, 終了日は本日の日付とする
             start_date = pd.to_datetime(start_date) if start_date\
                 is not None else pd.to_datetime('2010-01-01')
@@ -55,3 +110,32 @@ class StooqAPI(object):
             return None
 
         return stock_df
+
+    def _parse_csv(
+        self,
+        text: str,
+    ) -> pd.DataFrame:
+        """
+        CSVダウンロードAPIのレスポンス本文を、日付をインデックスとするデータフレームに変換する
+
+        流量制限等の場合はHTTPステータスが200のままエラーメッセージ(例: Exceeded the daily hits limit,
+        No data)が返されるため、株価のカラムを含まない場合は例外を送出する
+
+        Parameters
+        ----------
+        text: str
+            CSVダウンロードAPIのレスポンス本文
+
+        Returns
+        ----------
+        stock_df: pd.DataFrame
+            日付をインデックスとし、Open, High, Low, Close, Volumeをカラムとするデータフレーム
+        """
+        stock_df = pd.read_csv(io.StringIO(text),
+                               index_col=0,
+                               parse_dates=True,
+                               na_values=('-', 'null'))
+        missing_columns = set(self.price_columns) - set(stock_df.columns)
+        if missing_columns:
+            raise ValueError(f'Unexpected response: {text[:100]!r}')
+        return stock_df
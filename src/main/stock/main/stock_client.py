@@ -1,96 +1,434 @@
 import os
 import sys
+import time
+import zlib
+import logging
 import pathlib
-from typing import List
+import datetime
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, \
+    as_completed
+from typing import Iterator, List, Tuple
 from logging import Logger
-from sqlalchemy import distinct
 from sqlalchemy.orm import Session
 
 # src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
 sys.path.append(os.path.join(
     str(pathlib.Path(__file__).resolve().parent.parent.parent)))
-from common.db.base_engine import BaseEngine  # noqa: #402
+from common.cache.response_cache import ResponseCache  # noqa: #402
+from common.db.base_engine import BaseEngine, get_engine_settings  # noqa: #402
 from common.db.common_dao import CommonDao  # noqa: #402
+from common.db.parquet_snapshot import ParquetSnapshot  # noqa: #402
 from common.logger.common_logger import CommonLogger  # noqa: #402
+from common.metrics.metrics_recorder import MetricsRecorder  # noqa: #402
 from stock.dto.stock_dto import Company, StockPrice, StockPriceMA  # noqa: #402
 from stock.main.stock_manager import StockManager  # noqa: #402
 from stock.main.stock_factory import JpStockFactory  # noqa: #402
-from stock.main.ma_calculator import SMACalculator, EMACalculator, WMACalculator  # noqa: #402
+from stock.main.ma_calculator import SMACalculator, EMACalculator, WMACalculator, IncrementalMACalculator  # noqa: #402
+from stock.main.ma_vector_calculator import MultiMACalculator  # noqa: #402
 
 
 class StockClient(object):
     """
     各種クラスを使用して、最新の株価データを取得しDB格納するクラス
+
+    Attributes
+    ----------
+    ma_specs: List[Tuple[str, int]]
+        計算する移動平均の種類('sma', 'ema', 'wma')と計算日数の組み合わせのリスト
+    sql_ma_calculator_classes: Dict[str, object]
+        移動平均の種類をキー、SQLにより計算するCalculatorクラスをバリューとするディクショナリ
+    shard_index: int
+        処理対象のシャードの番号(0始まり)
+    shard_count: int
+        シャード数. 企業IDのハッシュ値によって企業をshard_count個に分割し、shard_index番目の企業のみを処理する
+    metrics: MetricsRecorder
+        ステージ毎の処理時間・スループット・企業毎のレイテンシを計測するクラス
     """
+    ma_specs = [
+        (ma_kind, span)
+        for ma_kind in ['sma', 'ema', 'wma']
+        for span in [5, 25, 75]  # 短期・中期・長期
+    ]
+    sql_ma_calculator_classes = {
+        'sma': SMACalculator,
+        'ema': EMACalculator,
+        'wma': WMACalculator,
+    }
+
     def __init__(
         self,
         session: Session,
         logger: Logger,
+        shard_index: int = 0,
+        shard_count: int = 1,
+        metrics: MetricsRecorder = None,
     ):
         """
         SQL AlchemyでDBを操作するためのセッションとアプリケーションログ出力用のロガーを受け取る
 
+        複数のPod(k8sのIndexed Job)で企業を分担して処理する場合は、シャードの番号とシャード数を指定する
+
         Parameters
         ----------
         session: sqlalchemy.Session
             SQL AlchemyでDBを操作するためのSessionクラス
         logger: logging.Logger
             アプリケーションログ出力用のロガー
+        shard_index: int
+            処理対象のシャードの番号(0始まり)
+        shard_count: int
+            シャード数(1の場合は全ての企業を処理する)
+        metrics: MetricsRecorder
+            処理時間・スループットを計測するクラス(指定しない場合は計測値を出力しない)
         """
+        if not (0 <= shard_index < shard_count):
+            raise ValueError(f'Invalid shard: {shard_index}/{shard_count}')
         self.session = session
         self.logger = logger
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.metrics = metrics if metrics is not None else MetricsRecorder()
+
+    def create_partitions(
+        self,
+    ):
+        """
+        新しい年の株価データ・移動平均株価がDEFAULTパーティションに格納されないよう、
+        stockpriceテーブルとstockprice_maテーブルの当年・翌年のパーティションを作成する。
 
-    def update_jp_stock_prices(self):
+        パーティションはセッションとは別のトランザクションで作成して直ちにコミットされるため、
+        株価データの取得・移動平均の計算の前に呼び出す。
+        """
+        self.logger.info('Start create_partitions Job.')
+        this_year = datetime.date.today().year
+        for dto_class in [StockPrice, StockPriceMA]:
+            dao = CommonDao(self.session, dto_class, self.logger)
+            dao.create_year_partitions(this_year, this_year + 1)
+
+    def update_jp_stock_prices(
+        self,
+        max_workers: int = 4,
+        response_cache: ResponseCache = None,
+        stock_factory: JpStockFactory = None,
+    ):
         """
         Companyテーブルに登録されている企業の中でcountry_codeが"JP"の企業について、
         StockManagerクラスにより株価データを取得し、DBにUPSERTで格納する。
+
+        DBの参照(全銘柄の最新日の一括取得)とDBへの書き込みはメインスレッドのみで行い、
+        APIの呼び出し・クローリングのみをスレッドプールで並行して実行する。
+        データソースへの流量制御・リトライはJpStockFactoryが生成するHttpClientにより行う。
+
+        Parameters
+        ----------
+        max_workers: int
+            株価データを並行して取得するスレッド数
+        response_cache: ResponseCache
+            データソースのレスポンスをローカルディスクにキャッシュするクラス.
+            再実行時にはキャッシュを使用し、ネットワークアクセスを行わない(Noneの場合はキャッシュしない)
+        stock_factory: JpStockFactory
+            StockAPIクラス・StockCrawlerクラスを生成するファクトリ.
+            指定しない場合は各サイトから取得する(スタブサーバーによるベンチマークで指定する)
         """
         self.logger.info('Start update_jp_stock_prices Job.')
-        dao = CommonDao(session, StockPrice, logger)
-        stock_factory = JpStockFactory()
-        stock_codes = stock_factory.get_target_stock_codes(self.session)
+        dao = CommonDao(self.session, StockPrice, self.logger, self.metrics)
+        # 並行して取得するスレッド数分のコネクションをKeep-Aliveで再利用する
+        if stock_factory is None:
+            stock_factory = JpStockFactory(pool_size=max_workers,
+                                           response_cache=response_cache)
         stock_manager = StockManager(
             self.session,
             stock_factory.get_stock_api(),
             stock_factory.get_stock_crawler(),
         )
-        for stock_code in stock_codes:
-            self.logger.info(f'Fetch StockCode:{stock_code} prices')
-            company_id = self.get_company_id(stock_code, 'JP')
-            stock_price_dtos = stock_manager.get_incremental_stock_price(
-                stock_code,
-                company_id,
-            )
-            # UPSERTによりDB更新
-            if (stock_price_dtos is not None) and (len(stock_price_dtos) >= 1):
-                dao.upsert(stock_price_dtos, ['company_id', 'date'])
-
-    def calculate_ma(self):
+        stage = 'stock_client.update_jp_stock_prices'
+        with self.metrics.timer(stage) as timer, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # 全銘柄の企業IDと最新日を1回のクエリで取得し、取得方法をメモリ上で判定する
+            with self.metrics.timer('stock_client.plan_fetch'):
+                recent_dates = stock_manager.get_recent_dates('JP')
+            futures = {}
+            for stock_code, (company_id, recent_date) in recent_dates.items():
+                # 他のシャードが処理する企業は対象外とする
+                if not self.is_in_shard(company_id):
+                    continue
+                if stock_manager.get_fetch_method(recent_date) == 'skip':
+                    continue
+                future = executor.submit(self._fetch_stock_price,
+                                         stock_manager, stock_code,
+                                         recent_date)
+                futures[future] = (stock_code, company_id)
+
+            # 取得が完了した銘柄から順に、メインスレッドでDBへ書き込む
+            timer.rows = 0
+            for future in as_completed(futures):
+                stock_code, company_id = futures[future]
+                self.logger.info(f'Fetch StockCode:{stock_code} prices')
+                # DTOを生成せずにディクショナリのままUPSERTする
+                start_time = time.perf_counter()
+                stock_price_records = stock_manager.to_stock_price_records(
+                    future.result(),
+                    company_id,
+                )
+                self.metrics.histogram(
+                    'stock_client.convert_latency_ms',
+                    (time.perf_counter() - start_time) * 1000)
+                # UPSERTによりDB更新
+                if (stock_price_records is not None) and \
+                   (len(stock_price_records) >= 1):
+                    dao.upsert(stock_price_records, ['company_id', 'date'])
+                    timer.rows += len(stock_price_records)
+                else:
+                    self.metrics.increment('stock_client.fetch_empty')
+
+    def _fetch_stock_price(
+        self,
+        stock_manager: StockManager,
+        stock_code: str,
+        recent_date: datetime.date,
+    ) -> pd.DataFrame:
+        """
+        スレッドプールのスレッドで株価データを取得し、取得方法毎のレイテンシを計測する
+
+        Parameters
+        ----------
+        stock_manager: StockManager
+            株価データを取得するStockManagerクラス
+        stock_code: str
+            株価取得対象となる銘柄コード
+        recent_date: datetime.date
+            DBに保持している株価データの最新日(データが無い場合はNone)
+
+        Returns
+        ----------
+        stock_df: pd.DataFrame
+            株価データを保持したデータフレーム(取得失敗の場合はNone)
+        """
+        start_time = time.perf_counter()
+        stock_df = stock_manager.fetch_stock_price(stock_code, recent_date)
+        self.metrics.histogram(
+            'stock_client.fetch_latency_ms',
+            (time.perf_counter() - start_time) * 1000,
+            {'method': stock_manager.get_fetch_method(recent_date)})
+        return stock_df
+
+    def calculate_ma(
+        self,
+        incremental: bool = False,
+        engine: str = 'sql',
+        ma_specs: List[Tuple[str, int]] = None,
+        company_batch_size: int = None,
+        processes: int = None,
+    ):
         """
         stockpriceテーブルに登録されている全ての企業に対して、単純移動平均・指数平滑移動平均・加重移動平均
         の3通りの方法で日次の値を計算し、stockprice_maテーブルに格納する。
 
-        暫定で短期(5日)・中期(25日)・長期(75日)の3パターンを計算するが、MACalculatorクラスのインタフェースとしては
-        任意の日数で計算できるようにしておき、日数変更が用意なようにしておく。
+        シャード数が2以上の場合は、自身のシャードの企業のみを増分計算する(incremental=Trueのみ)。
+        デフォルトでは短期(5日)・中期(25日)・長期(75日)の3パターンを計算するが、
+        ma_specsにより任意の種類・日数の組み合わせを計算できる。
+
+        incremental=Trueの場合は、IncrementalMACalculatorにより(company_id, ma_type)毎の
+        計算済みの最新日より後の日付のみを計算してUPSERTする。Falseの場合は全期間を計算して全DEL全INSで洗い替える。
+        stockprice_maテーブルは年単位のパーティションテーブルのため、増分計算の書き込みは当年のパーティションのみとなり、
+        全DEL全INSではDELETEではなくTRUNCATEで削除する。
+
+        company_batch_sizeを指定した場合は、企業をcompany_batch_size社毎に分けて計算し、
+        計算結果をジェネレータでCOPYのチャンク単位に書き出す(ストリーミング)。
+        メモリ上に保持する株価データ・計算結果は1バッチ分のみとなるため、企業数が増えてもメモリ使用量は増えない。
 
-        TODO: 一度全体を計算した後は最新日を計算するだけで十分なので、実行時間が長くなってきたら判定ロジックを追加する。
+        processesを指定した場合は、企業のバッチをプロセスプールで並行して計算し、
+        各プロセスの計算結果をメインプロセスで1回のCOPYにまとめて書き込む。
+        各プロセスは自身のEngine・Sessionを生成してDBに接続するため、コミット済みのデータのみを参照する。
+
+        Parameters
+        ----------
+        incremental: bool
+            計算済みの最新日より後の日付のみを計算するかどうか
+        engine: str
+            全期間を計算する際の計算エンジン
+            sql: 種類・日数毎にSQL(ウィンドウ関数・再帰CTE・自己結合)により計算する
+            numpy: MultiMACalculatorにより、終値を1度だけ読み込んでNumPyで一括計算する
+        ma_specs: List[Tuple[str, int]]
+            計算する移動平均の種類と計算日数の組み合わせのリスト(デフォルトはStockClient.ma_specs)
+        company_batch_size: int
+            1回に計算する企業数(指定しない場合は全企業を一括で計算する.
+            processesを指定した場合はプロセス数で等分する)
+        processes: int
+            移動平均を並行して計算するプロセス数(指定しない場合はメインプロセスのみで計算する)
         """
         self.logger.info('Start calculate_ma Job.')
-        dao = CommonDao(session, StockPriceMA, logger)
-        ma_dtos = []
+        if (not incremental) and (engine not in ('sql', 'numpy')):
+            raise ValueError(f'Unsupported engine: {engine}')
+        # 全DEL全INSは他のシャードの企業のレコードも削除するため、シャード毎には実行できない
+        if (not incremental) and (self.shard_count > 1):
+            raise ValueError('Full recalculation of MA cannot be sharded')
+        dao = CommonDao(self.session, StockPriceMA, self.logger, self.metrics)
         company_ids = self.get_calc_companies()
-        calculators = [
-            SMACalculator(self.session, self.logger, company_ids),
-            EMACalculator(self.session, self.logger, company_ids),
-            WMACalculator(self.session, self.logger, company_ids),
-        ]
-        spans = [5, 25, 75]  # 計算期間
+        ma_specs = ma_specs if ma_specs is not None else self.ma_specs
+        if processes:
+            ma_dtos = self._iter_ma_values_parallel(
+                company_ids, incremental, engine, ma_specs,
+                company_batch_size, processes)
+        else:
+            ma_dtos = self._iter_ma_values(
+                company_ids, incremental, engine, ma_specs,
+                company_batch_size)
+
+        # 移動平均の計算はCOPYへのストリーミング中に行われるため、計算と書き込みをまとめて計測する
+        mode = 'incremental' if incremental else engine
+        with self.metrics.timer('stock_client.calculate_ma', {'mode': mode}):
+            if incremental:
+                # 新規の日付のみをUPSERTにより更新
+                dao.copy_load(ma_dtos, ['company_id', 'date', 'ma_type'])
+            else:
+                # DELSERTにより全件洗い替え
+                dao.delsert(ma_dtos, ['company_id', 'date', 'ma_type'])
+
+    def _iter_ma_values(
+        self,
+        company_ids: List[str],
+        incremental: bool,
+        engine: str,
+        ma_specs: List[Tuple[str, int]],
+        company_batch_size: int = None,
+    ) -> Iterator[StockPriceMA]:
+        """
+        企業をcompany_batch_size社毎に分けて移動平均を計算し、計算結果を順次返す
+
+        Parameters
+        ----------
+        company_ids: List[str]
+            計算対象の企業IDのリスト
+        incremental: bool
+            計算済みの最新日より後の日付のみを計算するかどうか
+        engine: str
+            全期間を計算する際の計算エンジン('sql', 'numpy')
+        ma_specs: List[Tuple[str, int]]
+            計算する移動平均の種類と計算日数の組み合わせのリスト
+        company_batch_size: int
+            1回に計算する企業数(指定しない場合は全企業を一括で計算する)
+
+        Returns
+        ----------
+        ma_dtos: Iterator[StockPriceMA]
+            stockprice_MAテーブルのDtoのイテレータ
+        """
+        batch_size = company_batch_size if company_batch_size \
+            else max(len(company_ids), 1)
+        for start in range(0, len(company_ids), batch_size):
+            batch_ids = company_ids[start:start + batch_size]
+            if incremental:
+                calculator = IncrementalMACalculator(
+                    self.session, self.logger, batch_ids)
+                yield from calculator.get_ma_values(ma_specs)
+            elif engine == 'numpy':
+                calculator = MultiMACalculator(
+                    self.session, self.logger, batch_ids)
+                yield from calculator.get_ma_values(ma_specs)
+            else:
+                calculators = {
+                    ma_kind: calculator_class(
+                        self.session, self.logger, batch_ids)
+                    for ma_kind, calculator_class
+                    in self.sql_ma_calculator_classes.items()
+                }
+                for ma_kind, span in ma_specs:
+                    yield from calculators[ma_kind].get_ma_values(span)
+            if company_batch_size:
+                self.logger.info(f'Calculated MA values for '
+                                 f'{start + len(batch_ids)}/'
+                                 f'{len(company_ids)} companies')
+
+    def _iter_ma_values_parallel(
+        self,
+        company_ids: List[str],
+        incremental: bool,
+        engine: str,
+        ma_specs: List[Tuple[str, int]],
+        company_batch_size: int,
+        processes: int,
+    ) -> Iterator[dict]:
+        """
+        企業のバッチ毎に移動平均をプロセスプールで並行して計算し、計算が完了したバッチから順に計算結果を返す
 
-        for calculator in calculators:
-            for span in spans:
-                ma_dtos.extend(calculator.get_ma_values(span))
-        # DELSERTにより更新(TODO対応後はUPSERTに変更)
-        dao.delsert(ma_dtos, ['company_id', 'date', 'ma_type'])
+        プロセス間の受け渡しはDTOではなく、カラム名をキーとするディクショナリで行う
+
+        Parameters
+        ----------
+        company_ids: List[str]
+            計算対象の企業IDのリスト
+        incremental: bool
+            計算済みの最新日より後の日付のみを計算するかどうか
+        engine: str
+            全期間を計算する際の計算エンジン('sql', 'numpy')
+        ma_specs: List[Tuple[str, int]]
+            計算する移動平均の種類と計算日数の組み合わせのリスト
+        company_batch_size: int
+            1プロセスで1回に計算する企業数(指定しない場合はプロセス数で等分する)
+        processes: int
+            移動平均を並行して計算するプロセス数
+
+        Returns
+        ----------
+        ma_records: Iterator[dict]
+            stockprice_maテーブルのカラム名をキーとするディクショナリのイテレータ
+        """
+        batch_size = company_batch_size if company_batch_size \
+            else max(-(-len(company_ids) // processes), 1)
+        # ワーカープロセスでも親プロセスと同じstatement_timeout・接続プール設定でEngineを生成する
+        connect_args, engine_kwargs = get_engine_settings(
+            self.session.get_bind())
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(_calc_ma_records, connect_args, engine_kwargs,
+                                company_ids[start:start + batch_size],
+                                incremental, engine, ma_specs)
+                for start in range(0, len(company_ids), batch_size)
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    def export_snapshots(
+        self,
+        snapshot_dir: str,
+        partition_by: str = 'month',
+    ):
+        """
+        stockpriceテーブルとstockprice_maテーブルの全レコードを、Parquetのスナップショットとして書き出す。
+
+        分析・ダッシュボードからの大量レコードの走査はスナップショットをメモリマップで読み込むことで、
+        DBとORMを経由せずに行う。
+        スナップショットは任意の出力のため、取得・計算した株価データのコミット後に呼び出し、
+        書き出しに失敗した場合(ディスク容量・権限・pyarrow未インストール等)はエラーをロギングして処理を続ける。
+
+        Parameters
+        ----------
+        snapshot_dir: str
+            スナップショットを保存するディレクトリ
+        partition_by: str
+            スナップショットの分割方法('company': 企業毎, 'month': 月毎)
+
+        Returns
+        ----------
+        succeeded: bool
+            全てのテーブルのスナップショットを書き出せた場合はTrue
+        """
+        self.logger.info('Start export_snapshots Job.')
+        succeeded = True
+        for dto_class in [StockPrice, StockPriceMA]:
+            try:
+                snapshot = ParquetSnapshot(snapshot_dir)
+                snapshot.export(self.session, self.logger, dto_class,
+                                partition_by=partition_by)
+            except Exception as e:
+                self.logger.error(f'Failed export_snapshots '
+                                  f'{dto_class.__tablename__}: {e}')
+                # 読み込みのみのトランザクションのため、ロールバックしても更新は失われない
+                self.session.rollback()
+                succeeded = False
+        return succeeded
 
     def get_company_id(
         self,
@@ -115,18 +453,124 @@ class StockClient(object):
 
     def get_calc_companies(self) -> List[str]:
         """
-        移動平均の計算対象企業を企業IDで取得する
+        移動平均の計算対象企業のうち、自身のシャードの企業を企業IDで取得する
+
+        stockpriceテーブル全体のDISTINCTではなく、companyテーブルの企業毎に株価データの有無を
+        EXISTSで判定するため、主キーのインデックスを1件探索するのみで判定できる
 
         Returns
         ----------
         company_ids: List[str]
-            移動平均の計算対象企業IDのリスト
+            移動平均の計算対象企業IDのリスト(企業IDの昇順)
         """
-        result = self.session.query(
-            distinct(StockPrice.company_id).label('company_id')).all()
-        company_ids = [res.company_id for res in result]
+        has_stock_prices = self.session.query(StockPrice.company_id).filter(
+            StockPrice.company_id == Company.company_id
+        ).exists()
+        result = self.session.query(Company.company_id).filter(
+            has_stock_prices
+        ).order_by(Company.company_id).all()
+        company_ids = [res.company_id for res in result
+                       if self.is_in_shard(res.company_id)]
         return company_ids
 
+    def is_in_shard(
+        self,
+        company_id: str,
+    ) -> bool:
+        """
+        企業IDが自身のシャードの処理対象かどうかを返す
+
+        Pod間で同じ結果となるように、Pythonのhash()ではなくCRC32により分割する
+
+        Parameters
+        ----------
+        company_id: str
+            判定対象の企業ID
+
+        Returns
+        ----------
+        in_shard: bool
+            自身のシャードの処理対象の場合はTrue
+        """
+        return zlib.crc32(company_id.encode('utf-8')) % self.shard_count \
+            == self.shard_index
+
+
+def _calc_ma_records(
+    connect_args: Tuple,
+    engine_kwargs: dict,
+    company_ids: List[str],
+    incremental: bool,
+    engine: str,
+    ma_specs: List[Tuple[str, int]],
+) -> List[dict]:
+    """
+    プロセスプールのワーカープロセスで、指定企業の移動平均を計算する
+
+    ワーカープロセス毎にEngine・Sessionを生成し、計算後に破棄する
+
+    Parameters
+    ----------
+    connect_args: Tuple
+        BaseEngineに渡すDB接続情報(ユーザー名, パスワード, ホスト, ポート番号, データベース名)
+    engine_kwargs: dict
+        BaseEngineに渡す接続プール設定・statement_timeout(親プロセスのBaseEngineと同じ設定)
+    company_ids: List[str]
+        計算対象の企業IDのリスト
+    incremental: bool
+        計算済みの最新日より後の日付のみを計算するかどうか
+    engine: str
+        全期間を計算する際の計算エンジン('sql', 'numpy')
+    ma_specs: List[Tuple[str, int]]
+        計算する移動平均の種類と計算日数の組み合わせのリスト
+
+    Returns
+    ----------
+    ma_records: List[dict]
+        stockprice_maテーブルのカラム名をキーとするディクショナリのリスト
+    """
+    base_engine = BaseEngine(*connect_args, **engine_kwargs)
+    session = base_engine.get_session()
+    # 同一のワーカープロセスで複数のバッチを計算する場合に、ハンドラが重複して追加されないようにする
+    logger = logging.getLogger(__name__)
+    if not logger.handlers:
+        logger = CommonLogger().get_application_logger(__name__)
+    try:
+        stock_client = StockClient(session, logger)
+        return [
+            {
+                'company_id': dto.company_id,
+                'date': dto.date,
+                'ma_type': dto.ma_type,
+                'ma_value': dto.ma_value,
+            }
+            for dto in stock_client._iter_ma_values(
+                company_ids, incremental, engine, ma_specs)
+        ]
+    finally:
+        session.close()
+        base_engine.dispose()
+
+
+def get_shard_from_env() -> Tuple[int, int]:
+    """
+    環境変数からシャードの番号とシャード数を取得する
+
+    シャードの番号はSHARD_INDEX、未指定の場合はk8sのIndexed Jobが設定するJOB_COMPLETION_INDEXを使用し、
+    シャード数はSHARD_COUNT(Indexed Jobのcompletionsと同じ値)を使用する
+
+    Returns
+    ----------
+    shard_index: int
+        処理対象のシャードの番号(0始まり)
+    shard_count: int
+        シャード数
+    """
+    shard_index = int(os.environ.get(
+        'SHARD_INDEX', os.environ.get('JOB_COMPLETION_INDEX', 0)))
+    shard_count = int(os.environ.get('SHARD_COUNT', 1))
+    return shard_index, shard_count
+
 
 if __name__ == '__main__':
     session = BaseEngine(
@@ -135,14 +579,57 @@ if __name__ == '__main__':
         os.environ['POSTGRES_HOST'],
         os.environ['POSTGRES_PORT'],
         os.environ['POSTGRES_DB'],
+        statement_timeout=int(os.environ['DB_STATEMENT_TIMEOUT'])
+        if os.environ.get('DB_STATEMENT_TIMEOUT') else None,
     ).get_session()
 
     logger = CommonLogger().get_application_logger(
         __name__,
     )
 
-    stock_client = StockClient(session, logger)
-    stock_client.update_jp_stock_prices()
-    stock_client.calculate_ma()
+    # RESPONSE_CACHE_DIRを指定した場合のみ、データソースのレスポンスをキャッシュする
+    response_cache = None
+    if os.environ.get('RESPONSE_CACHE_DIR'):
+        response_cache = ResponseCache(
+            os.environ['RESPONSE_CACHE_DIR'],
+            ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 24 * 60 * 60)),
+            max_bytes=int(os.environ.get('RESPONSE_CACHE_MAX_BYTES',
+                                         1024 ** 3)),
+            offline=os.environ.get('RESPONSE_CACHE_OFFLINE') == '1',
+        )
 
+    shard_index, shard_count = get_shard_from_env()
+    # 計測値は構造化ログに出力し、DD_AGENT_HOSTを指定した場合はDogStatsDでも送信する
+    metrics = MetricsRecorder(
+        logger,
+        statsd_host=os.environ.get('DD_AGENT_HOST'),
+        statsd_port=int(os.environ.get('DD_DOGSTATSD_PORT', 8125)),
+        tags={'shard': str(shard_index)},
+    )
+    stock_client = StockClient(session, logger, shard_index, shard_count,
+                               metrics)
+    stock_client.create_partitions()
+    stock_client.update_jp_stock_prices(
+        max_workers=int(os.environ.get('FETCH_WORKERS', 4)),
+        response_cache=response_cache,
+    )
+    # 移動平均の計算を複数プロセスで行う場合は、各プロセスから参照できるように取得した株価をコミットする
+    ma_processes = int(os.environ.get('MA_PROCESSES', 0))
+    if ma_processes:
+        session.commit()
+    stock_client.calculate_ma(
+        incremental=True,
+        company_batch_size=int(os.environ.get('MA_COMPANY_BATCH_SIZE', 500)),
+        processes=ma_processes,
+    )
     session.commit()
+
+    # SNAPSHOT_DIRを指定した場合のみ、Parquetのスナップショットを書き出す
+    # (コミット後に書き出すため、書き出しに失敗しても取得・計算した株価データは失われない.
+    #  シャード毎に実行する場合は他のシャードの完了を待てないため、書き出さない)
+    if os.environ.get('SNAPSHOT_DIR') and (shard_count == 1):
+        stock_client.export_snapshots(
+            os.environ['SNAPSHOT_DIR'],
+            partition_by=os.environ.get('SNAPSHOT_PARTITION_BY', 'month'),
+        )
+    metrics.log_summary()
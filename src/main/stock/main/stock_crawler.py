@@ -1,9 +1,25 @@
-import time
-import requests
+import os
+import sys
+import pathlib
+import datetime
 import pandas as pd
 from logging import Logger
 from typing import List
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent)))
+from common.cache.response_cache import ResponseCache  # noqa: #402
+from common.http.http_client import HttpClient  # noqa: #402
+from common.http.rate_limiter import HostRateLimiter  # noqa: #402
+
+# lxmlがインストールされている場合は高速なlxmlのパーサを使用し、存在しない場合はhtml.parserを使用する
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 
 class KabutanCrawler(object):
@@ -11,19 +27,54 @@ class KabutanCrawler(object):
     Webクローリングのデータソースとしてhttps://kabutan.jp/のサイトからデータを取得する。
 
     get_stock_priceというインタフェースを実装し、将来的にデータソースが変わった際にStockManagerクラスに影響が及ばないようにする。
+
+    Attributes
+    ----------
+    http_client: HttpClient
+        流量制御・リトライ付きでリクエストを送信するクラス(複数スレッドから呼び出す場合は共有する)
+    response_cache: ResponseCache
+        取得したHTMLをローカルディスクにキャッシュするクラス(Noneの場合はキャッシュしない)
+    base_url: str
+        株価ページのURL(銘柄コードはクエリパラメータcodeで指定する)
     """
-    def __init__(self):
-        pass
+    base_url = 'https://kabutan.jp/stock/kabuka'
+    # 株価データを保持するテーブル(stock_kabuka0: 最新日, stock_kabuka_dwm: 過去の日次データ)
+    stock_table_classes = ['stock_kabuka0', 'stock_kabuka_dwm']
+
+    def __init__(
+        self,
+        http_client: HttpClient = None,
+        response_cache: ResponseCache = None,
+        base_url: str = None,
+    ):
+        """
+        Parameters
+        ----------
+        http_client: HttpClient
+            流量制御・リトライ付きでリクエストを送信するクラス.
+            指定しない場合はkabutan.jpへのアクセスを1秒に1回までとし、
+            コネクションプールによりKeep-Aliveでコネクションを再利用する
+        response_cache: ResponseCache
+            取得したHTMLをローカルディスクにキャッシュするクラス(Noneの場合はキャッシュしない)
+        base_url: str
+            株価ページのURL. 指定しない場合はkabutan.jpのURL(スタブサーバーを使用する場合に指定する)
+        """
+        self.http_client = http_client if http_client is not None \
+            else HttpClient(HostRateLimiter({'kabutan.jp': 1.0}))
+        self.response_cache = response_cache
+        if base_url is not None:
+            self.base_url = base_url
 
     def get_stock_price(
         self,
         stock_code: str,
         logger: Logger = None,
+        start_date: datetime.date = None,
     ) -> List[pd.DataFrame]:
         """
         指定の銘柄コードに対して、BeautifulSoupを使ってデータを取得するためのクラス
 
-        start_dateが現在の日付と一致している場合、クローリングを実施しない。
+        ページ内の最新日と過去の日次データを全て取得するため、1回のリクエストで複数日の欠損を埋めることができる。
 
         Parameters
         ----------
@@ -31,29 +82,69 @@ class KabutanCrawler(object):
             株価取得対象となる銘柄コード
         logger: logging.Logger
             アプリケーションで使用するロガー
+        start_date: datetime.date
+            株価データの取得開始日(指定しない場合はページ内の全ての日付を返す)
         """
-        # クローリングの間隔を最低1secは空ける
-        time.sleep(1)
-        base_url = f'https://kabutan.jp/stock/kabuka?code={stock_code}'
+        def fetch() -> str:
+            # 同一ホストへのクローリングの流量制御・一時的な失敗のリトライはHttpClientで行う
+            return self.http_client.get(
+                self.base_url,
+                params={'code': stock_code},
+                logger=logger,
+            ).text
+
         try:
-            response = requests.get(base_url)
-            bs = BeautifulSoup(response.text, 'html.parser')
-            stock_data = {}
-            # stock_kabuka0テーブルのth要素は日付、td要素は始値、高値、安値、終値、前日比、前日比%、売買高の順に並ぶ
-            stock_table = bs.find('table', class_='stock_kabuka0')
-            stock_data['Date'] = pd.to_datetime(
-                stock_table.find('tbody').find('th').time['datetime'])
-
-            columns = ['Open', 'High', 'Low', 'Close', None, None, 'Volume']
-            for col_name, data in zip(columns,
-                                      stock_table.find('tbody').
-                                      find_all(['td'])):
-                if col_name:
-                    stock_data[col_name] = data.get_text().replace(',', '')
-            stock_df = pd.DataFrame([stock_data]).set_index('Date')
+            # 株価データのテーブルを変換できたHTMLのみをキャッシュする
+            stock_df = self.response_cache.get_or_fetch(
+                'kabutan', stock_code, fetch, self._parse_stock_tables) \
+                if self.response_cache is not None \
+                else self._parse_stock_tables(fetch())
+            if start_date is not None:
+                stock_df = stock_df[
+                    stock_df.index >= pd.to_datetime(start_date)]
         except Exception as e:
             if logger is not None:
                 logger.error(f'Cannot crawl {stock_code}: {e}')
             return None
 
         return stock_df
+
+    def _parse_stock_tables(
+        self,
+        html: str,
+    ) -> pd.DataFrame:
+        """
+        株価ページのHTMLから、株価データのテーブルの全ての行をデータフレームに変換する
+
+        ページ全体ではなく株価データのテーブルのみをSoupStrainerで解析対象とする
+
+        Parameters
+        ----------
+        html: str
+            株価ページのHTML
+
+        Returns
+        ----------
+        stock_df: pd.DataFrame
+            日付をインデックスとし、日付の昇順に並べた株価データのデータフレーム
+        """
+        strainer = SoupStrainer('table', class_=self.stock_table_classes)
+        bs = BeautifulSoup(html, HTML_PARSER, parse_only=strainer)
+        # th要素は日付、td要素は始値、高値、安値、終値、前日比、前日比%、売買高の順に並ぶ
+        columns = ['Open', 'High', 'Low', 'Close', None, None, 'Volume']
+        stock_data = []
+        for stock_table in bs.find_all('table'):
+            for row in stock_table.find('tbody').find_all('tr'):
+                row_data = {
+                    'Date': pd.to_datetime(row.find('th').time['datetime'])
+                }
+                for col_name, data in zip(columns, row.find_all('td')):
+                    if col_name:
+                        row_data[col_name] = data.get_text().replace(',', '')
+                stock_data.append(row_data)
+        if len(stock_data) == 0:
+            raise ValueError('Stock price table is not found')
+
+        stock_df = pd.DataFrame(stock_data).drop_duplicates(
+            subset='Date').set_index('Date').sort_index()
+        return stock_df
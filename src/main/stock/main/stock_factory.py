@@ -1,12 +1,15 @@
 import os
 import sys
 import pathlib
-from typing import List
+from typing import Dict, List
 from sqlalchemy.orm import Session
 
 # src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
 sys.path.append(os.path.join(
     str(pathlib.Path(__file__).resolve().parent.parent.parent)))
+from common.cache.response_cache import ResponseCache  # noqa: #402
+from common.http.http_client import HttpClient  # noqa: #402
+from common.http.rate_limiter import HostRateLimiter  # noqa: #402
 from stock.dto.stock_dto import Company  # noqa: #402
 from stock.main.stock_api import StooqAPI  # noqa: #402
 from stock.main.stock_crawler import KabutanCrawler  # noqa: #402
@@ -16,9 +19,50 @@ class JpStockFactory(object):
     """
     日本の株式市場に上場している企業と、海外(US, Europe)のではそれぞれ株価データの取得先や
     取得方法が異なるので、ファクトリクラスが必要なインタフェース(クラス)群を生成する
+
+    生成するStockAPIクラスとStockCrawlerクラスは、ホスト毎の流量制御とリトライを行う
+    HttpClientを共有する
+
+    Attributes
+    ----------
+    http_client: HttpClient
+        データソースへのリクエストを流量制御・リトライ付きで送信するクラス
+    response_cache: ResponseCache
+        データソースのレスポンスをローカルディスクにキャッシュするクラス(Noneの場合はキャッシュしない)
+    base_urls: Dict[str, str]
+        データソース(stooq, kabutan)をキー、URLをバリューとするディクショナリ(指定しない場合は各サイトのURL)
     """
-    def __init__(self):
-        pass
+    # データソースのホスト毎の1秒あたりの最大リクエスト数
+    request_rates = {
+        'kabutan.jp': 1.0,
+    }
+
+    def __init__(
+        self,
+        http_client: HttpClient = None,
+        pool_size: int = 10,
+        response_cache: ResponseCache = None,
+        base_urls: Dict[str, str] = None,
+    ):
+        """
+        Parameters
+        ----------
+        http_client: HttpClient
+            データソースへのリクエストを流量制御・リトライ付きで送信するクラス.
+            指定しない場合はrequest_ratesに従って流量制御する
+        pool_size: int
+            http_clientを指定しない場合に、ホスト毎に保持するコネクション数
+        response_cache: ResponseCache
+            データソースのレスポンスをローカルディスクにキャッシュするクラス(Noneの場合はキャッシュしない)
+        base_urls: Dict[str, str]
+            データソース(stooq, kabutan)をキー、URLをバリューとするディクショナリ.
+            ローカルのスタブサーバーに対して取得処理を実行する場合に指定する
+        """
+        self.http_client = http_client if http_client is not None \
+            else HttpClient(HostRateLimiter(self.request_rates),
+                            pool_size=pool_size)
+        self.response_cache = response_cache
+        self.base_urls = base_urls if base_urls is not None else {}
 
     def get_target_stock_codes(
         self,
@@ -46,14 +90,15 @@ class JpStockFactory(object):
 
     def get_stock_api(self) -> StooqAPI:
         """
-        pandas-datareaderによるデータ取得に使用するクラスを返す
+        APIによるデータ取得に使用するクラスを返す
 
         Returns
         ----------
         stock_api: StooqAPI
-            pandas-datareaderにより、日本市場の株価データを取得するクラス
+            StooqのAPIにより、日本市場の株価データを取得するクラス
         """
-        stock_api = StooqAPI()
+        stock_api = StooqAPI(self.http_client, self.response_cache,
+                             self.base_urls.get('stooq'))
         return stock_api
 
     def get_stock_crawler(self) -> KabutanCrawler:
@@ -65,5 +110,6 @@ class JpStockFactory(object):
         stock_api: KabutanCrawler
             https://kabutan.jpのクローリングにより、日本市場の株価データを取得するクラス
         """
-        stock_crawler = KabutanCrawler()
+        stock_crawler = KabutanCrawler(self.http_client, self.response_cache,
+                                       self.base_urls.get('kabutan'))
         return stock_crawler
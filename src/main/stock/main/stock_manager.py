@@ -2,15 +2,16 @@ import os
 import sys
 import pathlib
 import datetime
+import numpy as np
 import pandas as pd
-from typing import List
+from typing import Dict, List, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 
 # src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
 sys.path.append(os.path.join(
     str(pathlib.Path(__file__).resolve().parent.parent.parent)))
-from stock.dto.stock_dto import StockPrice  # noqa: #402
+from stock.dto.stock_dto import Company, StockPrice  # noqa: #402
 
 
 class StockManager(object):
@@ -33,7 +34,17 @@ class StockManager(object):
         pandas-datareaderを使用して、API経由で株価データを取得するクラス
     stock_crawler: object
         Webクローリングを利用して、Web上からデータを取得するクラス
+    price_columns: Dict[str, str]
+        stockpriceテーブルのカラム名をキー、株価データのデータフレームのカラム名をバリューとするディクショナリ
     """
+    price_columns = {
+        'open_price': 'Open',
+        'high_price': 'High',
+        'low_price': 'Low',
+        'close_price': 'Close',
+        'volume': 'Volume',
+    }
+
     def __init__(
         self,
         session: Session,
@@ -81,31 +92,179 @@ class StockManager(object):
             StockpriceテーブルのDtoのリスト
         """
         recent_date = self._get_recent_date(company_id)
-        # 最新データが金曜日且つ、直近2日間以内のデータの場合、処理しない(Noneを返す)
-        if (recent_date is not None) and \
-           (recent_date.weekday() == 4) and \
-           ((datetime.date.today() - recent_date).days <= 2):
+        stock_df = self.fetch_stock_price(stock_code, recent_date)
+        return self.to_stock_price_dtos(stock_df, company_id)
+
+    def fetch_stock_price(
+        self,
+        stock_code: str,
+        recent_date: datetime.date,
+    ) -> pd.DataFrame:
+        """
+        DBに保持している最新日をもとに、APIまたはクローリングにより株価データを取得する.
+
+        DBにアクセスしないため、複数スレッドから並行して呼び出すことができる。
+
+        Parameters
+        ----------
+        stock_code: str
+            株価取得対象となる銘柄コード
+        recent_date: datetime.date
+            DBに保持している株価データの最新日(データが無い場合はNone)
+
+        Returns
+        ----------
+        stock_df: pd.DataFrame
+            株価データを保持したデータフレーム(取得不要・取得失敗の場合はNone)
+        """
+        fetch_method = self.get_fetch_method(recent_date)
+        if fetch_method == 'skip':
             return None
-        # 最新データが木曜日且つ、直近3日間以内データの場合、クローリングで金曜日データを取得する
-        elif (recent_date is not None) and \
-             (recent_date.weekday() == 3) and \
-             ((datetime.date.today() - recent_date).days < 7):
+        elif fetch_method == 'crawler':
             stock_df = self.stock_crawler.get_stock_price(
                 stock_code,
+                start_date=recent_date + datetime.timedelta(days=1),
             )
-        # 上記以外の場合、APIによりデータを取得する
         else:
             stock_df = self.stock_api.get_stock_price(
                 stock_code,
                 recent_date,
             )
+        return stock_df
+
+    def get_fetch_method(
+        self,
+        recent_date: datetime.date,
+        today: datetime.date = None,
+    ) -> str:
+        """
+        DBに保持している最新日から、株価データの取得方法を判定する.
+
+        DBにアクセスしないため、全銘柄の最新日を取得した後にメモリ上で取得計画を立てることができる。
+
+        Parameters
+        ----------
+        recent_date: datetime.date
+            DBに保持している株価データの最新日(データが無い場合はNone)
+        today: datetime.date
+            判定の基準日(指定しない場合は当日)
+
+        Returns
+        ----------
+        fetch_method: str
+            skip: 取得不要
+            crawler: クローリングにより取得する
+            api: APIにより取得する
+        """
+        today = today if today is not None else datetime.date.today()
+        # 最新データが金曜日且つ、直近2日間以内のデータの場合、処理しない
+        if (recent_date is not None) and \
+           (recent_date.weekday() == 4) and \
+           ((today - recent_date).days <= 2):
+            return 'skip'
+        # 最新データが木曜日且つ、直近3日間以内データの場合、クローリングで金曜日データを取得する
+        elif (recent_date is not None) and \
+             (recent_date.weekday() == 3) and \
+             ((today - recent_date).days < 7):
+            return 'crawler'
+        # 上記以外の場合、APIによりデータを取得する
+        else:
+            return 'api'
+
+    def to_stock_price_dtos(
+        self,
+        stock_df: pd.DataFrame,
+        company_id: str,
+    ) -> List[StockPrice]:
+        """
+        fetch_stock_price()で取得したデータフレームを、企業IDを付与してDTOのリストに変換する
+
+        Parameters
+        ----------
+        stock_df: pd.DataFrame
+            株価データを保持したデータフレーム
+        company_id: str
+            株価取得対象となる企業ID
+
+        Returns
+        ----------
+        stock_price_dtos: List[StockPrice]
+            StockpriceテーブルのDtoのリスト(データが無い場合はNone)
+        """
+        stock_price_records = self.to_stock_price_records(stock_df, company_id)
+        if stock_price_records is None:
+            return None
+        return [StockPrice(**record) for record in stock_price_records]
+
+    def to_stock_price_records(
+        self,
+        stock_df: pd.DataFrame,
+        company_id: str,
+    ) -> List[dict]:
+        """
+        fetch_stock_price()で取得したデータフレームを、企業IDを付与してディクショナリのリストに変換する
+
+        DTOを生成せずにCommonDao.upsert()・copy_load()へそのまま渡すことができる
+
+        Parameters
+        ----------
+        stock_df: pd.DataFrame
+            株価データを保持したデータフレーム
+        company_id: str
+            株価取得対象となる企業ID
+
+        Returns
+        ----------
+        stock_price_records: List[dict]
+            stockpriceテーブルのカラム名をキーとするディクショナリのリスト(データが無い場合はNone)
+        """
         if (stock_df is not None) and (len(stock_df) >= 1):
             # 取得したDataFrameにcompany_idのカラムを追加する
-            stock_df['company_id'] = company_id
-            stock_price_dtos = self._convert_stock_dtos(stock_df)
+            stock_df = stock_df.assign(company_id=company_id)
+            stock_price_records = self._convert_stock_records(stock_df)
         else:
-            stock_price_dtos = None
-        return stock_price_dtos
+            stock_price_records = None
+        return stock_price_records
+
+    def get_recent_dates(
+        self,
+        country_code: str,
+    ) -> Dict[str, Tuple[str, datetime.date]]:
+        """
+        指定の国コードの全企業について、銘柄コードに対応する企業IDと、
+        DBに保持している株価データの最新日を1回のクエリで取得する。
+
+        企業毎に_get_recent_date()を呼び出す場合と異なり、企業数に依らずDBへの問い合わせは1回となる。
+
+        Parameters
+        ----------
+        country_code: str
+            取得対象となる企業の国コード
+
+        Returns
+        ----------
+        recent_dates: Dict[str, Tuple[str, datetime.date]]
+            銘柄コードをキー、(企業ID, 最新日)をバリューとするディクショナリ.
+            株価データが無い企業の最新日はNoneとする
+        """
+        results = self.session.query(
+            Company.stock_code,
+            Company.company_id,
+            func.max(StockPrice.date).label('recent_date'),
+        ).outerjoin(
+            StockPrice, StockPrice.company_id == Company.company_id,
+        ).filter(
+            Company.country_code == country_code,
+        ).group_by(
+            Company.stock_code,
+            Company.company_id,
+        ).all()
+
+        recent_dates = {
+            res.stock_code: (res.company_id, res.recent_date)
+            for res in results
+        }
+        return recent_dates
 
     def _get_recent_date(
         self,
@@ -149,18 +308,42 @@ class StockManager(object):
         stock_price_dtos: List[StockPrice]
             StockpriceテーブルのDtoのリスト
         """
-        stock_df = stock_df.reset_index()
-        stock_price_dtos = []
-
-        for idx in stock_df.index:
-            dto = StockPrice()
-            dto.company_id = stock_df.at[idx, 'company_id']
-            dto.date = stock_df.at[idx, 'Date'].date()
-            dto.open_price = float(stock_df.at[idx, 'Open'])
-            dto.high_price = float(stock_df.at[idx, 'High'])
-            dto.low_price = float(stock_df.at[idx, 'Low'])
-            dto.close_price = float(stock_df.at[idx, 'Close'])
-            dto.volume = float(stock_df.at[idx, 'Volume'])
-            stock_price_dtos.append(dto)
-
-        return stock_price_dtos
+        return [StockPrice(**record)
+                for record in self._convert_stock_records(stock_df)]
+
+    def _convert_stock_records(
+        self,
+        stock_df: pd.DataFrame
+    ) -> List[dict]:
+        """
+        pandasデータフレームの形式で保持している株価データを、stockpriceテーブルの
+        カラム名をキーとするディクショナリのリストに変換する
+
+        行毎にDTOを生成せず、カラム単位で型変換してから一括でディクショナリに変換する。
+        数値に変換できない値・欠損値(出来高の無い日など)はNone(NULL)とする
+
+        Parameters
+        ----------
+        stock_df: pd.DataFrame
+            株価データを保持したデータフレーム(Dateはインデックスまたはカラム)
+
+        Returns
+        ----------
+        stock_price_records: List[dict]
+            stockpriceテーブルのカラム名をキーとするディクショナリのリスト
+        """
+        if 'Date' not in stock_df.columns:
+            stock_df = stock_df.reset_index()
+
+        record_df = pd.DataFrame({
+            'company_id': stock_df['company_id'].to_numpy(dtype=object),
+            'date': pd.to_datetime(stock_df['Date']).dt.date.to_numpy(),
+        })
+        for column_name, price_column in self.price_columns.items():
+            values = pd.to_numeric(stock_df[price_column], errors='coerce')
+            values = values.to_numpy(dtype=np.float64)
+            # NaNはNoneに置き換えてNULLとして登録する
+            record_df[column_name] = np.where(
+                np.isnan(values), None, values.astype(object))
+
+        return record_df.to_dict('records')
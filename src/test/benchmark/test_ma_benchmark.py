@@ -0,0 +1,67 @@
+import os
+import sys
+import pathlib
+import pytest
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from benchmark.ma_benchmark import compare_with_baseline, get_cases  # noqa: #402
+
+
+def _result(calculator, span, wall_time_sec):
+    return {
+        'calculator': calculator,
+        'companies': 100,
+        'years': 5,
+        'span': span,
+        'wall_time_sec': wall_time_sec,
+    }
+
+
+class TestMABenchmark():
+    """
+    MABenchmarkのベースライン比較のユニットテスト
+    """
+    baseline = [
+        _result('sql_sma', 5, 1.0),
+        _result('numpy_sma', 5, 0.5),
+    ]
+
+    @pytest.mark.smoke
+    def test_compare_with_baseline(self):
+        """
+        閾値を超えて遅くなった計測条件のみ返すか
+        """
+        results = [
+            _result('sql_sma', 5, 1.1),
+            _result('numpy_sma', 5, 0.7),
+        ]
+        regressions = compare_with_baseline(results, self.baseline, 0.2)
+        assert len(regressions) == 1
+        assert regressions[0]['calculator'] == 'numpy_sma'
+        assert regressions[0]['baseline_wall_time_sec'] == 0.5
+        assert regressions[0]['ratio'] == pytest.approx(1.4)
+
+    @pytest.mark.smoke
+    def test_compare_with_baseline_new_case(self):
+        """
+        ベースラインに存在しない計測条件は比較しないか
+        """
+        results = [_result('sql_sma', 25, 10.0)]
+        assert compare_with_baseline(results, self.baseline) == []
+
+    @pytest.mark.smoke
+    def test_get_cases(self):
+        """
+        計算日数毎のCalculatorクラスは計算日数毎に、全ての計算条件を一括で計算する
+        Calculatorクラスは計算日数をNoneとして1回のみ計測するか
+        """
+        cases = get_cases(['numpy_sma', 'numpy_multi', 'incremental'],
+                          [5, 25])
+        assert cases == [
+            ('numpy_sma', 5),
+            ('numpy_sma', 25),
+            ('numpy_multi', None),
+            ('incremental', None),
+        ]
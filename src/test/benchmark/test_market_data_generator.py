@@ -0,0 +1,69 @@
+import os
+import sys
+import pathlib
+import datetime
+import pytest
+import numpy as np
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from benchmark.market_data_generator import MarketDataGenerator  # noqa: #402
+
+
+class TestMarketDataGenerator():
+    """
+    MarketDataGeneratorクラスのユニットテスト
+    """
+    end_date = datetime.date(2020, 3, 6)
+
+    @pytest.mark.smoke
+    def test_reproducible(self):
+        """
+        同じseedであれば企業数に依らず同じ株価データ、異なるseedであれば異なる株価データとなるか
+        """
+        generator = MarketDataGenerator(3, years=1, seed=42,
+                                        end_date=self.end_date)
+        same_seed = MarketDataGenerator(10, years=1, seed=42,
+                                        end_date=self.end_date)
+        other_seed = MarketDataGenerator(3, years=1, seed=7,
+                                         end_date=self.end_date)
+
+        assert generator.generate_prices(2).equals(
+            same_seed.generate_prices(2))
+        assert not generator.generate_prices(2).equals(
+            other_seed.generate_prices(2))
+
+    @pytest.mark.smoke
+    def test_generate_prices(self):
+        """
+        平日のみの日付で、高値・安値が始値・終値を含む範囲となるか
+        """
+        generator = MarketDataGenerator(1, years=2, seed=0,
+                                        end_date=self.end_date)
+        stock_df = generator.generate_prices(0)
+
+        assert len(stock_df) == 2 * generator.trading_days
+        assert stock_df.index[-1].date() == self.end_date
+        assert (stock_df.index.weekday < 5).all()
+        open_close = stock_df[['Open', 'Close']]
+        assert (stock_df['High'] >= open_close.max(axis=1)).all()
+        assert (stock_df['Low'] <= open_close.min(axis=1)).all()
+        assert (stock_df['Low'] > 0).all()
+        assert np.isfinite(stock_df.to_numpy()).all()
+
+    @pytest.mark.smoke
+    def test_iter_price_records(self):
+        """
+        全企業の株価データがstockpriceテーブルのカラム名のディクショナリとして生成されるか
+        """
+        generator = MarketDataGenerator(2, years=1, seed=0,
+                                        end_date=self.end_date)
+        records = list(generator.iter_price_records())
+        companies = generator.get_company_records()
+
+        assert len(records) == 2 * generator.trading_days
+        assert records[0]['company_id'] == companies[0]['company_id']
+        assert records[-1]['date'] == self.end_date
+        assert generator.get_company_index(companies[1]['stock_code']) == 1
+        assert generator.get_company_index('6028') is None
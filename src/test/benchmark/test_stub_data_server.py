@@ -0,0 +1,86 @@
+import os
+import sys
+import pathlib
+import datetime
+import pytest
+import requests
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from benchmark.market_data_generator import MarketDataGenerator  # noqa: #402
+from benchmark.stub_data_server import StubDataServer  # noqa: #402
+from stock.main.stock_factory import JpStockFactory  # noqa: #402
+
+
+class TestStubDataServer():
+    """
+    StubDataServerクラスのユニットテスト
+    """
+    generator = MarketDataGenerator(3, years=1, seed=42,
+                                    end_date=datetime.date(2020, 3, 6))
+
+    @pytest.mark.smoke
+    def test_stooq_api(self):
+        """
+        StooqAPIがスタブサーバーから合成データと同じ株価データを取得できるか
+        """
+        with StubDataServer(self.generator) as server:
+            stock_factory = JpStockFactory(
+                base_urls=server.get_base_urls())
+            stock_df = stock_factory.get_stock_api().get_stock_price(
+                '10001', end_date=datetime.date(2020, 3, 6))
+
+        expected_df = self.generator.generate_prices(1)
+        assert len(stock_df) == len(expected_df)
+        assert stock_df['Close'].tolist() == expected_df['Close'].tolist()
+
+    @pytest.mark.smoke
+    def test_kabutan_crawler(self):
+        """
+        KabutanCrawlerがスタブサーバーから直近の株価データを取得できるか
+        """
+        with StubDataServer(self.generator, kabutan_days=5) as server:
+            stock_factory = JpStockFactory(
+                base_urls=server.get_base_urls())
+            stock_df = stock_factory.get_stock_crawler().get_stock_price(
+                '10002', start_date=datetime.date(2020, 3, 5))
+
+        expected_df = self.generator.generate_prices(2)
+        assert stock_df.index.tolist() == expected_df.index[-2:].tolist()
+        assert stock_df['Close'].astype(float).tolist() == \
+            expected_df['Close'].iloc[-2:].tolist()
+
+    @pytest.mark.smoke
+    def test_not_found(self):
+        """
+        生成対象外の銘柄コードの場合は404を返し、StooqAPIはNoneを返すか
+        """
+        with StubDataServer(self.generator) as server:
+            stock_factory = JpStockFactory(
+                base_urls=server.get_base_urls())
+            stock_df = stock_factory.get_stock_api().get_stock_price('99999')
+            stats = server.stats
+
+        assert stock_df is None
+        assert stats['not_found'] == 1
+
+    @pytest.mark.smoke
+    def test_error_and_throttle(self):
+        """
+        error_rateに従って503を返し、max_requests_per_secを超えたリクエストに429を返すか
+        """
+        with StubDataServer(self.generator, error_rate=1.0) as server:
+            url = server.get_base_urls()['stooq']
+            response = requests.get(url, params={'s': '10000.JP'})
+            assert response.status_code == 503
+
+        with StubDataServer(self.generator,
+                            max_requests_per_sec=1) as server:
+            url = server.get_base_urls()['stooq']
+            responses = [requests.get(url, params={'s': '10000.JP'})
+                         for _ in range(2)]
+            assert responses[0].status_code == 200
+            assert responses[1].status_code == 429
+            assert responses[1].headers['Retry-After'] == '1'
+            assert server.stats['throttled'] == 1
@@ -0,0 +1,283 @@
+import os
+import sys
+import asyncio
+import pathlib
+import datetime
+import pytest
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from common.db.async_common_dao import AsyncCommonDao  # noqa: #402
+from common.db.async_engine import AsyncEngine  # noqa: #402
+from stock.dto.stock_dto import Company, StockPrice  # noqa: #402
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    環境変数の接続情報からテストDBのAsyncEngineを生成する
+    """
+    return AsyncEngine(
+        os.environ['POSTGRES_USER'],
+        os.environ['POSTGRES_PASSWORD'],
+        os.environ['POSTGRES_HOST'],
+        os.environ['POSTGRES_PORT'],
+        os.environ['POSTGRES_DB'],
+    )
+
+
+async def load_test_data(async_engine, logger, company_dtos, stock_price_dtos):
+    """
+    企業・株価データをasyncpgのコネクションでUPSERTし、コミットする
+    """
+    async with async_engine.get_session() as connection:
+        await AsyncCommonDao(connection, Company, logger).upsert(
+            company_dtos, ['company_id'])
+        await AsyncCommonDao(connection, StockPrice, logger).upsert(
+            stock_price_dtos, ['company_id', 'date'])
+
+
+async def fetch_stock_price(async_engine, company_id, date):
+    """
+    主キーを指定して株価データを1件取得する
+    """
+    async with async_engine.get_session() as connection:
+        return await connection.fetchrow(
+            'SELECT * FROM stockprice WHERE company_id = $1 AND date = $2',
+            company_id, date)
+
+
+async def count_records(async_engine, table_name):
+    """
+    テーブルのレコード数を返す
+    """
+    async with async_engine.get_session() as connection:
+        return await connection.fetchval(f'SELECT count(*) FROM {table_name}')
+
+
+@pytest.fixture(scope='function', name='async_db')
+def async_db_with_cleanup(testdb):
+    """
+    asyncpgのコネクションはテスト用のセッションとは別のトランザクションでコミットするため、
+    テストメソッドの終了後に格納したデータを削除する
+    """
+    yield
+
+    async def delete_data():
+        async with get_async_engine().get_session() as connection:
+            await connection.execute('DELETE FROM stockprice_ma')
+            await connection.execute('DELETE FROM stockprice')
+            await connection.execute('DELETE FROM company')
+
+    asyncio.run(delete_data())
+
+
+class TestAsyncCommonDao():
+    """
+    AsyncCommonDaoクラスのユニットテスト
+
+    DBに接続せずに、送信するSQL文と値の変換のみをテストする
+    """
+    @pytest.mark.smoke
+    def test_build_upsert_sql(self):
+        """
+        カラムの型の配列をunnest()で展開し、主キー以外のカラムとupd_tsを更新するSQL文となるか
+        """
+        dao = AsyncCommonDao(None, StockPrice, None)
+        upsert_sql = dao._build_upsert_sql(['company_id', 'date'])
+
+        assert 'unnest($1::VARCHAR(16)[], $2::DATE[], $3::FLOAT[]' \
+            in upsert_sql
+        assert 'ON CONFLICT (company_id, date)' in upsert_sql
+        assert 'close_price = EXCLUDED.close_price' in upsert_sql
+        assert 'date = EXCLUDED.date' not in upsert_sql
+        assert 'ins_ts' not in upsert_sql
+        assert 'upd_ts = now()' in upsert_sql
+
+    @pytest.mark.smoke
+    def test_to_tuples(self):
+        """
+        DTO・ディクショナリがカラム順のタプルに変換され、NaNはNoneとなるか
+        """
+        dao = AsyncCommonDao(None, StockPrice, None)
+        dto = StockPrice(company_id='0001', date=datetime.date(2020, 3, 6),
+                         open_price=1.0, high_price=2.0, low_price=0.5,
+                         close_price=1.5, volume=float('nan'))
+        record = {'company_id': '0002', 'date': datetime.date(2020, 3, 6),
+                  'close_price': 3.0}
+
+        assert dao._to_tuples([dto, record]) == [
+            ('0001', datetime.date(2020, 3, 6), 1.0, 2.0, 0.5, 1.5, None),
+            ('0002', datetime.date(2020, 3, 6), None, None, None, 3.0, None),
+        ]
+
+
+class TestAsyncEngine():
+    """
+    AsyncEngine.get_session()のトランザクションのテストクラス
+    """
+    @pytest.mark.smoke
+    def test_get_session_commit(
+        self,
+        async_db,
+        company_test_data_001,
+        application_logger,
+    ):
+        """
+        async withブロックを正常に抜けた場合に、コミットされているか
+        """
+        async def run():
+            async_engine = get_async_engine()
+            try:
+                async with async_engine.get_session() as connection:
+                    await AsyncCommonDao(
+                        connection, Company, application_logger
+                    ).upsert(company_test_data_001, ['company_id'])
+                return await count_records(async_engine, 'company')
+            finally:
+                await async_engine.close()
+
+        assert asyncio.run(run()) == len(company_test_data_001)
+
+    @pytest.mark.smoke
+    def test_get_session_rollback(
+        self,
+        async_db,
+        company_test_data_001,
+        application_logger,
+    ):
+        """
+        async withブロック内で例外が発生した場合に、ロールバックされているか
+        """
+        async def run():
+            async_engine = get_async_engine()
+            try:
+                with pytest.raises(RuntimeError):
+                    async with async_engine.get_session() as connection:
+                        await AsyncCommonDao(
+                            connection, Company, application_logger
+                        ).upsert(company_test_data_001, ['company_id'])
+                        raise RuntimeError('rollback')
+                return await count_records(async_engine, 'company')
+            finally:
+                await async_engine.close()
+
+        assert asyncio.run(run()) == 0
+
+
+class TestAsyncUpsert():
+    """
+    asyncpgによりUPSERTを行うupsert()メソッドのテストクラス
+    """
+    @pytest.mark.smoke
+    def test_upsert_record_count(
+        self,
+        async_db,
+        company_test_data_001,
+        stock_prices_test_data_001,
+        test_common_dao_upsert_data,
+        application_logger,
+    ):
+        """
+        CommonDao.upsert()と同様に、INSERT件数・UPDATE件数が返されるか
+        """
+        async def run():
+            async_engine = get_async_engine()
+            try:
+                await load_test_data(async_engine, application_logger,
+                                     company_test_data_001,
+                                     stock_prices_test_data_001)
+                async with async_engine.get_session() as connection:
+                    return await AsyncCommonDao(
+                        connection, StockPrice, application_logger
+                    ).upsert(test_common_dao_upsert_data,
+                             ['company_id', 'date'], batch_size=5)
+            finally:
+                await async_engine.close()
+
+        inserted_count, updated_count = asyncio.run(run())
+
+        assert inserted_count == 2
+        assert updated_count == 10
+
+    @pytest.mark.smoke
+    def test_upsert_update_timestamps(
+        self,
+        async_db,
+        company_test_data_001,
+        stock_prices_test_data_001,
+        test_common_dao_upsert_data,
+        application_logger,
+    ):
+        """
+        UPDATE対象のレコードについて、新しい値で更新され、ins_tsは変わらずupd_tsのみ更新されているか
+        """
+        company_id, date = '0001', datetime.date(2020, 2, 24)
+
+        async def run():
+            async_engine = get_async_engine()
+            try:
+                await load_test_data(async_engine, application_logger,
+                                     company_test_data_001,
+                                     stock_prices_test_data_001)
+                before = await fetch_stock_price(async_engine,
+                                                 company_id, date)
+                async with async_engine.get_session() as connection:
+                    await AsyncCommonDao(
+                        connection, StockPrice, application_logger
+                    ).upsert(test_common_dao_upsert_data,
+                             ['company_id', 'date'])
+                after = await fetch_stock_price(async_engine,
+                                                company_id, date)
+                return before, after
+            finally:
+                await async_engine.close()
+
+        before, after = asyncio.run(run())
+
+        assert after['volume'] == 55000
+        assert after['ins_ts'] == before['ins_ts']
+        assert after['upd_ts'] > before['upd_ts']
+
+
+class TestAsyncDelsert():
+    """
+    asyncpgにより全DELETE全INSERT処理を実施するdelsert()メソッドのテストクラス
+    """
+    @pytest.mark.smoke
+    def test_delsert_replace_records(
+        self,
+        async_db,
+        company_test_data_001,
+        stock_prices_test_data_001,
+        test_common_dao_delsert_data,
+        application_logger,
+    ):
+        """
+        全DELETE全INSERT処理を実施した後のレコードが、与えたDTOのみとなっているか
+        """
+        async def run():
+            async_engine = get_async_engine()
+            try:
+                await load_test_data(async_engine, application_logger,
+                                     company_test_data_001,
+                                     stock_prices_test_data_001)
+                async with async_engine.get_session() as connection:
+                    await AsyncCommonDao(
+                        connection, StockPrice, application_logger
+                    ).delsert(test_common_dao_delsert_data,
+                              ['company_id', 'date'])
+                async with async_engine.get_session() as connection:
+                    return await connection.fetch(
+                        'SELECT company_id, date FROM stockprice '
+                        'ORDER BY company_id, date')
+            finally:
+                await async_engine.close()
+
+        records = asyncio.run(run())
+        expected_keys = sorted(
+            (dto.company_id, dto.date)
+            for dto in test_common_dao_delsert_data)
+
+        assert [(res['company_id'], res['date'])
+                for res in records] == expected_keys
@@ -0,0 +1,76 @@
+import os
+import sys
+import pathlib
+import threading
+import pytest
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from common.db.base_engine import BaseEngine, get_engine_settings  # noqa: #402
+
+
+class TestBaseEngine():
+    """
+    BaseEngineクラスのユニットテスト
+
+    create_engine()はSessionの使用時まで接続しないため、DBに接続せずにテストする
+    """
+    connect_args = ('user', 'password', 'localhost', 5432, 'dbname')
+
+    @pytest.mark.smoke
+    def test_engine_cache(self):
+        """
+        同じ接続情報・接続プール設定の場合はEngineが共有され、設定が異なる場合は別のEngineとなるか
+        """
+        base_engine = BaseEngine(*self.connect_args)
+        same_engine = BaseEngine(*self.connect_args)
+        other_engine = BaseEngine(*self.connect_args, pool_size=2)
+
+        assert base_engine.engine is same_engine.engine
+        assert base_engine.engine is not other_engine.engine
+        assert other_engine.engine.pool.size() == 2
+
+        other_engine.dispose()
+        assert BaseEngine(*self.connect_args, pool_size=2).engine \
+            is not other_engine.engine
+
+    @pytest.mark.smoke
+    def test_scoped_session(self):
+        """
+        scoped_sessionが同一スレッドでは同じSession、別スレッドでは異なるSessionを返すか
+        """
+        session_registry = BaseEngine(*self.connect_args).get_scoped_session()
+        sessions = []
+
+        def get_session():
+            sessions.append(session_registry())
+            session_registry.remove()
+
+        thread = threading.Thread(target=get_session)
+        thread.start()
+        thread.join()
+
+        assert session_registry() is session_registry()
+        assert sessions[0] is not session_registry()
+        session_registry.remove()
+
+    @pytest.mark.smoke
+    def test_get_engine_settings(self):
+        """
+        Engineから生成時の接続情報・statement_timeoutを含む設定を取得でき、
+        同じ設定で生成したBaseEngineが同じEngineを共有するか
+        """
+        base_engine = BaseEngine(*self.connect_args, pool_size=3,
+                                 statement_timeout=60000)
+        connect_args, engine_kwargs = get_engine_settings(base_engine.engine)
+
+        assert connect_args == self.connect_args
+        assert engine_kwargs['pool_size'] == 3
+        assert engine_kwargs['statement_timeout'] == 60000
+        assert BaseEngine(*connect_args, **engine_kwargs).engine \
+            is base_engine.engine
+
+        base_engine.dispose()
+        with pytest.raises(ValueError):
+            get_engine_settings(base_engine.engine)
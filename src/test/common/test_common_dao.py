@@ -184,3 +184,160 @@ class TestUpsert():
 
         assert record is not None
         assert old_record.ins_ts == record.ins_ts
+
+    @pytest.mark.smoke
+    def test_upsert_return_counts(
+        self,
+        session_001,
+        test_common_dao_upsert_data,
+        application_logger,
+    ):
+        """
+        UPSERT処理の戻り値として、INSERT件数とUPDATE件数が正しく返されるか
+
+        事前準備データ10件に対して、2件(0001・0004の2020-02-29)が新規となる
+        """
+        stock_price_dao = CommonDao(session_001, StockPrice,
+                                    application_logger)
+        inserted_count, updated_count = stock_price_dao.upsert(
+            test_common_dao_upsert_data, ['company_id', 'date'])
+
+        assert inserted_count == 2
+        assert updated_count == 10
+
+    @pytest.mark.smoke
+    def test_upsert_update_value(
+        self,
+        session_001,
+        test_common_dao_upsert_data,
+        application_logger,
+    ):
+        """
+        UPDATE対象のレコードについて、主キー以外のカラムが新しい値で更新されているか
+        """
+        stock_price_dao = CommonDao(session_001, StockPrice,
+                                    application_logger)
+        stock_price_dao.upsert(test_common_dao_upsert_data,
+                               ['company_id', 'date'], batch_size=5)
+
+        record = \
+            session_001.query(
+                StockPrice
+            ).filter(
+                StockPrice.company_id == '0001',
+                StockPrice.date == datetime.date(2020, 2, 24),
+            ).first()
+
+        assert record.volume == 55000
+
+
+class TestCopyLoad():
+    """
+    COPYによりステージングテーブル経由でロードするcopy_load()メソッドのテストクラス
+    """
+    @pytest.mark.smoke
+    def test_copy_load_replace_record_count(
+        self,
+        session_001,
+        test_common_dao_delsert_data,
+        application_logger,
+    ):
+        """
+        replace=Trueの場合、ロード後のレコード数が与えたDTOの件数と一致するか
+        """
+        stock_price_dao = CommonDao(session_001, StockPrice,
+                                    application_logger)
+        inserted_count, updated_count = stock_price_dao.copy_load(
+            test_common_dao_delsert_data, ['company_id', 'date'],
+            replace=True, chunk_size=5)
+        record_count = session_001.query(
+            func.count(StockPrice.company_id)).scalar()
+
+        assert inserted_count == len(test_common_dao_delsert_data)
+        assert updated_count == 0
+        assert len(test_common_dao_delsert_data) == record_count
+
+    @pytest.mark.smoke
+    def test_copy_load_merge(
+        self,
+        session_001,
+        test_common_dao_upsert_data,
+        application_logger,
+    ):
+        """
+        replace=Falseの場合、UPSERTと同様にINSERT件数・UPDATE件数が返され、
+        UPDATE対象のレコードが新しい値で更新されているか
+        """
+        stock_price_dao = CommonDao(session_001, StockPrice,
+                                    application_logger)
+        inserted_count, updated_count = stock_price_dao.copy_load(
+            test_common_dao_upsert_data, ['company_id', 'date'])
+
+        record = \
+            session_001.query(
+                StockPrice
+            ).filter(
+                StockPrice.company_id == '0001',
+                StockPrice.date == datetime.date(2020, 2, 24),
+            ).first()
+
+        assert inserted_count == 2
+        assert updated_count == 10
+        assert record.volume == 55000
+
+    @pytest.mark.smoke
+    def test_copy_load_keeps_permanent_staging_table(
+        self,
+        session_001,
+        test_common_dao_upsert_data,
+        application_logger,
+    ):
+        """
+        ステージングテーブルと同名の永続テーブルが存在する場合も、削除されずに残っているか
+        """
+        session_001.execute(
+            'CREATE TABLE public.stockprice_staging (id integer)')
+        stock_price_dao = CommonDao(session_001, StockPrice,
+                                    application_logger)
+        stock_price_dao.copy_load(test_common_dao_upsert_data,
+                                  ['company_id', 'date'])
+
+        assert session_001.execute(
+            "SELECT to_regclass('public.stockprice_staging')"
+        ).scalar() is not None
+
+
+class TestPartition():
+    """
+    年単位のパーティションを作成するcreate_year_partitions()メソッドのテストクラス
+    """
+    @pytest.mark.smoke
+    def test_create_year_partitions(
+        self,
+        session_001,
+        application_logger,
+    ):
+        """
+        未作成の年のパーティションのみが作成され、パーティション名の一覧に含まれるか
+        """
+        stock_price_dao = CommonDao(session_001, StockPrice,
+                                    application_logger)
+        try:
+            created_names = stock_price_dao.create_year_partitions(
+                2100, 2101)
+            recreated_names = stock_price_dao.create_year_partitions(
+                2100, 2101)
+            partition_names = stock_price_dao.get_partitions()
+        finally:
+            # パーティションはセッションとは別のトランザクションでコミットされるため、明示的に削除する
+            session_001.rollback()
+            with session_001.get_bind().begin() as connection:
+                for year in (2100, 2101):
+                    connection.execute(
+                        f'DROP TABLE IF EXISTS stockprice_y{year}')
+
+        assert stock_price_dao.is_partitioned()
+        assert created_names == ['stockprice_y2100', 'stockprice_y2101']
+        assert recreated_names == []
+        assert 'stockprice_y2020' in partition_names
+        assert 'stockprice_y2100' in partition_names
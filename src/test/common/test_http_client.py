@@ -0,0 +1,121 @@
+import os
+import sys
+import pathlib
+import threading
+import pytest
+import requests
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from common.http.http_client import HttpClient, RetryPolicy  # noqa: #402
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """
+    指定回数だけ503(Retry-After付き)を返した後、200を返すテスト用のハンドラ
+    """
+    failures = 0
+    request_count = 0
+
+    def do_GET(self):
+        FlakyHandler.request_count += 1
+        if FlakyHandler.request_count <= FlakyHandler.failures:
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='function', name='flaky_url')
+def flaky_server():
+    """
+    ローカルでFlakyHandlerのHTTPサーバーを起動し、そのURLを返す
+    """
+    FlakyHandler.request_count = 0
+    server = HTTPServer(('127.0.0.1', 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_port}/'
+
+    server.shutdown()
+    server.server_close()
+
+
+class TestRetryPolicy():
+    """
+    RetryPolicyクラスのユニットテスト
+    """
+    @pytest.mark.smoke
+    def test_get_backoff_range(self):
+        """
+        バックオフの秒数が、指数的に増加する上限とbackoff_maxの範囲に収まるか
+        """
+        retry_policy = RetryPolicy(backoff_base=1.0, backoff_max=5.0)
+        for attempt in range(6):
+            backoff = retry_policy.get_backoff(attempt)
+            assert 0 <= backoff <= min(5.0, 2 ** attempt)
+
+    @pytest.mark.parametrize('header, expected', [('3', 3.0),
+                                                  ('-1', 0.0),
+                                                  ('1000', 60.0),
+                                                  ('invalid', None),
+                                                  ])
+    @pytest.mark.smoke
+    def test_get_retry_after(self, header, expected):
+        """
+        Retry-Afterヘッダの秒数が、0〜backoff_maxの範囲で解釈されるか
+        """
+        response = requests.Response()
+        response.headers['Retry-After'] = header
+
+        assert RetryPolicy().get_retry_after(response) == expected
+
+
+class TestHttpClient():
+    """
+    HttpClientクラスのユニットテスト
+    """
+    @pytest.mark.smoke
+    def test_get_retry_success(self, flaky_url):
+        """
+        リトライ回数以内に成功した場合、成功したレスポンスが返されるか
+        """
+        FlakyHandler.failures = 2
+        http_client = HttpClient(retry_policy=RetryPolicy(max_retries=3))
+        response = http_client.get(flaky_url)
+
+        assert response.status_code == 200
+        assert FlakyHandler.request_count == 3
+
+    @pytest.mark.smoke
+    def test_get_retry_exceeded(self, flaky_url):
+        """
+        リトライ回数を超えて失敗した場合、例外が送出されるか
+        """
+        FlakyHandler.failures = 10
+        http_client = HttpClient(retry_policy=RetryPolicy(max_retries=1))
+
+        with pytest.raises(requests.HTTPError):
+            http_client.get(flaky_url)
+        assert FlakyHandler.request_count == 2
+
+    @pytest.mark.smoke
+    def test_session_pool(self):
+        """
+        指定したコネクション数のプールを持ち、圧縮レスポンスを要求するセッションが生成されるか
+        """
+        http_client = HttpClient(pool_size=4)
+        adapter = http_client.session.get_adapter('https://kabutan.jp/')
+
+        assert adapter._pool_maxsize == 4
+        assert 'gzip' in http_client.session.headers['Accept-Encoding']
+        http_client.close()
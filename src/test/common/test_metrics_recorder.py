@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import socket
+import logging
+import pathlib
+import pytest
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from common.metrics.metrics_recorder import MetricsRecorder, summarize  # noqa: #402
+
+
+class TestMetricsRecorder():
+    """
+    MetricsRecorderクラスのユニットテスト
+    """
+    @pytest.fixture(scope='function', name='statsd_socket')
+    def statsd_socket(self):
+        """
+        DogStatsDの代わりにメトリクスを受信するUDPソケット
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.settimeout(1.0)
+        yield sock
+        sock.close()
+
+    @pytest.mark.smoke
+    def test_timer_json_log(self, caplog):
+        """
+        timer()の処理時間・レコード数・rows/secが、1行のJSONとしてログ出力されるか
+        """
+        logger = logging.getLogger('test_metrics_recorder')
+        metrics = MetricsRecorder(logger, tags={'shard': '0'})
+        with caplog.at_level(logging.INFO, logger='test_metrics_recorder'):
+            with metrics.timer('common_dao.upsert',
+                               {'table': 'stockprice'}) as timer:
+                timer.rows = 100
+
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['metric'] == 'timer'
+        assert record['name'] == 'dshack.common_dao.upsert'
+        assert record['rows'] == 100
+        assert record['rows_per_sec'] > 0
+        assert record['duration_ms'] == pytest.approx(timer.elapsed * 1000)
+        assert record['tags'] == {'shard': '0', 'table': 'stockprice'}
+
+    @pytest.mark.smoke
+    def test_dogstatsd(self, statsd_socket):
+        """
+        DogStatsDのプロトコル(name:value|type|#tags)で送信されるか
+        """
+        host, port = statsd_socket.getsockname()
+        metrics = MetricsRecorder(statsd_host=host, statsd_port=port,
+                                  tags={'shard': '1'})
+        metrics.histogram('stock_client.fetch_latency_ms', 12.5,
+                          {'method': 'api'})
+        payload = statsd_socket.recv(1024).decode('utf-8')
+
+        assert payload == 'dshack.stock_client.fetch_latency_ms:12.5|h' \
+                          '|#shard:1,method:api'
+
+    @pytest.mark.smoke
+    def test_summarize(self):
+        """
+        パーセンタイルが最近傍順位法により計算されるか
+        """
+        summary = summarize([float(i) for i in range(1, 101)])
+
+        assert summary['count'] == 100
+        assert summary['mean'] == 50.5
+        assert summary['p50'] == 50.0
+        assert summary['p95'] == 95.0
+        assert summary['max'] == 100.0
+        assert summarize([]) == {'count': 0}
@@ -0,0 +1,106 @@
+import os
+import sys
+import pathlib
+import datetime
+import pytest
+import pandas as pd
+from sqlalchemy import func
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from common.db.parquet_snapshot import ParquetSnapshot  # noqa: #402
+from stock.dto.stock_dto import StockPrice  # noqa: #402
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture(scope='function', name='session_001')
+def db_with_test_data_001(
+    testdb,
+    company_test_data_001,
+    stock_prices_test_data_001
+):
+    """
+    ParquetSnapshotクラスのテストに使用するデータをDBに格納し、テストメソッド内で
+    使用するためのセッションを返す
+    """
+    # テストメソッド実行毎にrollback()とadd_all()が実行される
+    testdb.add_all(company_test_data_001)
+    testdb.add_all(stock_prices_test_data_001)
+    return testdb
+
+
+class TestParquetSnapshot():
+    """
+    ParquetSnapshotクラスのユニットテスト
+
+    スナップショットの保存先にはpytestのtmp_pathを使用する
+    """
+    @pytest.fixture(scope='function', name='price_df')
+    def price_df(self):
+        return pd.DataFrame({
+            'company_id': ['0001', '0001', '0002'],
+            'date': [datetime.date(2020, 2, 28), datetime.date(2020, 3, 2),
+                     datetime.date(2020, 3, 2)],
+            'close_price': [1000.0, 1100.0, None],
+        })
+
+    @pytest.mark.parametrize('partition_by, partitions, expected_count',
+                             [('company', ['0001'], 2),
+                              ('company', ['0002', '0003'], 1),
+                              ('month', ['202003'], 2),
+                              ('month', None, 3),
+                              ])
+    @pytest.mark.smoke
+    def test_write_and_read(
+        self,
+        tmp_path,
+        price_df,
+        partition_by,
+        partitions,
+        expected_count,
+    ):
+        """
+        分割キー毎に書き出したスナップショットを、分割キーを指定して読み込めるか
+        """
+        snapshot = ParquetSnapshot(str(tmp_path))
+        snapshot._write_chunk(os.path.join(str(tmp_path), 'stockprice'),
+                              price_df, partition_by, 0)
+        snapshot_df = snapshot.read('stockprice', partitions=partitions)
+
+        assert len(snapshot_df) == expected_count
+        # 企業IDは文字列のまま読み込まれる
+        assert set(snapshot_df['company_id']) <= {'0001', '0002'}
+
+    @pytest.mark.smoke
+    def test_read_not_exist(self, tmp_path):
+        """
+        スナップショットが存在しない場合はNoneを返すか
+        """
+        snapshot = ParquetSnapshot(str(tmp_path))
+        assert snapshot.read('stockprice') is None
+
+    @pytest.mark.smoke
+    def test_export(
+        self,
+        tmp_path,
+        session_001,
+        application_logger,
+    ):
+        """
+        DBの全レコードがスナップショットとして書き出され、再書き出し時に置き換えられるか
+        """
+        snapshot = ParquetSnapshot(str(tmp_path))
+        for _ in range(2):
+            row_count = snapshot.export(session_001, application_logger,
+                                        StockPrice, partition_by='company',
+                                        chunk_size=2)
+        snapshot_df = snapshot.read('stockprice',
+                                    columns=['company_id', 'close_price'])
+        record_count = session_001.query(
+            func.count(StockPrice.company_id)).scalar()
+
+        assert row_count == record_count
+        assert len(snapshot_df) == record_count
+        assert list(snapshot_df.columns) == ['company_id', 'close_price']
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import pathlib
+import threading
+import pytest
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from common.http.rate_limiter import HostRateLimiter  # noqa: #402
+
+
+class TestHostRateLimiter():
+    """
+    HostRateLimiterクラス(TokenBucket)のユニットテスト
+    """
+    @pytest.mark.smoke
+    def test_wait_interval_same_host(self):
+        """
+        同一ホストに対して複数スレッドから呼び出した場合、流量の上限に従って待機が解除されるか
+        """
+        rate_limiter = HostRateLimiter({'example.com': 10.0})
+        start_time = time.monotonic()
+        threads = [
+            threading.Thread(target=rate_limiter.wait,
+                             args=('https://example.com/page',))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 1回目は待機しないので、3回分の間隔だけ待機する
+        assert time.monotonic() - start_time >= 0.3
+
+    @pytest.mark.smoke
+    def test_wait_other_host(self):
+        """
+        流量の上限を設定していないホストについては待機しないか
+        """
+        rate_limiter = HostRateLimiter({'example.com': 0.1})
+        rate_limiter.wait('https://example.com/page')
+        start_time = time.monotonic()
+        rate_limiter.wait('https://example.org/page')
+
+        assert time.monotonic() - start_time < 1.0
+
+    @pytest.mark.smoke
+    def test_wait_burst(self):
+        """
+        burstで指定した回数までは待機せずに連続してリクエストできるか
+        """
+        rate_limiter = HostRateLimiter({'example.com': 0.1}, burst=3)
+        start_time = time.monotonic()
+        for _ in range(3):
+            rate_limiter.wait('https://example.com/page')
+
+        assert time.monotonic() - start_time < 1.0
+
+    @pytest.mark.smoke
+    def test_pause(self):
+        """
+        pause()で指定した秒数の間、同一ホストへのリクエストが待機されるか
+        """
+        rate_limiter = HostRateLimiter()
+        rate_limiter.pause('https://example.com/page', 0.2)
+        start_time = time.monotonic()
+        rate_limiter.wait('https://example.com/page')
+
+        assert time.monotonic() - start_time >= 0.15
@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import pathlib
+import datetime
+import pytest
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from common.cache.response_cache import ResponseCache, CacheMissError  # noqa: #402
+
+
+class TestResponseCache():
+    """
+    ResponseCacheクラスのユニットテスト
+
+    キャッシュディレクトリにはpytestのtmp_pathを使用する
+    """
+    @pytest.mark.smoke
+    def test_get_or_fetch(self, tmp_path):
+        """
+        2回目以降の呼び出しではfetchが呼び出されず、キャッシュした本文が返されるか
+        """
+        response_cache = ResponseCache(str(tmp_path))
+        fetch_count = []
+
+        def fetch():
+            fetch_count.append(1)
+            return 'Date,Open\n2020-03-06,1240\n'
+
+        first = response_cache.get_or_fetch('stooq', '6028', fetch)
+        second = response_cache.get_or_fetch('stooq', '6028', fetch)
+
+        assert first == second == 'Date,Open\n2020-03-06,1240\n'
+        assert len(fetch_count) == 1
+        assert response_cache.get('kabutan', '6028') is None
+
+    @pytest.mark.smoke
+    def test_get_expired(self, tmp_path):
+        """
+        有効期間を過ぎたキャッシュ・別の取得日のキャッシュは返されないか
+        """
+        response_cache = ResponseCache(str(tmp_path), ttl=60)
+        response_cache.put('stooq', '6028', 'body')
+        cache_path = response_cache._get_path('stooq', '6028')
+        old_time = time.time() - 120
+        os.utime(cache_path, (old_time, old_time))
+
+        assert response_cache.get('stooq', '6028') is None
+        assert response_cache.get(
+            'stooq', '6028',
+            datetime.date.today() - datetime.timedelta(days=1)) is None
+
+    @pytest.mark.smoke
+    def test_offline_replay(self, tmp_path):
+        """
+        オフラインモードでは取得日・有効期間に依らず最新のキャッシュを返し、
+        キャッシュが無い場合はfetchを呼び出さずに例外を送出するか
+        """
+        ResponseCache(str(tmp_path)).put(
+            'kabutan', '6028', 'old', datetime.date(2020, 3, 5))
+        ResponseCache(str(tmp_path)).put(
+            'kabutan', '6028', 'new', datetime.date(2020, 3, 6))
+        response_cache = ResponseCache(str(tmp_path), ttl=0, offline=True)
+
+        def fetch():
+            raise AssertionError('fetch must not be called in offline mode')
+
+        assert response_cache.get_or_fetch('kabutan', '6028', fetch) == 'new'
+        with pytest.raises(CacheMissError):
+            response_cache.get_or_fetch('kabutan', '9999', fetch)
+
+    @pytest.mark.smoke
+    def test_evict_by_size(self, tmp_path):
+        """
+        合計サイズが上限を超えた場合、更新日時の古いキャッシュから削除されるか
+        """
+        body = os.urandom(2000).hex()  # gzipで圧縮されにくい本文
+        response_cache = ResponseCache(str(tmp_path), max_bytes=6000)
+        for i, code in enumerate(['1000', '2000', '3000']):
+            response_cache.put('stooq', code, body)
+            cache_path = response_cache._get_path('stooq', code)
+            mtime = time.time() - 10 + i
+            os.utime(cache_path, (mtime, mtime))
+
+        assert response_cache.get('stooq', '1000') is None
+        assert response_cache.get('stooq', '2000') == body
+        assert response_cache.get('stooq', '3000') == body
+
+    @pytest.mark.smoke
+    def test_get_or_fetch_invalid_body(self, tmp_path):
+        """
+        parseが例外を送出した本文はキャッシュされず、次回の呼び出しで再取得されるか
+        """
+        response_cache = ResponseCache(str(tmp_path))
+        bodies = ['Exceeded the daily hits limit', 'Date,Open\n']
+
+        def parse(text):
+            if not text.startswith('Date'):
+                raise ValueError(f'Unexpected response: {text}')
+            return text.splitlines()
+
+        def fetch():
+            return bodies.pop(0)
+
+        with pytest.raises(ValueError):
+            response_cache.get_or_fetch('stooq', '6028', fetch, parse)
+        assert response_cache.get('stooq', '6028') is None
+
+        assert response_cache.get_or_fetch(
+            'stooq', '6028', fetch, parse) == ['Date,Open']
+        assert response_cache.get('stooq', '6028') == 'Date,Open\n'
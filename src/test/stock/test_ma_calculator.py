@@ -0,0 +1,198 @@
+import os
+import sys
+import pathlib
+import datetime
+import pytest
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from stock.dto.stock_dto import StockPrice, StockPriceMA  # noqa: #402
+from stock.main.ma_calculator import SMACalculator, EMACalculator, WMACalculator, IncrementalMACalculator, _calc_incremental_ma  # noqa: #402
+
+
+@pytest.fixture(scope='function', name='session_001')
+def db_with_test_data_001(
+    testdb,
+    company_test_data_001,
+    stock_prices_test_data_001
+):
+    """
+    MACalculatorクラスのテストに使用するデータをDBに格納し、テストメソッド内で
+    使用するためのセッションを返す
+    """
+    # テストメソッド実行毎にrollback()とadd_all()が実行される
+    testdb.add_all(company_test_data_001)
+    testdb.add_all(stock_prices_test_data_001)
+    return testdb
+
+
+@pytest.fixture(scope='function', name='session_002')
+def db_with_null_close_data(
+    session_001,
+):
+    """
+    session_001の0001の株価データの後に、終値がNULLの日とその後の株価データを追加したセッションを返す
+
+    0001の終値は2020-02-24〜2020-02-28が7730, 2020-03-02がNULL,
+    2020-03-03〜2020-03-06は変動する
+    """
+    closes = [None, 7800.0, 7900.0, 7650.0, 7700.0]
+    session_001.add_all([
+        StockPrice(company_id='0001',
+                   date=datetime.date(2020, 3, 2) + datetime.timedelta(
+                       days=idx),
+                   close_price=close_price)
+        for idx, close_price in enumerate(closes)
+    ])
+    return session_001
+
+
+@pytest.fixture(scope='module', name='prices')
+def close_prices():
+    """
+    移動平均の計算に使用する日付順の(日付, 終値)のリスト
+    """
+    start_date = datetime.date(2020, 1, 1)
+    return [(start_date + datetime.timedelta(days=idx),
+             1000.0 + (idx % 7) * 10.0 - (idx % 3) * 5.0)
+            for idx in range(30)]
+
+
+class TestIncrementalMA():
+    """
+    ウォーターマーク以降のみを計算する_calc_incremental_ma()のユニットテスト
+    """
+    @pytest.mark.parametrize('ma_kind', ['sma', 'ema', 'wma'])
+    @pytest.mark.smoke
+    def test_incremental_equals_full(
+        self,
+        prices,
+        ma_kind,
+    ):
+        """
+        ウォーターマーク以前のspan-1日分と前回値から計算した結果が、全期間の計算結果と一致するか
+        """
+        span = 5
+        full_values = _calc_incremental_ma(ma_kind, span, prices, None, None)
+        last_date, last_value = full_values[10]
+        lookback = [price for price in prices
+                    if price[0] <= last_date][-(span - 1):]
+        new_prices = [price for price in prices if price[0] > last_date]
+
+        incremental_values = _calc_incremental_ma(
+            ma_kind, span, lookback + new_prices, last_date, last_value)
+        expected_values = [value for value in full_values
+                           if value[0] > last_date]
+
+        assert len(incremental_values) == len(expected_values)
+        for (date, value), (exp_date, exp_value) in zip(incremental_values,
+                                                        expected_values):
+            assert date == exp_date
+            assert value == pytest.approx(exp_value)
+
+    @pytest.mark.smoke
+    def test_full_calc_starts_from_span(
+        self,
+        prices,
+    ):
+        """
+        ウォーターマークが無い場合、span日目以降の日付について計算されるか
+        """
+        sma_values = _calc_incremental_ma('sma', 5, prices, None, None)
+
+        assert len(sma_values) == len(prices) - 4
+        assert sma_values[0][0] == prices[4][0]
+        assert sma_values[0][1] == pytest.approx(
+            sum(close for _, close in prices[:5]) / 5)
+
+
+class TestMACalculatorConditions():
+    """
+    SQLによる各Calculatorクラスについて、企業ID・計算期間の条件が反映されるかのテストクラス
+    """
+    @pytest.mark.parametrize('calculator_class',
+                             [SMACalculator, EMACalculator, WMACalculator])
+    @pytest.mark.smoke
+    def test_get_ma_values_with_conditions(
+        self,
+        session_001,
+        application_logger,
+        calculator_class,
+    ):
+        """
+        指定した企業・期間の移動平均のみが返され、start_date当日も助走期間により計算されるか
+
+        事前準備データの0001は2020-02-24〜2020-02-28の5件
+        """
+        calculator = calculator_class(session_001, application_logger,
+                                      ['0001'])
+        ma_dtos = calculator.get_ma_values(2,
+                                           datetime.date(2020, 2, 25),
+                                           datetime.date(2020, 2, 27))
+
+        assert [dto.company_id for dto in ma_dtos] == ['0001'] * 3
+        assert [dto.date for dto in ma_dtos] == [datetime.date(2020, 2, 25),
+                                                 datetime.date(2020, 2, 26),
+                                                 datetime.date(2020, 2, 27)]
+        assert ma_dtos[0].ma_value == pytest.approx(7730)
+
+
+class TestIncrementalMACalculator():
+    """
+    stockprice_maテーブルのウォーターマーク以降のみを計算するIncrementalMACalculatorクラスのテストクラス
+    """
+    @pytest.mark.smoke
+    def test_get_ma_values_after_watermarks(
+        self,
+        session_002,
+        application_logger,
+    ):
+        """
+        ma_type毎に異なるウォーターマークまで移動平均を格納した場合に、ウォーターマークより後の日付のみが
+        計算され、その値がSQLによる各Calculatorクラスの全期間の計算結果と一致するか
+
+        sma2は終値がNULLの日の翌日(2020-03-03)まで、ema3は2020-02-27までを格納し、wma3は格納しない
+        """
+        company_ids = ['0001', '0002']
+        ma_specs = [('sma', 2), ('ema', 3), ('wma', 3)]
+        calculator_classes = {'sma': SMACalculator, 'ema': EMACalculator,
+                              'wma': WMACalculator}
+        watermarks = {'sma2': datetime.date(2020, 3, 3),
+                      'ema3': datetime.date(2020, 2, 27),
+                      'wma3': None}
+        full_dtos = [
+            dto for ma_kind, span in ma_specs
+            for dto in calculator_classes[ma_kind](
+                session_002, application_logger, company_ids
+            ).get_ma_values(span)
+        ]
+
+        def is_stored(dto):
+            watermark = watermarks[dto.ma_type]
+            return (watermark is not None) and (dto.date <= watermark)
+
+        session_002.add_all([
+            StockPriceMA(company_id=dto.company_id, date=dto.date,
+                         ma_type=dto.ma_type, ma_value=dto.ma_value)
+            for dto in full_dtos if is_stored(dto)
+        ])
+        ma_dtos = IncrementalMACalculator(
+            session_002, application_logger, company_ids
+        ).get_ma_values(ma_specs)
+
+        def to_values(ma_dtos):
+            return sorted((dto.company_id, dto.ma_type, dto.date,
+                           dto.ma_value) for dto in ma_dtos)
+
+        values = to_values(ma_dtos)
+        expected_values = to_values(
+            dto for dto in full_dtos if not is_stored(dto))
+
+        assert not any(is_stored(dto) for dto in ma_dtos)
+        assert ('0001', 'sma2', datetime.date(2020, 3, 4)) in \
+            [value[:3] for value in values]
+        assert [value[:3] for value in values] == \
+            [value[:3] for value in expected_values]
+        assert [value[3] for value in values] == \
+            pytest.approx([value[3] for value in expected_values])
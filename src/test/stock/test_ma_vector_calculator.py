@@ -0,0 +1,177 @@
+import os
+import sys
+import pathlib
+import datetime
+import pytest
+import numpy as np
+
+# src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
+sys.path.append(os.path.join(
+    str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
+from stock.dto.stock_dto import StockPrice  # noqa: #402
+from stock.main.ma_calculator import SMACalculator, EMACalculator, WMACalculator, _calc_incremental_ma  # noqa: #402
+from stock.main.ma_vector_calculator import calc_sma, calc_ema, calc_wma, VectorSMACalculator, VectorEMACalculator, VectorWMACalculator, MultiMACalculator  # noqa: #402
+
+
+@pytest.fixture(scope='function', name='session_001')
+def db_with_test_data_001(
+    testdb,
+    company_test_data_001,
+    stock_prices_test_data_001
+):
+    """
+    MultiMACalculatorクラスのテストに使用するデータをDBに格納し、テストメソッド内で
+    使用するためのセッションを返す
+    """
+    # テストメソッド実行毎にrollback()とadd_all()が実行される
+    testdb.add_all(company_test_data_001)
+    testdb.add_all(stock_prices_test_data_001)
+    return testdb
+
+
+@pytest.fixture(scope='function', name='session_002')
+def db_with_null_close_data(
+    session_001,
+):
+    """
+    session_001の0001の株価データの後に、終値がNULLの日とその後の株価データを追加したセッションを返す
+
+    0001の終値は2020-02-24〜2020-02-28が7730, 2020-03-02がNULL,
+    2020-03-03〜2020-03-06は変動する
+    """
+    closes = [None, 7800.0, 7900.0, 7650.0, 7700.0]
+    session_001.add_all([
+        StockPrice(company_id='0001',
+                   date=datetime.date(2020, 3, 2) + datetime.timedelta(
+                       days=idx),
+                   close_price=close_price)
+        for idx, close_price in enumerate(closes)
+    ])
+    return session_001
+
+
+@pytest.fixture(scope='module', name='prices')
+def close_prices():
+    """
+    移動平均の計算に使用する日付順の(日付, 終値)のリスト
+    """
+    start_date = datetime.date(2020, 1, 1)
+    random_state = np.random.RandomState(0)
+    closes = 1000.0 * np.exp(np.cumsum(random_state.normal(0, 0.02, 300)))
+    return [(start_date + datetime.timedelta(days=idx), float(close))
+            for idx, close in enumerate(closes)]
+
+
+class TestVectorMA():
+    """
+    NumPyによる移動平均の計算関数のユニットテスト
+
+    SQLによる各Calculatorクラスと同じ定義で計算する_calc_incremental_ma()の結果と比較する
+    """
+    @pytest.mark.parametrize('ma_kind, calc_func', [('sma', calc_sma),
+                                                    ('ema', calc_ema),
+                                                    ('wma', calc_wma),
+                                                    ])
+    @pytest.mark.parametrize('span', [5, 25, 75])
+    @pytest.mark.smoke
+    def test_equals_definition(
+        self,
+        prices,
+        ma_kind,
+        calc_func,
+        span,
+    ):
+        """
+        全期間について計算した移動平均が、定義通りの計算結果と数値的に一致するか
+        """
+        closes = np.array([close for _, close in prices])
+        expected_values = [value for _, value in _calc_incremental_ma(
+            ma_kind, span, prices, None, None)]
+
+        ma_values = calc_func(closes, span)
+
+        assert len(ma_values) == len(expected_values)
+        np.testing.assert_allclose(ma_values, expected_values, rtol=1e-10)
+
+    @pytest.mark.parametrize('calc_func', [calc_sma, calc_ema, calc_wma])
+    @pytest.mark.smoke
+    def test_short_series(
+        self,
+        calc_func,
+    ):
+        """
+        終値の件数がspanに満たない場合、空の配列が返されるか
+        """
+        assert len(calc_func(np.array([1.0, 2.0]), 5)) == 0
+
+
+class TestMultiMACalculator():
+    """
+    MultiMACalculatorクラスのユニットテスト
+    """
+    @pytest.mark.smoke
+    def test_get_ma_values_count(
+        self,
+        session_001,
+        application_logger,
+    ):
+        """
+        指定した全ての種類・日数の組み合わせについて、span日目以降の移動平均が計算されるか
+
+        事前準備データは0001が5件、0002が3件、0003が2件
+        """
+        calculator = MultiMACalculator(session_001, application_logger,
+                                       ['0001', '0002', '0003', '0004'])
+        ma_dtos = calculator.get_ma_values([('sma', 2), ('ema', 3)])
+        ma_types = [dto.ma_type for dto in ma_dtos]
+
+        assert ma_types.count('sma2') == 4 + 2 + 1
+        assert ma_types.count('ema3') == 3 + 1
+
+
+class TestVectorEqualsSQL():
+    """
+    NumPyによる各Calculatorクラスの計算結果が、SQLによる各Calculatorクラスと一致するかのテストクラス
+    """
+    @pytest.mark.parametrize('ma_kind, sql_class, vector_class',
+                             [('sma', SMACalculator, VectorSMACalculator),
+                              ('ema', EMACalculator, VectorEMACalculator),
+                              ('wma', WMACalculator, VectorWMACalculator),
+                              ])
+    @pytest.mark.parametrize('span', [2, 3])
+    @pytest.mark.smoke
+    def test_equals_sql(
+        self,
+        session_002,
+        application_logger,
+        ma_kind,
+        sql_class,
+        vector_class,
+        span,
+    ):
+        """
+        終値がNULLの日を含む場合も、VectorXXXCalculator・MultiMACalculatorの計算結果が
+        SQLによるCalculatorクラスの計算結果と一致するか
+        """
+        company_ids = ['0001', '0002', '0003']
+
+        def to_values(ma_dtos):
+            return sorted((dto.company_id, dto.date, dto.ma_type,
+                           dto.ma_value) for dto in ma_dtos)
+
+        sql_values = to_values(sql_class(
+            session_002, application_logger, company_ids
+        ).get_ma_values(span))
+        vector_values = to_values(vector_class(
+            session_002, application_logger, company_ids
+        ).get_ma_values(span))
+        multi_values = to_values(MultiMACalculator(
+            session_002, application_logger, company_ids
+        ).get_ma_values([(ma_kind, span)]))
+
+        assert len(sql_values) >= 1
+        for values in [vector_values, multi_values]:
+            assert [value[:3] for value in values] == \
+                [value[:3] for value in sql_values]
+            assert [value[3] for value in values] == \
+                pytest.approx([value[3] for value in sql_values])
@@ -43,3 +43,24 @@ class TestStooqAPI():
         assert 'Low' in stock_df.columns
         assert 'Close' in stock_df.columns
         assert 'Volume' in stock_df.columns
+
+    @pytest.mark.parametrize('text', ['Exceeded the daily hits limit',
+                                      'No data'])
+    @pytest.mark.smoke
+    def test_parse_csv_invalid(self, text):
+        """
+        HTTPステータスが200でも株価のCSVでない本文の場合は、例外を送出するか
+        """
+        with pytest.raises(ValueError):
+            StooqAPI()._parse_csv(text)
+
+    @pytest.mark.smoke
+    def test_parse_csv(self):
+        """
+        株価のCSVの本文が、日付をインデックスとするデータフレームに変換されるか
+        """
+        stock_df = StooqAPI()._parse_csv(
+            'Date,Open,High,Low,Close,Volume\n'
+            '2020-03-06,1240,1250,1230,1245,10000\n')
+        assert stock_df.index.tolist() == [datetime.datetime(2020, 3, 6)]
+        assert stock_df['Close'].tolist() == [1245]
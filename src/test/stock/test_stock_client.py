@@ -6,7 +6,8 @@ import pytest
 # src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
 sys.path.append(os.path.join(
     str(pathlib.Path(__file__).resolve().parent.parent.parent), 'main'))
-from stock.main.stock_client import StockClient  # noqa: #402
+from stock.dto.stock_dto import Company, StockPrice, StockPriceMA  # noqa: #402
+from stock.main.stock_client import StockClient, get_shard_from_env  # noqa: #402
 
 
 @pytest.fixture(scope='function', name='session_001')
@@ -23,6 +24,22 @@ def db_with_test_data_001(
     return testdb
 
 
+@pytest.fixture(scope='function', name='session_002')
+def db_with_test_data_002(
+    testdb,
+    company_test_data_001,
+    stock_prices_test_data_001,
+):
+    """
+    移動平均の計算のテストに使用する株価データをDBに格納し、テストメソッド内で
+    使用するためのセッションを返す
+    """
+    # テストメソッド実行毎にrollback()とadd_all()が実行される
+    testdb.add_all(company_test_data_001)
+    testdb.add_all(stock_prices_test_data_001)
+    return testdb
+
+
 class TestStockClient():
     """
     StockManagerを利用し、株価データをDBに格納するStockClientクラスのユニットテストを行うクラス
@@ -46,3 +63,114 @@ class TestStockClient():
         stock_client = StockClient(session_001, None)
         company_id_res = stock_client.get_company_id(stock_code, country_code)
         assert company_id == company_id_res
+
+    @pytest.mark.smoke
+    def test_get_calc_companies(
+        self,
+        session_002,
+        application_logger,
+    ):
+        """
+        株価データが存在する企業のみが、企業IDの昇順で取得されることをテスト
+        """
+        stock_client = StockClient(session_002, application_logger)
+
+        assert stock_client.get_calc_companies() == ['0001', '0002', '0003']
+
+    @pytest.mark.parametrize('incremental, engine, processes',
+                             [(False, 'sql', None),
+                              (False, 'numpy', None),
+                              (True, 'sql', None),
+                              (False, 'numpy', 2),
+                              (True, 'sql', 2),
+                              ])
+    @pytest.mark.smoke
+    def test_iter_ma_values_batch(
+        self,
+        session_002,
+        application_logger,
+        incremental,
+        engine,
+        processes,
+    ):
+        """
+        企業を1社ずつに分けて計算した結果(processesを指定した場合はプロセスプールで計算した結果)が、
+        全企業を1プロセスで一括で計算した結果と一致することをテスト
+        """
+        stock_client = StockClient(session_002, application_logger)
+        company_ids = stock_client.get_calc_companies()
+        ma_specs = [('sma', 2), ('ema', 2), ('wma', 3)]
+
+        def to_values(ma_dtos):
+            # プロセスプールの計算結果はカラム名をキーとするディクショナリで返される
+            ma_records = [ma_dto if isinstance(ma_dto, dict)
+                          else vars(ma_dto) for ma_dto in ma_dtos]
+            return sorted((res['company_id'], res['date'], res['ma_type'],
+                           round(res['ma_value'], 6)) for res in ma_records)
+
+        if processes is None:
+            all_values = to_values(stock_client._iter_ma_values(
+                company_ids, incremental, engine, ma_specs))
+            batch_values = to_values(stock_client._iter_ma_values(
+                company_ids, incremental, engine, ma_specs,
+                company_batch_size=1))
+        else:
+            # 各プロセスは別のセッションで株価データを参照するため、テストデータをコミットする
+            session_002.commit()
+            try:
+                all_values = to_values(stock_client._iter_ma_values(
+                    company_ids, incremental, engine, ma_specs))
+                batch_values = to_values(
+                    stock_client._iter_ma_values_parallel(
+                        company_ids, incremental, engine, ma_specs,
+                        company_batch_size=1, processes=processes))
+            finally:
+                session_002.rollback()
+                for dto_class in [StockPriceMA, StockPrice, Company]:
+                    session_002.query(dto_class).delete()
+                session_002.commit()
+
+        assert len(all_values) >= 1
+        assert all_values == batch_values
+
+    @pytest.mark.smoke
+    def test_shard_partition(self):
+        """
+        全ての企業IDが、いずれか1つのシャードのみに割り当てられることをテスト
+        """
+        company_ids = [f'{i:04d}' for i in range(1000)]
+        shard_count = 3
+        stock_clients = [StockClient(None, None, shard_index, shard_count)
+                         for shard_index in range(shard_count)]
+        for company_id in company_ids:
+            in_shards = [stock_client.is_in_shard(company_id)
+                         for stock_client in stock_clients]
+            assert sum(in_shards) == 1
+        # 各シャードに偏りなく割り当てられる
+        for stock_client in stock_clients:
+            shard_size = sum(stock_client.is_in_shard(company_id)
+                             for company_id in company_ids)
+            assert 250 <= shard_size <= 420
+
+    @pytest.mark.parametrize('shard_index, shard_count',
+                             [(-1, 2), (2, 2), (0, 0)])
+    @pytest.mark.smoke
+    def test_invalid_shard(self, shard_index, shard_count):
+        """
+        シャードの番号がシャード数の範囲外の場合、例外が送出されることをテスト
+        """
+        with pytest.raises(ValueError):
+            StockClient(None, None, shard_index, shard_count)
+
+    @pytest.mark.smoke
+    def test_get_shard_from_env(self, monkeypatch):
+        """
+        SHARD_INDEXが未指定の場合、Indexed JobのJOB_COMPLETION_INDEXが使用されることをテスト
+        """
+        monkeypatch.delenv('SHARD_INDEX', raising=False)
+        monkeypatch.setenv('JOB_COMPLETION_INDEX', '1')
+        monkeypatch.setenv('SHARD_COUNT', '2')
+        assert get_shard_from_env() == (1, 2)
+
+        monkeypatch.setenv('SHARD_INDEX', '0')
+        assert get_shard_from_env() == (0, 2)
@@ -2,6 +2,8 @@ import os
 import sys
 import pathlib
 import pytest
+import datetime
+import pandas as pd
 
 # src/mainフォルダパスを追加し、src/mainフォルダ起点でインポートする(#402 Lint Error抑制と合わせて使用)
 sys.path.append(os.path.join(
@@ -9,6 +11,21 @@ sys.path.append(os.path.join(
 from stock.main.stock_crawler import KabutanCrawler  # noqa: #402
 
 
+@pytest.fixture(scope='module', name='kabuka_html')
+def kabuka_html_data():
+    """
+    TestKabutanCrawlerParserで使用する、kabutanの株価ページのHTML
+    """
+    html_path = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)),
+        'resources',
+        'stock',
+        'test_stock_crawler_kabuka.html'
+    )
+    with open(html_path, encoding='utf-8') as f:
+        return f.read()
+
+
 class TestKabutanCrawler():
     """
     KabutanCrawlerクラスのユニットテスト
@@ -24,7 +41,7 @@ class TestKabutanCrawler():
         stock_crawler = KabutanCrawler()
         stock_df = stock_crawler.get_stock_price('6028',
                                                  application_logger)
-        assert len(stock_df) == 1
+        assert len(stock_df) >= 1
         assert 'Open' in stock_df.columns
         assert 'High' in stock_df.columns
         assert 'Low' in stock_df.columns
@@ -40,3 +57,51 @@ class TestKabutanCrawler():
         stock_df = stock_crawler.get_stock_price('NotExistCode',
                                                  application_logger)
         assert stock_df is None
+
+
+class TestKabutanCrawlerParser():
+    """
+    KabutanCrawlerクラスのHTML解析処理のユニットテスト
+
+    クローリングは行わず、resourcesフォルダのHTMLを解析する
+    """
+    @pytest.mark.smoke
+    def test_parse_stock_tables(self, kabuka_html):
+        """
+        最新日と過去の日次データの全ての行が、日付の昇順で取得できることをテスト
+        """
+        stock_crawler = KabutanCrawler()
+        stock_df = stock_crawler._parse_stock_tables(kabuka_html)
+
+        assert list(stock_df.index) == [pd.to_datetime('2020-03-04'),
+                                        pd.to_datetime('2020-03-05'),
+                                        pd.to_datetime('2020-03-06')]
+        assert stock_df.at[pd.to_datetime('2020-03-06'), 'Close'] == '1240'
+        assert stock_df.at[pd.to_datetime('2020-03-05'), 'Volume'] == '98700'
+
+    @pytest.mark.smoke
+    def test_parse_stock_tables_not_found(self):
+        """
+        株価データのテーブルが存在しない場合、例外が送出されることをテスト
+        """
+        stock_crawler = KabutanCrawler()
+        with pytest.raises(ValueError):
+            stock_crawler._parse_stock_tables('<html><body></body></html>')
+
+    @pytest.mark.smoke
+    def test_get_stock_price_start_date(self, kabuka_html):
+        """
+        start_dateを指定した場合、start_date以降の行のみが返されることをテスト
+        """
+        class DummyResponse():
+            text = kabuka_html
+
+        class DummyHttpClient():
+            def get(self, url, params=None, logger=None):
+                return DummyResponse()
+
+        stock_crawler = KabutanCrawler(DummyHttpClient())
+        stock_df = stock_crawler.get_stock_price(
+            '0000', start_date=datetime.date(2020, 3, 5))
+
+        assert len(stock_df) == 2
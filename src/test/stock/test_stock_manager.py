@@ -92,6 +92,47 @@ class TestStockManager():
         else:
             assert recent_date == expected_date
 
+    @pytest.mark.smoke
+    def test_get_recent_dates(
+        self,
+        session_001,
+    ):
+        """
+        国コードを指定して、銘柄コード毎の企業IDと最新日を一括で取得できることをテストする。
+
+        株価データの無い企業は最新日がNoneとなり、他の国の同じ銘柄コードの企業は含まれないことを確認する
+        """
+        stock_manager = StockManager(session_001, None, None)
+        recent_dates = stock_manager.get_recent_dates('JP')
+
+        assert recent_dates == {
+            '2000': ('0001', datetime.date(2020, 2, 28)),
+            '3000': ('0002', datetime.date(2020, 2, 26)),
+            '4000': ('0003', datetime.date(2020, 2, 25)),
+            '5000': ('0004', None),
+        }
+
+    @pytest.mark.parametrize('recent_date, expected_method',
+                             [(datetime.date(2020, 3, 6), 'skip'),
+                              (datetime.date(2020, 3, 5), 'crawler'),
+                              (datetime.date(2020, 2, 27), 'api'),
+                              (datetime.date(2020, 3, 4), 'api'),
+                              (None, 'api'),
+                              ])
+    @pytest.mark.smoke
+    def test_get_fetch_method(
+        self,
+        recent_date,
+        expected_method,
+    ):
+        """
+        基準日を2020/03/08(日)として、最新日から取得方法が判定できることをテストする。
+        """
+        stock_manager = StockManager(None, None, None)
+        fetch_method = stock_manager.get_fetch_method(
+            recent_date, today=datetime.date(2020, 3, 8))
+        assert fetch_method == expected_method
+
     @pytest.mark.smoke
     def test_convert_stock_dtos(
         self,
@@ -124,3 +165,41 @@ class TestStockManager():
         assert stock_price_dtos[1].low_price == 4000.0
         assert stock_price_dtos[1].close_price == 5000.0
         assert stock_price_dtos[1].volume == 6000.0
+
+    @pytest.mark.smoke
+    def test_to_stock_price_records(
+        self,
+    ):
+        """
+        株価データのデータフレームを、DTOを経由せずにディクショナリのリストに
+        変換できていることを確認するテスト
+
+        出来高の欠損値(NaN)・数値に変換できない値はNoneに変換されることを確認する
+        """
+        stock_manager = StockManager(None, None, None)
+        stock_df = pd.DataFrame(
+            {
+                'Open': [1000.0, 2000.0],
+                'High': ['2000.0', '3000.0'],
+                'Low': [3000, 4000],
+                'Close': [4000.0, '-'],
+                'Volume': [5000.0, float('nan')],
+            },
+            index=pd.DatetimeIndex(
+                [pd.to_datetime('2020-03-08'), pd.to_datetime('2020-03-09')],
+                name='Date',
+            ),
+        )
+
+        records = stock_manager.to_stock_price_records(stock_df, '0001')
+        assert records == [
+            {'company_id': '0001', 'date': datetime.date(2020, 3, 8),
+             'open_price': 1000.0, 'high_price': 2000.0,
+             'low_price': 3000.0, 'close_price': 4000.0, 'volume': 5000.0},
+            {'company_id': '0001', 'date': datetime.date(2020, 3, 9),
+             'open_price': 2000.0, 'high_price': 3000.0,
+             'low_price': 4000.0, 'close_price': None, 'volume': None},
+        ]
+        assert type(records[0]['open_price']) is float
+        assert 'company_id' not in stock_df.columns
+        assert stock_manager.to_stock_price_records(None, '0001') is None